@@ -3,9 +3,13 @@ Module:     cellular_automaton.py
 Purpose:    To create a cellular automaton for the purpose of modeling the spread of disease
 """
 
-from random import random, seed
-from constants import POPULATION, DISEASE_LIST, NUM_COLS_FULL, NUM_ROWS_FULL, AGE_DIST, ITERATOR_LIMIT, SIM_MAX
+import numpy as np
+import constants
+from Population import Population
 from Individual import Individual
+from Occupancy_Index import Occupancy_Index
+from Sparse_Grid import Sparse_Count_Grid
+from Event_Log import EVENT_CREATED
 
 class Cellular_Automaton():
     """
@@ -22,59 +26,62 @@ class Cellular_Automaton():
     /$$$$$$ /$$$$$$|__/|__/  |__/|__/   \___/   /$$$$$$ /$$$$$$      
     |______/|______/                            |______/|______/
     """
-    def __init__(self):
+    def __init__(self, config=None):
+        # the parameters, terrain, random number streams, and event log of this simulation (by
+        #       default, the ones in `constants.py`)
+        self.config = config if config is not None else constants.current_config()
+        self.num_diseases = len(self.config.DISEASE_LIST)
         # length of simulation in days
         self.num_days = 0
 
         # population variables
-        self.population = POPULATION
+        self.population = self.config.POPULATION
+        # the variables of every individual, stored compactly. The simulation grid holds views of its rows
+        self.individuals = Population(self.num_diseases, self.config)
 
-        self.state_list = [([0] * len(DISEASE_LIST)) for state in range(5)]
+        self.state_list = [([0] * self.num_diseases) for state in range(5)]
 
         # These following two while loops will only place individuals randomly in the grid so as to leave
-        #       a border of empty lists around the grid's outside. E.G.
+        #       a border of empty cells around the grid's outside. E.G.
         #       GRID A ->   |0 0 0 0 0| (the 'X' spots are usable; the '0' spots aren't)
         #                   |0 X X X 0|
         #                   |0 X X X 0|
         #                   |0 X X X 0|
         #                   |0 0 0 0 0|
-        # the 2D simulation grid
-        self.sim_grid = [([0] * NUM_COLS_FULL) for row in range(NUM_ROWS_FULL)]
-        self.infectious_count_grid = [([0] * NUM_COLS_FULL) for row in range(NUM_ROWS_FULL)]
+        # the 2D simulation grid: an index of which individuals are in each cell, rebuilt once a day.
+        #       In the "sparse" grid mode only the occupied cells are indexed
+        self.sparse = self.config.GRID_MODE == "sparse"
+        self.occupancy = Occupancy_Index(self.config.NUM_ROWS_FULL, self.config.NUM_COLS_FULL, self.sparse)
+        # (row, col, disease) count of infectious individuals in each cell. After it is populated
+        #   below, it is only ever updated with +1/-1 deltas as individuals change state or move.
+        #   In the "sparse" grid mode only the cells holding infectious individuals are stored
+        self.infectious_count_grid = self.__new_count_grid()
         print("Created main simulation grid")
 
-        # initialize simulation grid indices to be empty lists
-        # initialize infectious_count_grid indices to be zero-lists of length equal
-        #   to the number of diseases to be modeled in the simulation
-        for row in range(NUM_ROWS_FULL):
-            for col in range(NUM_COLS_FULL):
-                self.sim_grid[row][col] = []
-                self.infectious_count_grid[row][col] = ([0] * len(DISEASE_LIST))
-        print("Initialized main simulation grid")
-
-        # create two lists of the population's possible ages and their distribution
-        ages = []
-        age_weights = []
-        for key in AGE_DIST:
-            ages.append(key)
-            age_weights.append(AGE_DIST[key])
-
         # Used to give each individual in the population a unique ID
         individual_counter = 1
 
-        # instantiate the initially infectious individuals and get them placed in the grid
-        print("Populating grid with infectious individuals")
-        infectious_count, individual_counter = self.__populate_with_infectious(individual_counter, ages, age_weights)
+        # instantiate the initially infectious individuals and the rest of the population (the
+        #       susceptible individuals) all at once, and get them placed in the grid
+        print("Populating grid with infectious and susceptible individuals")
+        self.__populate(individual_counter)
 
-        # instantiate the rest of the population (the susceptible individuals) and get them placed in the grid
-        print("Populating grid with susceptible individuals")
-        self.__populate_with_susceptibles(individual_counter, ages, age_weights, infectious_count)
+        # when each individual arrived in their current cell. Individuals in a cell are processed
+        #       in the order they arrived, so everyone starts in the order they were created
+        self.arrival = np.arange(len(self.individuals), dtype=np.int64)
+        self.next_arrival = len(self.individuals)
+        self.__rebuild_occupancy()
 
         # populate `infectious_count_grid`
-        self.__count_num_infectious()
+        self.infectious_count_grid = self.__count_num_infectious()
 
-        # outfile for debugging purposes
-        self.outfile = open("population.txt", 'w')
+        # the infection pressure of every cell analyzed so far today, keyed by its (row, col) location.
+        #   It is emptied at the start of each day since the infectious counts change overnight
+        self.pressure_cache = {}
+        # today's cache hits and misses, and one [hits, misses] pair for every processed day
+        self.pressure_cache_hits = 0
+        self.pressure_cache_misses = 0
+        self.pressure_cache_history = []
 
         print("Populated main simulation grid with initially infected and susceptible Individuals")
 
@@ -89,74 +96,142 @@ class Cellular_Automaton():
     |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/  
     """
 
-    def __populate_with_infectious(self, individual_counter, ages, age_weights):
+    def __populate(self, individual_counter):
         """
-        Purpose:    Populates the simulation grid with the initially infectious individuals
-                    for all diseases to be modeled
-        Input:      the id for the Individual (`individual_counter`), the population's list of ages
-                    (`ages`), and the age distribution of the population ("age_weights")
+        Purpose:    Populates the simulation grid with the initially infectious individuals for all
+                    diseases to be modeled, followed by the susceptible individuals (the population
+                    minus the initially infected). Everyone is created in one pass over whole arrays
+                    (see `Population.add_batch`), and their paths are only found once they first move
+        Input:      the id for the first Individual (`individual_counter`)
         Output:     None
         """
-        total_infectious = 0
-        for disease in range(len(DISEASE_LIST)):
-            num_infectious = DISEASE_LIST[disease]["INIT_INFECTIOUS"]
-            total_infectious += num_infectious
-            while num_infectious > 0:
-                # create an Individual object with its identifier, their state of health state, the list of possible ages,
-                #       the age distributions, the ratio of deaths for each age, and the type of disease
-                infected_person = Individual(individual_counter, 2, ages, age_weights, disease)
-
-                self.sim_grid[infected_person.location[0]][infected_person.location[1]].append(infected_person)
+        num_infectious = [self.config.DISEASE_LIST[disease]["INIT_INFECTIOUS"] for disease in range(self.num_diseases)]
+        # can be 0 (susceptible), 1 (latent), 2 (infectious), 3 (recovered), or 4 (immune). The
+        #       initially infectious individuals of each disease come first, in disease order
+        state_of_health = np.zeros((max(self.population, sum(num_infectious)), self.num_diseases), dtype=np.int8)
+        first = 0
+        for disease in range(self.num_diseases):
+            state_of_health[first:first+num_infectious[disease], disease] = 2
+            first += num_infectious[disease]
+
+        first = self.individuals.add_batch(individual_counter, state_of_health)
+        if self.config.event_log.transitions:
+            self.__log_creation(first)
 
-                print("Disease", str(disease) + ":", num_infectious, "left...", end='\r', flush=True)
-
-                num_infectious -= 1
-                individual_counter += 1
-        return total_infectious, individual_counter
+    def __count_num_infectious(self):
+        """
+        Purpose:    Count the number of infectious people in every cell from scratch
+        Input:      None
+        Output:     A (row, col, disease) grid of the number of infectious individuals in each cell
+        """
+        infectious_count_grid = self.__new_count_grid()
+        for row, col, individuals in self.occupied_cells():
+            for individual in individuals:
+                for disease in range(self.num_diseases):
+                    if individual.state_of_health[disease] == 2:
+                        infectious_count_grid[row, col, disease] += 1
+        return infectious_count_grid
+
+    def __new_count_grid(self):
+        """
+        Purpose:    Create an empty grid of infectious counts for the grid mode in use
+        Input:      None
+        Output:     A (row, col, disease) NumPy array, or a `Sparse_Count_Grid` in the "sparse" grid mode
+        """
+        if self.sparse:
+            return Sparse_Count_Grid(self.num_diseases)
+        return np.zeros((self.config.NUM_ROWS_FULL, self.config.NUM_COLS_FULL, self.num_diseases), dtype=np.int32)
 
-    def __populate_with_susceptibles(self, individual_counter, ages, age_weights, infectious_count):
+    def __rebuild_occupancy(self):
         """
-        Purpose:    Populates the simulation grid with the susceptible individuals,
-                    which is just the population minus the initially infected
-        Input:      the id for the Individual (`individual_counter`), the population's list of ages
-                    (`ages`), and the age distribution of the population ("age_weights")
+        Purpose:    Index every individual by the cell they are in now, keeping the individuals
+                    in each cell in the order they arrived
+        Input:      None
         Output:     None
         """
-        y = self.population - infectious_count
-        while y > 0:
-            # here, we don't pass the `disease` param like we did in `__populate_with_infectious` because
-            #   a susceptible person is disease agnostic. They can contract any disease.
-            susceptible_person = Individual(individual_counter, 0, ages, age_weights)
-            self.sim_grid[susceptible_person.location[0]][susceptible_person.location[1]].append(susceptible_person)
+        # the arrays are only viewed for the rebuild, since a viewed `array.array` can't grow
+        self.occupancy.rebuild(np.frombuffer(self.individuals.rows, dtype=np.uint16), \
+            np.frombuffer(self.individuals.cols, dtype=np.uint16), self.arrival)
 
-            print(y, "left...", end='\r', flush=True)
-
-            y -= 1
-            individual_counter += 1
+    def __update_num_infectious(self, old_location, old_health, new_location, new_health):
+        """
+        Purpose:    Apply the +1/-1 changes to `self.infectious_count_grid` caused by one individual
+                    moving or transitioning into or out of the infectious stage
+        Input:      The individual's location and state of health before (`old_location`, `old_health`)
+                    and after (`new_location`, `new_health`) their changes were applied
+        Output:     None
+        """
+        moved = old_location != new_location
+        for disease in range(self.num_diseases):
+            was_infectious = old_health[disease] == 2
+            is_infectious = new_health[disease] == 2
+            # an infectious individual that moved is removed from their old cell and added to their new one
+            if was_infectious and (moved or not is_infectious):
+                self.infectious_count_grid[old_location[0], old_location[1], disease] -= 1
+            if is_infectious and (moved or not was_infectious):
+                self.infectious_count_grid[new_location[0], new_location[1], disease] += 1
+
+    def __verify_num_infectious(self):
+        """
+        Purpose:    Debug check that the incrementally updated `self.infectious_count_grid` matches
+                    a full recount of the simulation grid
+        Input:      None
+        Output:     None. Raises a RuntimeError if the two disagree
+        """
+        recount = self.__count_num_infectious()
+        if self.sparse:
+            mismatches = recount.mismatches(self.infectious_count_grid)
+        else:
+            mismatches = np.argwhere(recount != self.infectious_count_grid)
+        if len(mismatches):
+            row, col, disease = mismatches[0]
+            raise RuntimeError("Day " + str(self.num_days) + ": infectious count for disease " + str(disease) + \
+                " in cell " + str((row, col)) + " is " + str(self.infectious_count_grid[row, col, disease]) + \
+                    " but a full recount found " + str(recount[row, col, disease]) + " (" + str(len(mismatches)) + " mismatched entries)")
+
+    def __log_creation(self, first):
+        """
+        Purpose:    Record the initial state of health and disease durations of newly created
+                    Individuals in the event log, in one batch
+        Input:      The index of the first new Individual (every Individual after it is new too)
+        Output:     None
+        """
+        individuals, num_diseases = self.individuals, self.num_diseases
+        count = len(individuals) - first
+        def values(field, per_disease=True):
+            # a NumPy copy of the new Individuals' values, one per Individual per disease
+            values = getattr(individuals, field)
+            values = np.frombuffer(values, dtype=values.typecode)
+            return values[first*num_diseases:].copy() if per_disease else np.repeat(values[first:], num_diseases)
+        self.config.event_log.record_batch(EVENT_CREATED, self.num_days, values("ids", False), np.tile(np.arange(num_diseases), count), \
+            new_state=values("state_of_health"), rows=values("rows", False), cols=values("cols", False), \
+            detail=np.column_stack((values("days_in_latent"), values("days_in_infectious"), values("immunity_duration"))))
+
+    def __log_exposures(self, individual, location, is_infected):
+        """
+        Purpose:    Record the infection draws of an Individual who is susceptible to a disease
+                    and has infectious neighbors in the event log
+        Input:      The Individual, their (row, col) location, and the list returned by `infect`
+        Output:     None
+        """
+        _, chance_infection = self.pressure_cache[location]
+        for disease in range(self.num_diseases):
+            if individual.state_of_health[disease] == 0 and chance_infection[disease] > 0:
+                self.config.event_log.exposure(self.num_days, individual.id, disease, location, chance_infection[disease], is_infected[disease])
 
-    def __count_num_infectious(self):
+    def __log_changes(self, individual, old_location, old_health):
         """
-        Purpose:    Count the number of infectious people in a cell
-        Input:      A row-column tuple identifying a row and column in the simulation grid
+        Purpose:    Record an Individual's state transitions (and their movement, if the event
+                    log records it) after their changes were applied
+        Input:      The Individual and their location and state of health before the changes
         Output:     None
         """
-        # for row in range(0,100):
-        #     for col in range(0,100):
-        #         for disease in self.infectious_count_grid[row][col]:
-        #             if disease:
-        #                 print("There's an infectious in", row, col)
-        # # print(self.infectious_count_grid)
-        # print('\n')
-        for row in range(1, ITERATOR_LIMIT):
-            for col in range(1, ITERATOR_LIMIT):
-                # for each day, the `self.infectious_count_grid` must be reset to all zeros
-                #   otherwise each spot's infectious count will be incremented upon the previous
-                #   day's count
-                self.infectious_count_grid[row][col] = ([0] * len(DISEASE_LIST))
-                for individual in self.sim_grid[row][col]:
-                    for disease in range(len(DISEASE_LIST)):
-                        if individual.state_of_health[disease] == 2:
-                            self.infectious_count_grid[row][col][disease] += 1
+        for disease in range(self.num_diseases):
+            if old_health[disease] != individual.state_of_health[disease]:
+                self.config.event_log.transition(self.num_days, individual.id, disease, old_health[disease], \
+                    individual.state_of_health[disease], old_location)
+        if self.config.event_log.moves and old_location != individual.location:
+            self.config.event_log.move(self.num_days, individual.id, individual.location)
 
     """
      /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$                
@@ -186,70 +261,70 @@ class Cellular_Automaton():
         """
         # reset the state_list since the simulation recounts the number of susceptibel, latent, etc.
         #   individuals each simulated day
-        self.state_list = [([0] * len(DISEASE_LIST)) for state in range(5)]
-        for row in range(1, ITERATOR_LIMIT):
-            for col in range(1, ITERATOR_LIMIT):
-                # traverse the list of individuals "sitting" in this particular grid location
-                for individual in self.sim_grid[row][col]:
-                    # make the call to `infect` and flag the individual if they are ready to progress
-                    #   to the next stage of the disease
-                    individual.flag_for_update(self.infect((row, col)))
+        self.state_list = [([0] * self.num_diseases) for state in range(5)]
+        # yesterday's infection pressures are stale
+        self.pressure_cache = {}
+        self.pressure_cache_hits = 0
+        self.pressure_cache_misses = 0
+        # today's occupants of every cell. Individuals who move today are only indexed in their
+        #       new cell at the end of the day, so every individual is processed exactly once
+        todays_cells = [(row, col, individuals.tolist()) for row, col, individuals in self.occupancy.cells() \
+            if 0 < row < self.config.ROW_LIMIT and 0 < col < self.config.COL_LIMIT]
+        for row, col, individuals in todays_cells:
+            # traverse the individuals "sitting" in this particular grid location
+            for index in individuals:
+                individual = Individual(self.individuals, index)
+                # make the call to `infect` and flag the individual if they are ready to progress
+                #   to the next stage of the disease
+                is_infected = self.infect((row, col))
+                if self.config.event_log.exposures:
+                    self.__log_exposures(individual, (row, col), is_infected)
+                individual.flag_for_update(is_infected)
+
+        self.pressure_cache_history.append([self.pressure_cache_hits, self.pressure_cache_misses])
 
         # loop through entire grid again and update all individuals' object variables
-        self.outfile.write("Day: "+str(self.num_days)+'\n')
-        for row in range(1, ITERATOR_LIMIT):
-            for col in range(1, ITERATOR_LIMIT):
-                x = 0
-                while x < len(self.sim_grid[row][col]):
-                    # update the object variables of the individual
-                    self.outfile.write(str(self.sim_grid[row][col][x].id)+" went from "+str(self.sim_grid[row][col][x].state_of_health)+' to ')
-                    individual_health = self.sim_grid[row][col][x].apply_changes()
-                    if individual_health != -1:
-                        self.outfile.write(str(individual_health)+'\n')
-
-                        # if the individual is susceptible to all diseases. This special case exists because
-                        #   the `susceptible` element in `self.state_list` is a list of len(DISEASE_LIST) size.
-                        #   There is only one pool of susceptibles; there aren't different susceptible pools from
-                        #   which each disease takes. Therefore, each element in the `susceptible` element in 
-                        #   `self.state_list` has the same value
-                        if individual_health == [0]*len(DISEASE_LIST):
-                            # print(self.sim_grid[row][col][x].id, "is perfectly healthy.")
-                            self.state_list[0] = [x + 1 for x in self.state_list[0]]
-                            # print("The new susceptible count is:", self.state_list[0])
-                        # Otherwise, this individual is infected with a disease, so don't increment the `susceptible`
-                        #   element; increment the disease element in each of the states in `self.state_list`
-                        else:
-                            # print(self.sim_grid[row][col][x].id, ": Here's their health:", individual_health)
-                            for disease in range(len(DISEASE_LIST)):
-                                # do not increment the `susceptible` element in `self.state_list`
-                                if individual_health[disease] > 0:
-                                    self.state_list[individual_health[disease]][disease] += 1
-                    # if the current position of the individual in the simulation grid doesn't match
-                    #   their position in the Individual object (indicating they will move to a different
-                    #   spot for the next day), move them to their new position and remove them from the 
-                    #   old.
-                    if self.sim_grid[row][col][x].location != (row, col):
-                        # append them to the list in their new location
-                        self.sim_grid[self.sim_grid[row][col][x].location[0]][self.sim_grid[row][col][x].location[1]].append(self.sim_grid[row][col][x])
-                        # remove them from the list in their old location
-                        self.sim_grid[row][col].remove(self.sim_grid[row][col][x])
-                        # Here's an example of why we decrement x after moving an object to a new grid location
-                        #   instead of just incrementing `x` like any other while loop would. Let's assume 
-                        #   there are three objects in this simulation grid position. We just removed one object 
-                        #   and moved it to it's new location, leaving two. If we had just incremented `x` (`x` 
-                        #   would then be 1), we would then access the second object of the two left in this position. 
-                        #   Let's continue. We move that object to its new location. Increment `x` again (`x` now 
-                        #   equals 2). There's still one object we haven't iterated over, but the list length is now 1
-                        #   while `x` is 2, killing the while loop. That's why we decrement `x` whenever we move an 
-                        #   object to a new grid location.
-                        x -= 1
-                    x += 1
-        # update the num_infectious grid for the next simulation day
-        self.__count_num_infectious()
+        for row, col, individuals in todays_cells:
+            for index in individuals:
+                individual = Individual(self.individuals, index)
+                # update the object variables of the individual
+                # `apply_changes` updates the individual's state of health in place, so keep a copy of it
+                old_health = individual.state_of_health
+                individual_health = individual.apply_changes()
+                if individual_health != -1:
+                    if self.config.event_log.transitions:
+                        self.__log_changes(individual, (row, col), old_health)
+
+                    # keep `self.infectious_count_grid` up to date for the next simulation day
+                    self.__update_num_infectious((row, col), old_health, individual.location, individual_health)
+
+                    # if the individual is susceptible to all diseases. This special case exists because
+                    #   the `susceptible` element in `self.state_list` is a list of len(DISEASE_LIST) size.
+                    #   There is only one pool of susceptibles; there aren't different susceptible pools from
+                    #   which each disease takes. Therefore, each element in the `susceptible` element in 
+                    #   `self.state_list` has the same value
+                    if individual_health == [0]*self.num_diseases:
+                        self.state_list[0] = [x + 1 for x in self.state_list[0]]
+                    # Otherwise, this individual is infected with a disease, so don't increment the `susceptible`
+                    #   element; increment the disease element in each of the states in `self.state_list`
+                    else:
+                        for disease in range(self.num_diseases):
+                            # do not increment the `susceptible` element in `self.state_list`
+                            if individual_health[disease] > 0:
+                                self.state_list[individual_health[disease]][disease] += 1
+                # if the individual is moving to a different spot for the next day, they arrive
+                #   there after everyone already in it
+                if individual.location != (row, col):
+                    self.arrival[index] = self.next_arrival
+                    self.next_arrival += 1
+        # put everyone who moved in their new cell
+        self.__rebuild_occupancy()
+        # the num_infectious grid has been updated as individuals changed, but it can be checked
+        #   against a full recount when debugging
+        if self.config.VERIFY_INFECTIOUS_COUNTS:
+            self.__verify_num_infectious()
         self.num_days += 1
 
-        self.outfile.write('\n')
-
         # the simulation will terminate whenever it has run SIM_MAX number of days
         #   or there are no individuals in the latent or infectious stages
         latent_infectious_present = False
@@ -258,40 +333,67 @@ class Cellular_Automaton():
         #   infectious person in the entire simulation, the OR result will be True.
         # We negate `self.state_list[1][disease]` and `self.state_list[2][disease]` to always return
         #   False if there are individuals possessing that state
-        for disease in range(len(DISEASE_LIST)):
+        for disease in range(self.num_diseases):
             # latent = self.state_list[1][disease]
             # infectious = self.state_list[2][disease]
             # temp = latent_infectious_present
             latent_infectious_present = latent_infectious_present or self.state_list[1][disease] or self.state_list[2][disease]
-        if self.num_days == SIM_MAX or not latent_infectious_present:
+        if self.num_days == self.config.SIM_MAX or not latent_infectious_present:
             return True
         return False
 
     def infect(self, location):
         """
-        Purpose:        Iterate through all neighboring cells of a single Individual in 
-                        `location` and use the `transmission_rate` parameter from the
-                        parameter file to determine if the Individual becomes infected.
+        Purpose:        Use the infection pressure on the cell in `location` and the
+                        `transmission_rate` parameter from the parameter file to
+                        determine if an Individual in that cell becomes infected.
+                        The pressure is computed once per cell per day and shared by
+                        every Individual in that cell; only the random draw is made
+                        for each Individual.
         Input:          A row-column tuple identifying a row and column in the simulation grid
         Output:         True if the Individual becomes infected. False otherwise.
         """
+        is_infected = []
+
+        # every Individual in a cell sees the same neighborhood, so look up this cell's
+        #   pressure before computing it
+        cached_pressure = self.pressure_cache.get(location)
+        if cached_pressure is None:
+            cached_pressure = self.__infection_pressure(location)
+            self.pressure_cache[location] = cached_pressure
+            self.pressure_cache_misses += 1
+        else:
+            self.pressure_cache_hits += 1
+        num_infectious_neighbors, chance_infection = cached_pressure
+
+        # someone getting infected is determined by chance based on the number
+        #   of infectious individuals in the neighborhood. For N infectious people
+        #   in your neighborhood, you have N * TRANS_RATE chance of getting infected
+        # for every disease in the disease list, determine if the individual becomes infected
+        for disease in range(self.num_diseases):
+            random_value = self.config.rng.infection.random()
+            is_infected.append(bool(random_value < chance_infection[disease]))
+        # In the end, return a list where each element is a boolean, True if individual becomes
+        #   infected, False otherwise
+        # print("is_infected:", is_infected)
+        return is_infected
+
+    def __infection_pressure(self, location):
+        """
+        Purpose:        Iterate through all neighboring cells of `location` and count the
+                        infectious individuals in that neighborhood for every disease
+        Input:          A row-column tuple identifying a row and column in the simulation grid
+        Output:         A tuple of two lists, indexed by disease: the number of infectious
+                        neighbors, and the chance (`num_infectious_neighbors` * TRANS_RATE)
+                        an Individual in `location` becomes infected
+        """
         row, col = location
 
         single_cell_sum = 0
         vonNeumann_sum = 0
         moore_sum = 0
         num_infectious_neighbors = []
-        is_infected = []
 
-        # unit test: prints the entire neighborhood of a spot
-        for mini_row in range(row-1,row+2):
-            for mini_col in range(col-1,col+2):
-                self.outfile.write('[')
-                for individual in self.sim_grid[mini_row][mini_col]:
-                    self.outfile.write(str(individual.id)+':'+str(individual.state_of_health))
-                self.outfile.write(']')
-            self.outfile.write('\n')
-        
         #########################################################################################
         #   THIS PROCESS COULD BE MADE MORE EFFICIENT BY ONLY RUNNING IF THE INDIVIDUAL IS      #
         #   SUSCEPTIBLE IN A PARTICULAR DISEASE. THE ONLY PROBLEM: IF THE PERSON IS             #
@@ -300,7 +402,7 @@ class Cellular_Automaton():
         #   NEIGHBOR COUNT APPENDED TO IT?                                                      #
         #########################################################################################
 
-        for disease in range(len(DISEASE_LIST)):
+        for disease in range(self.num_diseases):
             # count the number of infectious individuals in the same cell as the Individual
             #   This strat is not a part of the von Neumann or Moore neighborhood, but
             #   Individuals in the same cell are considered neighbors in this simulation
@@ -308,47 +410,114 @@ class Cellular_Automaton():
             #   infectious individuals for each disease being modeled
             #   e.g. single_cell_sum = [0, 3] if there are two diseases being modelled and three
             #   infectious individuals of disease #2 are in that cell
-            single_cell_sum = self.infectious_count_grid[row][col][disease]
+            single_cell_sum = self.infectious_count_grid[row, col, disease]
             # if using the von Neumann method, sum the number of infectious neighbors in the
             #   north, south, east, and west cells
-            if DISEASE_LIST[disease]["NEIGHBORHOOD"] > 0:
-                vonNeumann_sum = self.infectious_count_grid[row][col+1][disease] + \
-                    self.infectious_count_grid[row-1][col][disease] + \
-                    self.infectious_count_grid[row][col-1][disease] + \
-                    self.infectious_count_grid[row+1][col][disease]
+            if self.config.DISEASE_LIST[disease]["NEIGHBORHOOD"] > 0:
+                vonNeumann_sum = self.infectious_count_grid[row, col+1, disease] + \
+                    self.infectious_count_grid[row-1, col, disease] + \
+                    self.infectious_count_grid[row, col-1, disease] + \
+                    self.infectious_count_grid[row+1, col, disease]
 
             # if using the Moore method, add the number of infectious neighbors in the corner cells
-            if DISEASE_LIST[disease]["NEIGHBORHOOD"] == 2:
-                moore_sum = self.infectious_count_grid[row-1][col+1][disease] + \
-                    self.infectious_count_grid[row-1][col-1][disease] +\
-                    self.infectious_count_grid[row+1][col-1][disease] + \
-                    self.infectious_count_grid[row+1][col+1][disease]
+            if self.config.DISEASE_LIST[disease]["NEIGHBORHOOD"] == 2:
+                moore_sum = self.infectious_count_grid[row-1, col+1, disease] + \
+                    self.infectious_count_grid[row-1, col-1, disease] +\
+                    self.infectious_count_grid[row+1, col-1, disease] + \
+                    self.infectious_count_grid[row+1, col+1, disease]
 
             # this reflects the total number of infectious individuals for each disease
             #   based on the neighborhood stategy
             num_infectious_neighbors.append(single_cell_sum + vonNeumann_sum + moore_sum)
 
         # print("There are", num_infectious_neighbors, "in position", location)
-        # someone getting infected is determined by chance based on the number
-        #   of infectious individuals in the neighborhood. For N infectious people
-        #   in your neighborhood, you have N * TRANS_RATE chance of getting infected
-        seed(a=None, version=2)
-        # for every disease in the disease list, determine if the individual becomes infected
-        for disease in range(len(DISEASE_LIST)):
-            random_value = random()
-            chance_infection = num_infectious_neighbors[disease]*DISEASE_LIST[disease]["TRANS_RATE"]
-            self.outfile.write(str(random_value)+'<'+str(chance_infection)+'? | ')
-            is_infected.append(bool(random_value < chance_infection))
-        self.outfile.write('\n')
-        # In the end, return a list where each element is a boolean, True if individual becomes
-        #   infected, False otherwise
-        # print("is_infected:", is_infected)
-        for disease in range(2):
-            self.outfile.write(str(num_infectious_neighbors[disease])+', ')
-            self.outfile.write(str(is_infected[disease])+', ')
-        self.outfile.write('\n\n')
-        
-        return is_infected
+        chance_infection = [num_infectious_neighbors[disease]*self.config.DISEASE_LIST[disease]["TRANS_RATE"] \
+            for disease in range(self.num_diseases)]
+        return num_infectious_neighbors, chance_infection
+
+    def checkpoint_state(self):
+        """
+        Purpose:    Collect everything needed to continue the simulation from the end of the current
+                    day. The occupancy index and infectious counts aren't saved, since they are
+                    rebuilt from the individuals
+        Input:      None
+        Output:     A dictionary of NumPy arrays
+        """
+        state = self.individuals.checkpoint_state()
+        state["num_days"] = np.array(self.num_days)
+        state["state_list"] = np.array(self.state_list, dtype=np.int64)
+        state["arrival"] = self.arrival
+        state["next_arrival"] = np.array(self.next_arrival)
+        state["pressure_cache_history"] = np.array(self.pressure_cache_history, dtype=np.int64).reshape(-1, 2)
+        return state
+
+    @classmethod
+    def from_checkpoint(cls, state, config=None):
+        """
+        Purpose:    Recreate an automaton from the arrays `checkpoint_state` returned, without
+                    drawing any random numbers or finding any paths
+        Input:      The dictionary of arrays (e.g. loaded from a checkpoint), and the config of the
+                    simulation (by default, the one in `constants.py`)
+        Output:     A `Cellular_Automaton` ready to process its next day
+        """
+        self = cls.__new__(cls)
+        self.config = config if config is not None else constants.current_config()
+        self.num_diseases = len(self.config.DISEASE_LIST)
+        self.num_days = int(state["num_days"])
+        self.population = self.config.POPULATION
+        self.individuals = Population(self.num_diseases, self.config)
+        self.individuals.restore_state(state)
+        self.state_list = state["state_list"].tolist()
+        self.sparse = self.config.GRID_MODE == "sparse"
+        self.occupancy = Occupancy_Index(self.config.NUM_ROWS_FULL, self.config.NUM_COLS_FULL, self.sparse)
+        self.arrival = state["arrival"].astype(np.int64)
+        self.next_arrival = int(state["next_arrival"])
+        self.__rebuild_occupancy()
+        self.infectious_count_grid = self.__count_num_infectious()
+        self.pressure_cache = {}
+        self.pressure_cache_hits = 0
+        self.pressure_cache_misses = 0
+        self.pressure_cache_history = state["pressure_cache_history"].tolist()
+        return self
+
+    def individual_states(self):
+        """
+        Purpose:    Hand out every individual's variables that the day's counts can be broken
+                    down by. Like `process_day`, only the individuals inside the grid's border count
+        Input:      None
+        Output:     A tuple of a (population, disease) array of states of health, and arrays of
+                    each individual's age group (see `Population.ages`), row, and column
+        """
+        individuals = self.individuals
+        rows = np.frombuffer(individuals.rows, dtype=np.uint16)
+        cols = np.frombuffer(individuals.cols, dtype=np.uint16)
+        inside = (rows > 0) & (rows < self.config.ROW_LIMIT) & (cols > 0) & (cols < self.config.COL_LIMIT)
+        state_of_health = np.frombuffer(individuals.state_of_health, dtype=np.int8).reshape(-1, individuals.num_diseases)
+        ages = np.frombuffer(individuals.ages, dtype=np.uint8)
+        return state_of_health[inside], ages[inside].astype(np.int64), rows[inside], cols[inside]
+
+    def occupied_cells(self):
+        """
+        Purpose:    Walk through every occupied cell of the simulation grid (inside its border),
+                    for the Visualizer and anything else that needs to see who is where
+        Input:      None
+        Output:     A generator of (row, col, list of the `Individual`s in the cell)
+        """
+        for row, col, individuals in self.occupancy.cells():
+            if 0 < row < self.config.ROW_LIMIT and 0 < col < self.config.COL_LIMIT:
+                yield row, col, [Individual(self.individuals, index) for index in individuals.tolist()]
+
+    @property
+    def sim_grid(self):
+        """
+        Purpose:    Build the simulation grid as a 2D list of lists of the `Individual`s in each cell
+        Input:      None
+        Output:     A list of NUM_ROWS_FULL rows of NUM_COLS_FULL lists
+        """
+        sim_grid = [[[] for col in range(self.config.NUM_COLS_FULL)] for row in range(self.config.NUM_ROWS_FULL)]
+        for row, col, individuals in self.occupied_cells():
+            sim_grid[row][col] = individuals
+        return sim_grid
 
     # def get_sim_grid(self):
     #     """
@@ -361,10 +530,11 @@ class Cellular_Automaton():
 
     def debug_print(self):
         # print the entire grid, including the borders
-        for x in range(NUM_COLS_FULL):
-            for y in range(NUM_ROWS_FULL):
+        sim_grid = self.sim_grid
+        for row in range(self.config.NUM_ROWS_FULL):
+            for col in range(self.config.NUM_COLS_FULL):
                 print('[', end='')
-                for individual in self.sim_grid[x][y]:
+                for individual in sim_grid[row][col]:
                     print(individual.state_of_health, end=',')
                 print(']', end='')
             print('\n')
@@ -0,0 +1,88 @@
+"""
+Module:     Checkpoint.py
+Purpose:    To save the full state of a running simulation to a compact binary snapshot, and load
+            it again, so a long run can be resumed after an interruption or branched into
+            "what-if" runs from the middle of an epidemic
+"""
+
+from itertools import chain
+from json import dumps, loads
+from os import fsync, replace
+import numpy as np
+
+# the version of the layout below. Checkpoints of any other version are refused
+VERSION = 2
+
+# the length saved for a path that hasn't been found yet (individuals only find their first path
+#       when they first move)
+PATH_NOT_FOUND = 0xFFFFFFFF
+
+def flatten_paths(paths):
+    """
+    Purpose:    Pack a list of paths into two arrays, so they can be saved without pickling
+    Input:      A list of paths, each a sequence of (x, y) spots, or None for a path that hasn't been
+                found yet
+    Output:     A tuple of a uint32 array of each path's length (`PATH_NOT_FOUND` for None) and a (spot, 2) uint16 array of
+                every path's spots, one path after the other
+    """
+    lengths = np.fromiter((PATH_NOT_FOUND if path is None else len(path) for path in paths), dtype=np.uint32, count=len(paths))
+    spots = np.fromiter(chain.from_iterable(chain.from_iterable(path for path in paths if path is not None)), dtype=np.uint16, \
+        count=2 * int(lengths[lengths != PATH_NOT_FOUND].sum()))
+    return lengths, spots.reshape(-1, 2)
+
+def unflatten_paths(lengths, spots):
+    """
+    Purpose:    Unpack the arrays `flatten_paths` made
+    Input:      The array of path lengths and the array of spots
+    Output:     A list of paths, each a tuple of (x, y) tuples (or None)
+    """
+    spots = spots.tolist()
+    paths = []
+    start = 0
+    for length in lengths.tolist():
+        if length == PATH_NOT_FOUND:
+            paths.append(None)
+            continue
+        paths.append(tuple(map(tuple, spots[start:start + length])))
+        start += length
+    return paths
+
+def save_checkpoint(file_name, automaton, history, rng, event_log, meta):
+    """
+    Purpose:    Write a checkpoint. It is written next to its final name, flushed to disk, and then
+                renamed over it, so an interruption in the middle of a save leaves the previous
+                checkpoint untouched
+    Input:      The file to write, the automaton (anything with `checkpoint_state` and `num_days`),
+                the list of every day's `state_list` so far, the random number streams, the event
+                log, and a dictionary of anything else to record (e.g. the engine and grid size)
+    Output:     None
+    """
+    # every record logged so far has to be on disk, so resuming can cut the log off right here
+    event_log.flush()
+    generator_states, buffers = rng.get_state()
+    meta = dict(meta, version=VERSION, day=automaton.num_days, seed=rng.seed, rng=generator_states, \
+        event_log_records=event_log.records_written)
+    arrays = automaton.checkpoint_state()
+    for name, buffer in buffers.items():
+        arrays["rng_" + name] = buffer
+    arrays["history"] = np.array(history, dtype=np.int64)
+    with open(file_name + ".tmp", 'wb') as outfile:
+        np.savez(outfile, meta=np.array(dumps(meta)), **arrays)
+        outfile.flush()
+        fsync(outfile.fileno())
+    replace(file_name + ".tmp", file_name)
+
+def load_checkpoint(file_name):
+    """
+    Purpose:    Read a checkpoint written by `save_checkpoint`
+    Input:      The path to the checkpoint
+    Output:     A tuple of the checkpoint's `meta` dictionary and a dictionary of its arrays (the
+                random number streams' buffers are in `meta["buffers"]`)
+    """
+    with np.load(file_name, allow_pickle=False) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files}
+    meta = loads(arrays.pop("meta").item())
+    if meta.get("version") != VERSION:
+        raise ValueError(file_name + " is a version " + str(meta.get("version")) + " checkpoint, but only version " + str(VERSION) + " can be read")
+    meta["buffers"] = {name[len("rng_"):]: arrays.pop(name) for name in list(arrays) if name.startswith("rng_")}
+    return meta, arrays
@@ -0,0 +1,256 @@
+"""
+Module:     Event_Log.py
+Purpose:    To record what happens to every individual during a simulation (their creation,
+            state transitions, infection draws, and movement) in one buffered binary file of
+            fixed-width records, and to read those records back into per-individual histories
+"""
+
+from os.path import getsize, isfile
+import numpy as np
+
+# the logging levels. Each level records its own events and every event of the levels below it
+LEVEL_OFF = 0
+LEVEL_TRANSITIONS = 1
+LEVEL_EXPOSURES = 2
+LEVEL_MOVES = 3
+
+# the kinds of events, stored in each record's `event` field
+EVENT_CREATED = 0
+EVENT_TRANSITION = 1
+EVENT_EXPOSURE = 2
+EVENT_MOVE = 3
+EVENT_NAMES = {EVENT_CREATED: "created", EVENT_TRANSITION: "transition", EVENT_EXPOSURE: "exposure", EVENT_MOVE: "move"}
+
+# the layout of one record. Fields that don't apply to an event are left as zero
+#       `old_state`, `new_state`:   the state of health before and after a transition, or the state
+#                                   of health an individual is created with (`new_state`)
+#       `value`:                    the chance of infection of an exposure
+#       `detail`:                   the latent period, infectious period, and immunity duration of
+#                                   a created individual, or 1 in `detail[0]` if an exposure infected them
+RECORD_DTYPE = np.dtype([
+    ("day", "<u4"),
+    ("id", "<u4"),
+    ("event", "u1"),
+    ("disease", "u1"),
+    ("old_state", "i1"),
+    ("new_state", "i1"),
+    ("row", "<u2"),
+    ("col", "<u2"),
+    ("value", "<f4"),
+    ("detail", "<i2", (3,))
+])
+
+# written at the start of every event log so the reader can tell it is one
+FILE_MAGIC = b"SLIREVT1"
+
+def batch_records(event, day, ids, disease=0, old_state=0, new_state=0, rows=0, cols=0, value=0.0, detail=0):
+    """
+    Purpose:    Build many records of the same kind at once (see `Event_Log.record_batch`)
+    Input:      One of the EVENT_ constants, the day, an array of individual ids, and the record
+                fields, each a single value or an array as long as `ids`
+    Output:     A NumPy array of records
+    """
+    records = np.zeros(len(ids), dtype=RECORD_DTYPE)
+    records["day"], records["id"], records["event"], records["disease"] = day, ids, event, disease
+    records["old_state"], records["new_state"], records["row"], records["col"] = old_state, new_state, rows, cols
+    records["value"] = value
+    # a one dimensional `detail` only fills the first detail field (e.g. whether an exposure infected)
+    if np.ndim(detail) == 1:
+        records["detail"][:, 0] = detail
+    else:
+        records["detail"] = detail
+    return records
+
+class Event_Log():
+    """
+    class:      Event_Log
+    input:      `path`: the file the records are written to
+                `level`: one of the LEVEL_ constants. Nothing is recorded (or opened) at LEVEL_OFF
+                `buffer_records`: how many records are held in memory before they are written
+    purpose:    Records are collected in a preallocated NumPy buffer and written to disk in one
+                call when it fills up. Callers check the `transitions`, `exposures`, and `moves`
+                booleans before building a record, so a disabled event log costs one attribute
+                lookup per check.
+    """
+    def __init__(self, path, level=LEVEL_OFF, buffer_records=65536):
+        self.path = path
+        self.level = level
+        # which kinds of events are being recorded
+        self.transitions = level >= LEVEL_TRANSITIONS
+        self.exposures = level >= LEVEL_EXPOSURES
+        self.moves = level >= LEVEL_MOVES
+
+        self.buffer = np.zeros(buffer_records, dtype=RECORD_DTYPE)
+        self.buffer_count = 0
+        # how many records have been written to the log file
+        self.records_written = 0
+        # the log file is only opened once there is something to write to it
+        self.outfile = None
+
+    def transition(self, day, iden, disease, old_state, new_state, location):
+        """
+        Purpose:    Record an individual moving on to the next stage of a disease
+        Input:      The day, the individual's id, the disease, their state of health before and after,
+                    and their (row, col) location
+        Output:     None
+        """
+        record = self.__next_record()
+        record["day"], record["id"], record["event"], record["disease"] = day, iden, EVENT_TRANSITION, disease
+        record["old_state"], record["new_state"], record["row"], record["col"] = old_state, new_state, location[0], location[1]
+
+    def exposure(self, day, iden, disease, location, chance, infected):
+        """
+        Purpose:    Record the infection draw of a susceptible individual with infectious neighbors
+        Input:      The day, the individual's id, the disease, their (row, col) location, their chance
+                    of infection, and True if the draw infected them
+        Output:     None
+        """
+        record = self.__next_record()
+        record["day"], record["id"], record["event"], record["disease"] = day, iden, EVENT_EXPOSURE, disease
+        record["row"], record["col"], record["value"] = location[0], location[1], chance
+        record["detail"][0] = infected
+
+    def move(self, day, iden, location):
+        """
+        Purpose:    Record an individual stepping to a new location
+        Input:      The day, the individual's id, and their new (row, col) location
+        Output:     None
+        """
+        record = self.__next_record()
+        record["day"], record["id"], record["event"] = day, iden, EVENT_MOVE
+        record["row"], record["col"] = location[0], location[1]
+
+    def record_batch(self, event, day, ids, disease=0, old_state=0, new_state=0, rows=0, cols=0, value=0.0, detail=0):
+        """
+        Purpose:    Record many events of the same kind at once. Every argument after `ids` may be
+                    a single value or an array as long as `ids`
+        Input:      One of the EVENT_ constants, the day, an array of individual ids, and the record
+                    fields (see `RECORD_DTYPE`)
+        Output:     None
+        """
+        self.write_records(batch_records(event, day, ids, disease, old_state, new_state, rows, cols, value, detail))
+
+    def write_records(self, records):
+        """
+        Purpose:    Record an array of records that were already built, e.g. by `batch_records`
+        Input:      A NumPy array of records (see `RECORD_DTYPE`)
+        Output:     None
+        """
+        # write whatever is buffered first so the records stay in order
+        self.flush()
+        self.__write(records)
+
+    def flush(self):
+        """
+        Purpose:    Write every buffered record to the log file
+        Input:      None
+        Output:     None
+        """
+        if self.buffer_count:
+            self.__write(self.buffer[:self.buffer_count])
+            # the buffer is reused, so clear the fields the written records set
+            self.buffer[:self.buffer_count] = 0
+            self.buffer_count = 0
+
+    def resume(self, num_records):
+        """
+        Purpose:    Continue a log file a checkpoint was taken of, dropping every record written
+                    after the checkpoint. If the file isn't there (e.g. a branch writing to a new
+                    output folder), the log starts over with the records after the checkpoint
+        Input:      The number of records the log file held when the checkpoint was taken
+        Output:     None
+        """
+        self.close()
+        if self.level == LEVEL_OFF or not isfile(self.path):
+            return
+        size = len(FILE_MAGIC) + num_records * RECORD_DTYPE.itemsize
+        if getsize(self.path) < size:
+            raise ValueError(self.path + " holds fewer records than it did when the checkpoint was taken")
+        self.outfile = open(self.path, 'r+b')
+        self.outfile.truncate(size)
+        self.outfile.seek(0, 2)
+        self.records_written = num_records
+
+    def close(self):
+        """
+        Purpose:    Write every buffered record and close the log file
+        Input:      None
+        Output:     None
+        """
+        self.flush()
+        if self.outfile is not None:
+            self.outfile.close()
+            self.outfile = None
+
+    def __next_record(self):
+        """
+        Purpose:    Hand out the next free record in the buffer, writing the buffer out when it is full
+        Input:      None
+        Output:     A writable view of one record
+        """
+        if self.buffer_count == len(self.buffer):
+            self.flush()
+        record = self.buffer[self.buffer_count]
+        self.buffer_count += 1
+        return record
+
+    def __write(self, records):
+        """
+        Purpose:    Append records to the log file, opening it (and writing its header) the first time
+        Input:      A NumPy array of records
+        Output:     None
+        """
+        if self.outfile is None:
+            self.outfile = open(self.path, 'wb')
+            self.outfile.write(FILE_MAGIC)
+        records.tofile(self.outfile)
+        self.records_written += len(records)
+
+"""
+ /$$$$$$$                            /$$
+| $$__  $$                          | $$
+| $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$   /$$$$$$
+| $$$$$$$/ /$$__  $$ |____  $$ /$$__  $$ /$$__  $$ /$$__  $$
+| $$__  $$| $$$$$$$$  /$$$$$$$| $$  | $$| $$$$$$$$| $$  \__/
+| $$  \ $$| $$_____/ /$$__  $$| $$  | $$| $$_____/| $$
+| $$  | $$|  $$$$$$$|  $$$$$$$|  $$$$$$$|  $$$$$$$| $$
+|__/  |__/ \_______/ \_______/ \_______/ \_______/|__/
+"""
+
+def read_events(path):
+    """
+    Purpose:    Load an event log without copying it into memory
+    Input:      The path to an event log written by `Event_Log`
+    Output:     A read-only NumPy array of records (see `RECORD_DTYPE`)
+    """
+    with open(path, 'rb') as infile:
+        if infile.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(path + " is not an event log")
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=len(FILE_MAGIC))
+
+def individual_history(events, iden):
+    """
+    Purpose:    Collect every record of one individual, in the order they were recorded
+    Input:      The records from `read_events` and the individual's id
+    Output:     A NumPy array of records
+    """
+    return events[events["id"] == iden]
+
+def describe(record):
+    """
+    Purpose:    Turn one record into a line of text
+    Input:      One record from `read_events`
+    Output:     A string
+    """
+    line = "day " + str(record["day"]) + ": " + EVENT_NAMES[int(record["event"])]
+    location = " at " + str((int(record["row"]), int(record["col"])))
+    if record["event"] == EVENT_CREATED:
+        latent, infectious, immunity = record["detail"]
+        return line + " with state " + str(record["new_state"]) + " of disease " + str(record["disease"]) + location + \
+            " (latent period: " + str(latent) + ", infectious period: " + str(infectious) + ", immunity duration: " + str(immunity) + ")"
+    if record["event"] == EVENT_TRANSITION:
+        return line + " of disease " + str(record["disease"]) + " from " + str(record["old_state"]) + " to " + str(record["new_state"]) + location
+    if record["event"] == EVENT_EXPOSURE:
+        return line + " to disease " + str(record["disease"]) + location + " with a " + str(round(float(record["value"]), 4)) + \
+            " chance of infection: " + ("infected" if record["detail"][0] else "not infected")
+    return line + " to " + location[4:]
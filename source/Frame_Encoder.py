@@ -0,0 +1,269 @@
+"""
+Module:     Frame_Encoder.py
+Purpose:    To encode the Visualizer's frames into an animation as they are drawn, through a short
+            queue and a background thread, instead of saving every frame as an image and reading
+            them all back at the end
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from queue import Queue
+from struct import pack
+from threading import Thread
+from zlib import compress, crc32
+from PIL import Image
+from PIL.GifImagePlugin import getheader, getdata
+import numpy as np
+
+# the animation formats and the extension of each. "mp4" needs the `imageio-ffmpeg` package
+EXTENSIONS = {"gif": ".gif", "apng": ".png", "mp4": ".mp4"}
+
+def make_palette(samples, colors=256):
+    """
+    Purpose:    Choose one palette for every frame of an animation, so a color never flickers
+                between frames
+    Input:      A list of (row, col, 3) uint8 arrays holding the colors the frames are made of
+                (e.g. the background and the tiles), and how many colors the palette holds (2 to 256)
+    Output:     A "P" mode PIL image whose palette is the chosen one, for `Image.quantize`
+    """
+    pixels = np.concatenate([np.asarray(sample, dtype=np.uint8).reshape(-1, 3) for sample in samples])
+    return Image.fromarray(pixels[None]).quantize(colors, dither=Image.Dither.NONE)
+
+class GIF_Writer():
+    """
+    class:      GIF_Writer
+    input:      `file_name`: the .gif to write
+                `fps`: frames per second
+                `palette`: the palette image from `make_palette`, shared by every frame
+    purpose:    Writes a looping GIF one frame at a time. PIL only writes animated GIFs from a list of
+                every frame, so its header and frame encoders are used directly instead, and the
+                file is only ever a frame behind the simulation.
+    """
+    def __init__(self, file_name, fps, palette):
+        self.outfile = open(file_name, 'wb')
+        self.duration = int(round(1000 / fps))
+        self.palette = palette
+        self.num_frames = 0
+
+    def append_data(self, image):
+        """
+        Purpose:    Add a frame to the animation
+        Input:      The frame, as an RGB or already quantized PIL image
+        Output:     None
+        """
+        if image.mode != "P":
+            image = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        if self.num_frames == 0:
+            header, _ = getheader(image, info={"loop": 0, "duration": self.duration, "optimize": False})
+            self.outfile.write(b"".join(header))
+        self.outfile.write(b"".join(getdata(image, duration=self.duration)))
+        self.num_frames += 1
+
+    def close(self):
+        self.outfile.write(b";")
+        self.outfile.close()
+
+class APNG_Writer():
+    """
+    class:      APNG_Writer
+    input:      `file_name`: the .png to write
+                `fps`: frames per second
+                `palette`: the palette image from `make_palette` to store every frame as one byte
+                per pixel, or None to store RGB
+    purpose:    Writes a looping animated PNG one frame at a time. The number of frames goes in the
+                file's header, so it is written as zero and filled in when the file is closed.
+    """
+    def __init__(self, file_name, fps, palette=None):
+        self.outfile = open(file_name, 'wb')
+        self.fps = fps
+        self.palette = palette
+        self.num_frames = 0
+        # every fcTL and fdAT chunk is numbered, in the order they are written
+        self.sequence = 0
+        self.actl_position = None
+
+    def append_data(self, image):
+        """
+        Purpose:    Add a frame to the animation
+        Input:      The frame, as a PIL image
+        Output:     None
+        """
+        if self.palette is not None and image.mode != "P":
+            image = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        elif self.palette is None:
+            image = image.convert("RGB")
+        width, height = image.size
+        if self.num_frames == 0:
+            self.__write_header(width, height)
+        # every row starts with its filter type, 0 (none)
+        pixels = np.asarray(image).reshape(height, -1)
+        rows = np.zeros((height, pixels.shape[1] + 1), dtype=np.uint8)
+        rows[:, 1:] = pixels
+        data = compress(rows.tobytes(), 6)
+        self.__write_chunk(b"fcTL", pack(">IIIIIHHBB", self.__next_sequence(), width, height, 0, 0, 1, self.fps, 0, 0))
+        if self.num_frames == 0:
+            self.__write_chunk(b"IDAT", data)
+        else:
+            self.__write_chunk(b"fdAT", pack(">I", self.__next_sequence()) + data)
+        self.num_frames += 1
+
+    def close(self):
+        self.__write_chunk(b"IEND", b"")
+        if self.actl_position is not None:
+            self.outfile.seek(self.actl_position)
+            self.__write_chunk(b"acTL", pack(">II", self.num_frames, 0))
+        self.outfile.close()
+
+    def __write_header(self, width, height):
+        """
+        Purpose:    Write the PNG signature, the image header, the palette, and a placeholder for
+                    the number of frames
+        Input:      The size of the frames
+        Output:     None
+        """
+        self.outfile.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bits per sample, and color type 3 (palette) or 2 (RGB)
+        self.__write_chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 3 if self.palette is not None else 2, 0, 0, 0))
+        if self.palette is not None:
+            self.__write_chunk(b"PLTE", bytes(self.palette.getpalette()[:3 * 256]))
+        self.actl_position = self.outfile.tell()
+        self.__write_chunk(b"acTL", pack(">II", 0, 0))
+
+    def __write_chunk(self, kind, data):
+        self.outfile.write(pack(">I", len(data)) + kind + data + pack(">I", crc32(kind + data)))
+
+    def __next_sequence(self):
+        self.sequence += 1
+        return self.sequence - 1
+
+class MP4_Writer():
+    """
+    class:      MP4_Writer
+    input:      `writer`: an imageio writer of an ".mp4" file
+    purpose:    Hands PIL images to the imageio writer as the arrays it expects
+    """
+    def __init__(self, writer):
+        self.writer = writer
+
+    def append_data(self, image):
+        self.writer.append_data(np.asarray(image.convert("RGB")))
+
+    def close(self):
+        self.writer.close()
+
+def check_mp4_support():
+    """
+    Purpose:    Make sure the packages the "mp4" format needs are installed, without importing
+                them, so a run that can't save its animation stops before day zero instead of at
+                its first frame
+    Input:      None
+    Output:     None
+    """
+    missing = [package for package, module in (("imageio", "imageio"), ("imageio-ffmpeg", "imageio_ffmpeg")) if find_spec(module) is None]
+    if missing:
+        raise ValueError("The \"mp4\" animation format needs the " + " and ".join("`" + package + "`" for package in missing) + \
+            " package" + ("s" if len(missing) > 1 else "") + " (pip install " + " ".join(missing) + "). Use \"gif\" or \"apng\" without it.")
+
+def open_writer(file_name, file_format, fps, palette):
+    """
+    Purpose:    Open the writer of an animation format
+    Input:      The file to write (with its extension), the format (see `EXTENSIONS`), the frames
+                per second, and the palette image (None for "mp4", and for RGB "apng" frames)
+    Output:     An object with `append_data(image)` and `close()`
+    """
+    if file_format == "gif":
+        return GIF_Writer(file_name, fps, palette)
+    if file_format == "apng":
+        return APNG_Writer(file_name, fps, palette)
+    if file_format == "mp4":
+        # only imported here, since only this format needs imageio's ffmpeg plugin
+        check_mp4_support()
+        from imageio import get_writer
+        return MP4_Writer(get_writer(file_name, fps=fps))
+    raise ValueError("Unknown animation format \"" + str(file_format) + "\". Use \"gif\", \"apng\", or \"mp4\".")
+
+class Frame_Encoder():
+    """
+    class:      Frame_Encoder
+    input:      `file_name`: the animation to write, without its extension
+                `file_format`: "gif", "apng", or "mp4"
+                `fps`: frames per second
+                `size`: the (width, height) of the animation, or None to keep the frames' size
+                `palette`: the palette image from `make_palette` every frame is quantized to, or
+                None (a GIF always needs one)
+                `workers`: the number of threads resizing and quantizing frames
+                `queue_frames`: how many frames may wait to be encoded before `add_frame` waits
+    purpose:    Frames are resized and quantized by a pool of threads and handed, in order, through
+                a bounded queue to one thread that appends them to the file. The simulation only
+                waits when the queue is full, so memory stays bounded however long the run is.
+    """
+    def __init__(self, file_name, file_format="gif", fps=10, size=None, palette=None, workers=2, queue_frames=8):
+        if file_format not in EXTENSIONS:
+            raise ValueError("Unknown animation format \"" + str(file_format) + "\". Use \"gif\", \"apng\", or \"mp4\".")
+        if file_format == "gif" and palette is None:
+            raise ValueError("A GIF needs a palette")
+        self.path = file_name + EXTENSIONS[file_format]
+        self.size = size
+        self.palette = palette
+        self.writer = open_writer(self.path, file_format, fps, palette)
+        self.pool = ThreadPoolExecutor(max(1, workers))
+        self.queue = Queue(max(1, queue_frames))
+        # the first error the encoding thread runs into, raised again by `close`
+        self.error = None
+        self.thread = Thread(target=self.__encode, daemon=True)
+        self.thread.start()
+
+    def add_frame(self, frame):
+        """
+        Purpose:    Queue a frame to be encoded, waiting if the queue is full
+        Input:      The frame, as a (row, col, 3) uint8 array (copied, so the caller can keep
+                    drawing on it) or a PIL image
+        Output:     None
+        """
+        image = frame if isinstance(frame, Image.Image) else Image.fromarray(np.array(frame))
+        self.queue.put(self.pool.submit(self.__prepare, image))
+
+    def close(self):
+        """
+        Purpose:    Encode every queued frame and close the file
+        Input:      None
+        Output:     None
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.pool.shutdown()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+    def __prepare(self, image):
+        """
+        Purpose:    Resize and quantize a frame (in one of the pool's threads)
+        Input:      The frame, as a PIL image
+        Output:     The prepared PIL image
+        """
+        if self.size is not None and image.size != self.size:
+            image = image.resize(self.size)
+        if self.palette is not None:
+            image = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        return image
+
+    def __encode(self):
+        """
+        Purpose:    Append the prepared frames to the file in the order they were added, until
+                    `close` queues None
+        Input:      None
+        Output:     None
+        """
+        while True:
+            future = self.queue.get()
+            if future is None:
+                return
+            # after an error the rest of the frames are still taken off the queue, so the
+            #       simulation is never stuck waiting for room in it
+            if self.error is not None:
+                continue
+            try:
+                self.writer.append_data(future.result())
+            except Exception as error:
+                self.error = error
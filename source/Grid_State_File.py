@@ -0,0 +1,220 @@
+"""
+Module:     Grid_State_File.py
+Purpose:    To export every day's occupied cells as a histogram of their occupants' states of
+            health, in one append-only binary file that is memory-mapped to read, so frames,
+            heatmaps, and animations can be drawn after the run, in any order and in parallel,
+            instead of slowing the simulation down
+"""
+
+from os.path import getsize, isfile
+import struct
+import numpy as np
+
+# the first bytes of every grid state file, and the version of the layout below
+MAGIC = b"SLIRGRID"
+VERSION = 1
+# magic, version, the number of diseases, and the number of rows and columns of the simulation
+#       grid (without its border), padded so the records start on a 32 byte boundary
+HEADER = struct.Struct("<8sHHII")
+HEADER_SIZE = 32
+
+# the number of states of health a disease can be in (susceptible, latent, infectious, recovered, immune)
+NUM_STATES = 5
+
+# the layout of one record: how many individuals in one cell on one day share one combination of
+#       states of health. `combination` packs the states of every disease into one number (see
+#       `combination_states`). Records are written in order of day, then row, then column
+RECORD_DTYPE = np.dtype([
+    ("day", "<u4"),
+    ("row", "<u2"),
+    ("col", "<u2"),
+    ("combination", "<u2"),
+    ("count", "<u2")
+])
+
+def combination_states(combination, num_diseases):
+    """
+    Purpose:    Unpack a record's `combination` into the states of health it stands for
+    Input:      The combination and the number of diseases
+    Output:     A tuple of the state of health of each disease
+    """
+    return tuple(int(combination) // NUM_STATES**disease % NUM_STATES for disease in range(num_diseases))
+
+class Grid_State_Writer():
+    """
+    class:      Grid_State_Writer
+    input:      `path`: the file the records are written to
+                `num_rows`, `num_cols`: the size of the simulation grid without its border
+                `num_diseases`: how many diseases every individual has a state of health for
+                `first_day`: the first day that will be written. When it isn't zero (continuing
+                from a checkpoint) and the file is already there, the records of that day and
+                after are dropped and the file is continued
+                `buffer_records`: how many records are held in memory before they are written
+    purpose:    Each day, the individuals are grouped by cell and combination of states of health
+                in a few whole-array operations, so a day costs one record per distinct
+                (cell, combination) instead of one per individual, and nothing for an empty cell.
+    """
+    def __init__(self, path, num_rows, num_cols, num_diseases, first_day=0, buffer_records=65536):
+        if NUM_STATES**num_diseases > 65536:
+            raise ValueError("The grid state file can't hold the states of " + str(num_diseases) + " diseases (at most 6)")
+        self.path = path
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_diseases = num_diseases
+        self.header = HEADER.pack(MAGIC, VERSION, num_diseases, num_rows, num_cols).ljust(HEADER_SIZE, b'\0')
+        # the value of each disease's state in a packed combination
+        self.place_values = NUM_STATES ** np.arange(num_diseases, dtype=np.int64)
+
+        self.buffer = np.zeros(buffer_records, dtype=RECORD_DTYPE)
+        self.buffer_count = 0
+        self.outfile = None
+        if first_day and isfile(path):
+            self.__resume(first_day)
+
+    def write_day(self, day, simulation_grid):
+        """
+        Purpose:    Add the records of one day
+        Input:      The day and the automaton (anything with `individual_states`)
+        Output:     None
+        """
+        state_of_health, _, rows, cols = simulation_grid.individual_states()
+        combinations = state_of_health.astype(np.int64) @ self.place_values
+        # one key per (cell, combination), sorted by row, then column, then combination
+        keys = (rows.astype(np.int64) * (self.num_cols + 2) + cols) * NUM_STATES**self.num_diseases + combinations
+        keys, counts = np.unique(keys, return_counts=True)
+        cells, combinations = np.divmod(keys, NUM_STATES**self.num_diseases)
+        records = np.zeros(len(keys), dtype=RECORD_DTYPE)
+        records["day"] = day
+        records["row"], records["col"] = np.divmod(cells, self.num_cols + 2)
+        records["combination"], records["count"] = combinations, counts
+        if self.buffer_count + len(records) > len(self.buffer):
+            self.flush()
+        if len(records) > len(self.buffer):
+            self.__write(records)
+            return
+        self.buffer[self.buffer_count:self.buffer_count+len(records)] = records
+        self.buffer_count += len(records)
+
+    def flush(self):
+        """
+        Purpose:    Write every buffered record to the file
+        Input:      None
+        Output:     None
+        """
+        if self.buffer_count:
+            self.__write(self.buffer[:self.buffer_count])
+            self.buffer_count = 0
+
+    def close(self):
+        """
+        Purpose:    Write every buffered record and close the file
+        Input:      None
+        Output:     None
+        """
+        self.flush()
+        if self.outfile is not None:
+            self.outfile.close()
+            self.outfile = None
+
+    def __resume(self, first_day):
+        """
+        Purpose:    Continue a file, dropping the records of `first_day` and after
+        Input:      The first day that will be written
+        Output:     None
+        """
+        header, records = read_grid_states(self.path)
+        if header != (self.num_rows, self.num_cols, self.num_diseases):
+            raise ValueError(self.path + " was written by a simulation with a different grid or number of diseases")
+        size = HEADER_SIZE + int(np.searchsorted(records["day"], first_day)) * RECORD_DTYPE.itemsize
+        del records
+        self.outfile = open(self.path, 'r+b')
+        self.outfile.truncate(size)
+        self.outfile.seek(0, 2)
+
+    def __write(self, records):
+        """
+        Purpose:    Append records to the file, opening it (and writing its header) the first time
+        Input:      A NumPy array of records
+        Output:     None
+        """
+        if self.outfile is None:
+            self.outfile = open(self.path, 'wb')
+            self.outfile.write(self.header)
+        records.tofile(self.outfile)
+
+"""
+ /$$$$$$$                            /$$
+| $$__  $$                          | $$
+| $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$   /$$$$$$
+| $$$$$$$/ /$$__  $$ |____  $$ /$$__  $$ /$$__  $$ /$$__  $$
+| $$__  $$| $$$$$$$$  /$$$$$$$| $$  | $$| $$$$$$$$| $$  \__/
+| $$  \ $$| $$_____/ /$$__  $$| $$  | $$| $$_____/| $$
+| $$  | $$|  $$$$$$$|  $$$$$$$|  $$$$$$$|  $$$$$$$| $$
+|__/  |__/ \_______/ \_______/ \_______/ \_______/|__/
+"""
+
+def read_grid_states(path):
+    """
+    Purpose:    Load a grid state file without copying it into memory
+    Input:      The path to a file written by `Grid_State_Writer`
+    Output:     A tuple of (number of rows, number of columns, number of diseases) and a read-only
+                NumPy array of records (see `RECORD_DTYPE`)
+    """
+    with open(path, 'rb') as infile:
+        header = infile.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + " is not a grid state file")
+    _, version, num_diseases, num_rows, num_cols = HEADER.unpack_from(header)
+    if version != VERSION:
+        raise ValueError(path + " is a version " + str(version) + " grid state file, but only version " + str(VERSION) + " can be read")
+    if getsize(path) == HEADER_SIZE:
+        records = np.zeros(0, dtype=RECORD_DTYPE)
+    else:
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE)
+    return (num_rows, num_cols, num_diseases), records
+
+def days(records):
+    """
+    Purpose:    List the days a file holds
+    Input:      The records from `read_grid_states`
+    Output:     A NumPy array of days, in order
+    """
+    return np.unique(records["day"])
+
+def day_records(records, day):
+    """
+    Purpose:    Find one day's records, with two binary searches instead of a scan
+    Input:      The records from `read_grid_states` and the day
+    Output:     A NumPy array of records
+    """
+    first, last = np.searchsorted(records["day"], [day, day + 1])
+    return records[first:last]
+
+def day_cells(records, day, num_diseases):
+    """
+    Purpose:    Rebuild one day's occupied cells the way the Visualizer draws them. Occupants
+                sharing a cell are listed by combination of states of health, since the order
+                they arrived in isn't kept
+    Input:      The records from `read_grid_states`, the day, and the number of diseases
+    Output:     A dictionary of (row, col) -> a tuple of the states of health of the cell's
+                occupants (see `Visualizer.draw_frame`)
+    """
+    cells = {}
+    for row, col, combination, count in day_records(records, day)[["row", "col", "combination", "count"]].tolist():
+        cells[(row, col)] = cells.get((row, col), ()) + (combination_states(combination, num_diseases),) * count
+    return cells
+
+def heatmap(records, day, num_rows, num_cols, disease=None, state=None):
+    """
+    Purpose:    Count the individuals in every cell on one day
+    Input:      The records from `read_grid_states`, the day, the size of the simulation grid,
+                and optionally a disease and the state of health of it to only count the
+                individuals in
+    Output:     A (row, col) int32 array of counts, without the grid's border
+    """
+    records = day_records(records, day)
+    if disease is not None:
+        records = records[records["combination"] // NUM_STATES**disease % NUM_STATES == state]
+    counts = np.zeros((num_rows + 2, num_cols + 2), dtype=np.int32)
+    np.add.at(counts, (records["row"], records["col"]), records["count"])
+    return counts[1:-1, 1:-1]
@@ -4,26 +4,42 @@ Purpose:    To separate the `Individual` class from the main code for easier rea
             See doc string for the class for more info
 """
 
-from random import random, randint, seed, choices
-from constants import DISEASE_LIST, PATCHES, NUM_PATCHES, terrain_grid
+# the bits of `disease_flags`, which holds one byte per individual per disease
+DIE_WHEN_RECOVERED = 1
+MASK_WEARER = 2
+# set if the individual wears a mask that halves the chance of infection (a prevention factor of 0.5)
+MASKED = 4
+# set when the individual is flagged to move on to the next stage of the disease
+CHANGE = 8
+
+# the bits of `flags`, which holds one byte per individual
+QUARANTINER = 1
+# set once the individual's changes have been applied for the day
+UPDATED = 2
+
+# the largest value a day counter can hold. Counters stop there instead of overflowing
+MAX_DAYS = 32767
 
 class Individual:
     '''
     class:      Individual
-    purpose:    represents an individual in the SLIR simulation.
+    purpose:    represents an individual in the SLIR simulation. An Individual is a lightweight view
+                of one row of a `Population`, which holds the variables of every individual in compact
+                typed arrays. Individuals are created with `Population.add` (or, many at
+                once, `Population.add_batch`).
     input:
-                `iden`: unique, identification integer (must be greater than or equal to zero) for class object
-                `age`: in years, an integer value selected from the keys defined in the 'age_dist' field in `params.json`
-                `mortality`: a float value representing the ratio of deaths per person in an age group defined in
-                    'age_dist_disease' field in `params.json`
-                `state`: the individual's state of health, an integer value between zero and three
-                `location`: an integer tuple representing the individual's row and column location in the simulation grid
-    variables:  `state_of_health`, `id`, `age`, `mortality`, `location`, `tendency`, `days_in_state`,
-                `days_in_latent`, `days_in_infectious`, `exposure_points`, `mask_wearer`, `quarantiner`,
-                `symptomatic`, `change`, `updated`
-    functions:  `flag_for_update`, `check_if_latent`, `check_if_infectious`, `check_if_removed`, `apply_changes`, 
-                `select_new_location`
+                `population`: the `Population` the individual belongs to
+                `index`: the individual's row in `population`
+                The terrain, routes, patches, and random number streams are those of the population's
+                `config`
+    variables:  `state_of_health`, `id`, `location`, `tendency`, `tendency_patch`, `path`, `path_step`,
+                `days_in_state`, `days_in_latent`, `days_in_infectious`, `immunity_duration`,
+                `die_when_recovered`, `mask_wearer`, `prevention_factor`, `quarantiner`, `change`, `updated`.
+                The per-disease variables are returned as new lists, so they are read-only
+    functions:  `flag_for_update`, `check_if_progressing`, `apply_changes`, `choosePatch`, `chooseLocation`
     '''
+    # a view only holds its population and row, so it doesn't need a `__dict__`
+    __slots__ = ("population", "index")
     """
                      /$$           /$$   /$$                          
                     |__/          |__/  | $$                          
@@ -35,80 +51,106 @@ class Individual:
     /$$$$$$ /$$$$$$|__/|__/  |__/|__/   \___/   /$$$$$$ /$$$$$$      
     |______/|______/                            |______/|______/
     """
-    def __init__(self, iden, state, possible_ages, ages_dist, disease_type=0):
-        # sets the random generator seed
-        seed(a=None, version=2)
-        # can be 0 (susceptible), 1 (latent), 2 (infectious), 3 (recovered), or 4 (immune)
-        self.state_of_health = [0] * len(DISEASE_LIST)
-        if state != 0:
-            self.state_of_health[disease_type] = state
-
-        # unique identification number for this individual
-        self.id = iden
-
-        # determine the individual's age
-        age = choices(possible_ages, ages_dist)[0]
-        # if a random number is lower than the mortality rate of the individual's age group
-        #       they will die when recovered.
-        self.die_when_recovered = []
-
-        # individual's initial location in the simulation grid.
-        self.location = self.chooseLocation()
-        # location this individual wants to travel to eventually
-        self.tendency = self.chooseLocation()
-
-        # this instruction will take the bulk of the initialization time
-        self.path = terrain_grid.find_shortest_path(self.location,self.tendency)
-
-        # number of units of time this individual has spent in their current state
-        self.days_in_state = [0] * len(DISEASE_LIST)
-        # number of days this individual will suffer in the latent stage of each disease
-        self.days_in_latent = []
-
-        # number of days this individual will suffer in the infectious stage of each disease
-        self.days_in_infectious = []
-
-        # number of days this individual will retain immunity from each disease
-        self.immunity_duration = []
-
-        # the factor that, when multiplied by the exposure_points to be added to an individual,
-        #   determines if they get a reduced number or not. E.G. when an infected individual
-        #   is wearing a mask, they will have a reduced effect on the susceptible ones around
-        #   them.
-        self.prevention_factor = []
-        # the fact the individual does or does not quarantine when they know they're infected
-        #   'and-ing' with `bool(random() < SYMP_CHANCE)` says, "if the person knows they're sick,
-        #   they'll isolate. But if they don't show symptoms, they won't know they're sick
-        #   so they won't isolate"
-        self.quarantiner = []
-        # the fact the individual will wear a mask when they know they are infected with a particular
-        #   disease
-        self.mask_wearer = []
-
-        # initialize all parameters that differ based on the disease for each disease
-        for disease in range(len(DISEASE_LIST)):
-            self.days_in_latent.append((randint(DISEASE_LIST[disease]["LATENT_PERIOD_MIN"], DISEASE_LIST[disease]["LATENT_PERIOD_MAX"])))
-            self.days_in_infectious.append((randint(DISEASE_LIST[disease]["INFECTIOUS_PERIOD_MIN"], DISEASE_LIST[disease]["INFECTIOUS_PERIOD_MAX"])))
-            self.immunity_duration.append((randint(DISEASE_LIST[disease]["IMMUNITY_DURATION_MIN"], DISEASE_LIST[disease]["IMMUNITY_DURATION_MAX"])))
-            self.die_when_recovered.append(bool(random() < DISEASE_LIST[disease]["AGE_DIST_DISEASE"][age]))
-            self.mask_wearer.append(bool(random() < DISEASE_LIST[disease]["MASK_CHANCE"]))
-            # if the statement in the if condition evaulates to True, the individual wears a mask
-            if bool(random() < DISEASE_LIST[disease]["MASK_CHANCE"]):
-                self.prevention_factor.append(0.5)
-            # otherwise, they don't wear one and suffer a higher chance of getting infected
-            else:
-                self.prevention_factor.append(1.0)
-            self.quarantiner = bool(random() < DISEASE_LIST[disease]["QUARAN_CHANCE"]) and bool(random() < DISEASE_LIST[disease]["SYMP_CHANCE"])
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    def __disease_values(self, values):
+        """
+        Purpose:    Copy out this individual's value of a per-disease array for every disease
+        Input:      One of the population's per-disease arrays
+        Output:     A list with one value for each disease
+        """
+        base = self.index * self.population.num_diseases
+        return values[base:base + self.population.num_diseases].tolist()
+
+    def __disease_flags(self, bit):
+        """
+        Purpose:    Unpack one of this individual's per-disease flags for every disease
+        Input:      The flag's bit (e.g. `MASK_WEARER`)
+        Output:     A list with one boolean for each disease
+        """
+        return [bool(flags & bit) for flags in self.__disease_values(self.population.disease_flags)]
+
+    @property
+    def id(self):
+        return self.population.ids[self.index]
+
+    @property
+    def state_of_health(self):
+        return self.__disease_values(self.population.state_of_health)
+
+    @property
+    def days_in_state(self):
+        return self.__disease_values(self.population.days_in_state)
+
+    @property
+    def days_in_latent(self):
+        return self.__disease_values(self.population.days_in_latent)
+
+    @property
+    def days_in_infectious(self):
+        return self.__disease_values(self.population.days_in_infectious)
+
+    @property
+    def immunity_duration(self):
+        return self.__disease_values(self.population.immunity_duration)
 
-        # signals a state change is necessary
-        self.change = [False] * len(DISEASE_LIST)
-        # signals the individual has been moved from their previous location
-        self.updated = False
+    @property
+    def die_when_recovered(self):
+        return self.__disease_flags(DIE_WHEN_RECOVERED)
 
-        # debug dump
-        self.outfile = open('./debug/'+str(self.id)+'.txt', 'w')
-        self.outfile.write("Latent period: "+str(self.days_in_latent)+'\nInfectious period: '+str(self.days_in_infectious)+'\nImmunity duration: '+str(self.immunity_duration)+'\n\n')
+    @property
+    def mask_wearer(self):
+        return self.__disease_flags(MASK_WEARER)
 
+    @property
+    def prevention_factor(self):
+        return [0.5 if masked else 1.0 for masked in self.__disease_flags(MASKED)]
+
+    @property
+    def change(self):
+        return self.__disease_flags(CHANGE)
+
+    @property
+    def quarantiner(self):
+        return bool(self.population.flags[self.index] & QUARANTINER)
+
+    @property
+    def updated(self):
+        return bool(self.population.flags[self.index] & UPDATED)
+
+    @property
+    def location(self):
+        return (self.population.rows[self.index], self.population.cols[self.index])
+
+    @location.setter
+    def location(self, location):
+        self.population.rows[self.index], self.population.cols[self.index] = location
+
+    @property
+    def tendency(self):
+        return (self.population.tendency_rows[self.index], self.population.tendency_cols[self.index])
+
+    @tendency.setter
+    def tendency(self, tendency):
+        self.population.tendency_rows[self.index], self.population.tendency_cols[self.index] = tendency
+
+    @property
+    def tendency_patch(self):
+        return self.population.tendency_patches[self.index]
+
+    @tendency_patch.setter
+    def tendency_patch(self, patch):
+        self.population.tendency_patches[self.index] = patch
+
+    @property
+    def path(self):
+        return self.population.paths[self.index]
+
+    @property
+    def path_step(self):
+        return self.population.path_steps[self.index]
 
     """
      /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$                
@@ -134,9 +176,14 @@ class Individual:
                 until the next day, we just flag the individual for changes and update the variables after all individuals
                 in the simulation have been analyzed.
         """
-        self.updated = False
+        population = self.population
+        population.flags[self.index] &= ~UPDATED & 0xFF
         # add one day to the individual's time in their current state
-        self.days_in_state = [(current_count + 1) for current_count in self.days_in_state]
+        base = self.index * population.num_diseases
+        days_in_state = population.days_in_state
+        for position in range(base, base + population.num_diseases):
+            if days_in_state[position] < MAX_DAYS:
+                days_in_state[position] += 1
 
         # checks if the individual has the necessary qualities to progress to the next
         #   stage of the disease (if susceptible, then they would progress to the latent stage, etc.)
@@ -146,60 +193,96 @@ class Individual:
         """
         Purpose:    Sets the individual to transition to the next disease stage
         """
-        for disease in range(len(DISEASE_LIST)):
+        population = self.population
+        base = self.index * population.num_diseases
+        for disease in range(population.num_diseases):
+            position = base + disease
+            state = population.state_of_health[position]
+            days = population.days_in_state[position]
             # if the individual has become infected as a susceptible, OR
             #       if they are latent and have stayed the duration of the latent period, OR
             #           if they are infectious and have stayed the duration of the infectious period, OR
             #               if they are recovered and have stayed the duration of the immunity period,
-            #   set the `self.change` variable to True for them to move to the next stage
-            if (self.state_of_health[disease] == 0 and is_infected[disease]) or \
-                    (self.state_of_health[disease] == 1 and (self.days_in_state[disease] == self.days_in_latent[disease])) or \
-                        (self.state_of_health[disease] == 2 and (self.days_in_state[disease] == self.days_in_infectious[disease])) or \
-                            (self.state_of_health[disease] == 3 and (self.days_in_state[disease] == self.immunity_duration[disease])):
-                self.change[disease] = True
+            #   set the individual's CHANGE flag for them to move to the next stage
+            if (state == 0 and is_infected[disease]) or \
+                    (state == 1 and (days == population.days_in_latent[position])) or \
+                        (state == 2 and (days == population.days_in_infectious[position])) or \
+                            (state == 3 and (days == population.immunity_duration[position])):
+                population.disease_flags[position] |= CHANGE
 
     def apply_changes(self, outfile=None):
         """
         Purpose: updates the state variables of the individual
         Returns: the integer representing the individual's state of health
         """
-        if not self.updated:
-            for disease in range(len(DISEASE_LIST)):
+        population = self.population
+        index = self.index
+        if not population.flags[index] & UPDATED:
+            config = population.config
+            route_table = config.route_table
+            base = index * population.num_diseases
+            for position in range(base, base + population.num_diseases):
                 # transition the individual to the next state
-                if self.change[disease]:
-                    self.days_in_state[disease] = 0
-                    self.state_of_health[disease] = (self.state_of_health[disease] + 1) % 4
-                    self.change[disease] = False
-                    # print(self.id, "transitioned from", self.state_of_health[disease]-1, "to", self.state_of_health[disease])
-            # move the individual to the next spot in the grid by assigning its position
-            #       as the first position in the `self.path` list
-            if self.path != []:
-                self.location = (self.path[0][1], self.path[0][0])
-                self.path.pop(0)
-            # if individual has reached their desired location (tendency), make a new one
+                if population.disease_flags[position] & CHANGE:
+                    population.days_in_state[position] = 0
+                    population.state_of_health[position] = (population.state_of_health[position] + 1) % 4
+                    population.disease_flags[position] &= ~CHANGE & 0xFF
+            # move the individual one step closer to their tendency using the route table
+            if route_table is not None:
+                next_location = route_table.next_step(self.location, self.tendency_patch, self.tendency)
+                if next_location is not None:
+                    self.location = next_location
+                # if individual has reached their desired location (tendency), make a new one
+                else:
+                    self.tendency_patch = self.choosePatch(config.rng.movement)
+                    self.tendency = self.chooseLocation(config.rng.movement, self.tendency_patch)
             else:
-                # changes the individual `self.tendency` to be a new location in the simulation grid
-                self.tendency = self.chooseLocation()
-                # find the next set of spots the Individual must use to get to their new location
-                self.path = terrain_grid.find_shortest_path(self.location, self.tendency)
-            # setting a variable `updated` to True prevents this individual from being analyzed again in the same day
-            self.updated = True
-            # # unit test that prints the state of health of every individual in the population
-            # outfile.write(str(self.state_of_health)+', ')
-            self.outfile.write("Days in state: "+str(self.days_in_state)+'\n')
-            self.outfile.write("\n\n")
+                path = population.paths[index]
+                # an individual's first path is only found when they first move, so creating the
+                #       population doesn't have to find everyone's path up front
+                if path is None:
+                    path = population.paths[index] = config.terrain_grid.find_shortest_path(self.location, self.tendency)
+                # move the individual to the next spot in the grid by assigning its position
+                #       as the next position in their path
+                if population.path_steps[index] < len(path):
+                    x, y = path[population.path_steps[index]]
+                    population.rows[index], population.cols[index] = y, x
+                    population.path_steps[index] += 1
+                # if individual has reached their desired location (tendency), make a new one
+                else:
+                    # changes the individual's tendency to be a new location in the simulation grid
+                    self.tendency_patch = self.choosePatch(config.rng.movement)
+                    self.tendency = self.chooseLocation(config.rng.movement, self.tendency_patch)
+                    # find the next set of spots the Individual must use to get to their new location.
+                    #       Paths may be shared through the path cache, so the individual walks along
+                    #       theirs with `path_steps` instead of popping spots off of it
+                    population.paths[index] = config.terrain_grid.find_shortest_path(self.location, self.tendency)
+                    population.path_steps[index] = 0
+            # setting the UPDATED flag prevents this individual from being analyzed again in the same day
+            population.flags[index] |= UPDATED
             return self.state_of_health
         return -1
     
-    def chooseLocation(self):
+    def choosePatch(self, stream):
+        """
+        selects one of the patches at random. `stream` is the random number stream to draw from
+        (`rng.placement` when the individual is created, `rng.movement` afterwards)
+        """
+        return stream.randint(0, self.population.config.NUM_PATCHES-1)
+
+    def chooseLocation(self, stream, randPatch=None):
         """
         selects a random location in the simulation grid or within a patch, selected at random
+        unless `randPatch` is given. `stream` is the random number stream to draw from
+        (`rng.placement` when the individual is created, `rng.movement` afterwards)
         """
         # Select at random one of the patches to spawn in an initially infected Individual
-        randPatch = randint(0, NUM_PATCHES-1)
+        if randPatch is None:
+            randPatch = self.choosePatch(stream)
+        bounds = self.population.config.PATCHES[str(randPatch)]["bounds"]
         # adding 1 to each random integer bound accounts for the empty grid border the user doesn't see
-        randx = randint(PATCHES[str(randPatch)]["bounds"][0]+1, PATCHES[str(randPatch)]["bounds"][2]+1)
-        randy = randint(PATCHES[str(randPatch)]["bounds"][1]+1, PATCHES[str(randPatch)]["bounds"][3]+1)
+        randx = stream.randint(bounds[0]+1, bounds[2]+1)
+        randy = stream.randint(bounds[1]+1, bounds[3]+1)
         return (randx, randy)
     
     def printState(self):
@@ -220,4 +303,6 @@ class Individual:
 """
 
 if __name__ == "__main__":
-    individual = Individual()
\ No newline at end of file
+    from Population import Population
+    individual = Population().add(0, 0, ["19"], [1])
+    individual.printState()
\ No newline at end of file
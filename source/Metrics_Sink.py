@@ -0,0 +1,240 @@
+"""
+Module:     Metrics_Sink.py
+Purpose:    To write every day's counts of susceptible, latent, infectious, recovered, and dead
+            individuals as typed, fixed-width rows (one per day, disease, and state, optionally
+            broken down by age group and patch) collected in a buffer and written in batches, and
+            to read many runs' rows back into one NumPy array
+"""
+
+from os import remove
+import numpy as np
+
+# the output formats and the extension added to the file name for each
+#       "csv":      comma separated text with a header line
+#       "npz":      one NumPy array per column, written when the run finishes
+#       "binary":   `FILE_MAGIC` followed by the raw rows, appended as they are flushed
+EXTENSIONS = {"csv": ".csv", "npz": ".npz", "binary": ".bin"}
+
+# the layout of one row. `age_group` is the index of the age in the "age_dist" parameter and
+#       `patch` the patch the individuals are standing in; both are `ALL` for the day's totals
+METRICS_DTYPE = np.dtype([
+    ("day", "<u4"),
+    ("disease", "u1"),
+    ("state", "u1"),
+    ("age_group", "i1"),
+    ("patch", "<i2"),
+    ("count", "<i4")
+])
+ALL = -1
+
+# the number of states a day's counts are kept for (susceptible, latent, infectious, recovered, dead)
+NUM_STATES = 5
+
+# written at the start of every binary metrics file so the reader can tell it is one
+FILE_MAGIC = b"SLIRMET1"
+
+def patch_lookup_grid(patches, num_rows_full, num_cols_full):
+    """
+    Purpose:    Map every cell of the simulation grid to the patch it is in. Where patches overlap,
+                the cell belongs to the lowest numbered one
+    Input:      The "patches" parameter and the size of the simulation grid with its border
+    Output:     A (row, col) int16 array of patch numbers, `ALL` outside of every patch
+    """
+    grid = np.full((num_rows_full, num_cols_full), ALL, dtype=np.int16)
+    # painted from the last patch to the first, so the lowest number is painted last
+    for patch in reversed(range(len(patches))):
+        top, left, bottom, right = patches[str(patch)]["bounds"]
+        # adding 1 to each bound accounts for the empty grid border the user doesn't see
+        grid[top+1:bottom+2, left+1:right+2] = patch
+    return grid
+
+def count_states(state_of_health, groups, num_groups):
+    """
+    Purpose:    Count the individuals in each state of each disease, group by group. Like a day's
+                `state_list`, an individual only counts as susceptible if they are susceptible to
+                every disease, and that count is repeated for every disease
+    Input:      A (population, disease) array of states of health, an array of each individual's
+                group (individuals in group `ALL` aren't counted), and the number of groups
+    Output:     A (group, state, disease) int64 array of counts
+    """
+    num_diseases = state_of_health.shape[1]
+    counts = np.zeros((num_groups, NUM_STATES, num_diseases), dtype=np.int64)
+    grouped = groups >= 0
+    state_of_health, groups = state_of_health[grouped], groups[grouped]
+    susceptible = ~state_of_health.any(axis=1)
+    counts[:, 0, :] = np.bincount(groups[susceptible], minlength=num_groups)[:, None]
+    for state in range(1, NUM_STATES):
+        for disease in range(num_diseases):
+            counts[:, state, disease] = np.bincount(groups[state_of_health[:, disease] == state], minlength=num_groups)
+    return counts
+
+class Metrics_Sink():
+    """
+    class:      Metrics_Sink
+    input:      `path`: the file the rows are written to, without its extension
+                `file_format`: "csv", "npz", or "binary" (see `EXTENSIONS`)
+                `num_age_groups`: the number of age groups to break every day down by (0 doesn't)
+                `patch_grid`: the grid from `patch_lookup_grid` to break every day down by the
+                patch individuals are standing in (None doesn't)
+                `buffer_rows`: how many rows are held in memory before they are written
+    purpose:    Rows are collected in a preallocated NumPy buffer and written in one call when it
+                fills up, so a run costs a handful of writes instead of one per day. "npz" files
+                can't be appended to, so their rows are streamed to a binary file next to them
+                that is turned into the ".npz" (and removed) when the sink is closed.
+    """
+    def __init__(self, path, file_format="binary", num_age_groups=0, patch_grid=None, buffer_rows=65536):
+        if file_format not in EXTENSIONS:
+            raise ValueError("Unknown metrics format \"" + str(file_format) + "\". Use \"csv\", \"npz\", or \"binary\".")
+        self.path = path + EXTENSIONS[file_format]
+        self.file_format = file_format
+        self.num_age_groups = num_age_groups
+        self.patch_grid = patch_grid
+        # True if anything beyond the day's totals is counted
+        self.breakdowns = bool(num_age_groups) or patch_grid is not None
+
+        self.buffer = np.zeros(buffer_rows, dtype=METRICS_DTYPE)
+        self.buffer_count = 0
+        # the file is only opened once there is something to write to it
+        self.outfile = None
+
+    def write_day(self, day, state_list, simulation_grid=None):
+        """
+        Purpose:    Add one day's rows: the totals, then the breakdowns by age group and by patch.
+                    The breakdowns are counted from the individuals themselves, so the object
+                    engine's day zero (whose totals are still all zero) has them too
+        Input:      The day, its `state_list`, and the automaton it came from (only needed for
+                    the breakdowns; see `individual_states`)
+        Output:     None
+        """
+        totals = np.asarray(state_list, dtype=np.int64)
+        self.__add_rows(day, totals[None], ALL, ALL)
+        if not self.breakdowns or simulation_grid is None:
+            return
+        state_of_health, age_groups, rows, cols = simulation_grid.individual_states()
+        if self.num_age_groups:
+            self.__add_rows(day, count_states(state_of_health, age_groups, self.num_age_groups), np.arange(self.num_age_groups), ALL)
+        if self.patch_grid is not None:
+            num_patches = int(self.patch_grid.max()) + 1
+            self.__add_rows(day, count_states(state_of_health, self.patch_grid[rows, cols], num_patches), ALL, np.arange(num_patches))
+
+    def flush(self):
+        """
+        Purpose:    Write every buffered row to the file
+        Input:      None
+        Output:     None
+        """
+        if self.buffer_count:
+            self.__write(self.buffer[:self.buffer_count])
+            self.buffer_count = 0
+
+    def close(self):
+        """
+        Purpose:    Write every buffered row and close the file. An "npz" file is written now
+        Input:      None
+        Output:     None
+        """
+        self.flush()
+        if self.outfile is None:
+            return
+        self.outfile.close()
+        self.outfile = None
+        if self.file_format == "npz":
+            rows = read_metrics(self.path + ".part")
+            np.savez(self.path, **{name: np.array(rows[name]) for name in METRICS_DTYPE.names})
+            del rows
+            remove(self.path + ".part")
+
+    def __add_rows(self, day, counts, age_groups, patches):
+        """
+        Purpose:    Turn an array of counts into rows and add them to the buffer, writing it out
+                    whenever it fills up
+        Input:      The day, a (group, state, disease) array of counts, and the age group and patch
+                    of each group (a single value or an array with one value per group)
+        Output:     None
+        """
+        num_groups, num_states, num_diseases = counts.shape
+        rows = np.zeros(counts.size, dtype=METRICS_DTYPE)
+        group, state, disease = np.indices(counts.shape).reshape(3, -1)
+        rows["day"], rows["disease"], rows["state"], rows["count"] = day, disease, state, counts.reshape(-1)
+        rows["age_group"] = np.broadcast_to(age_groups, num_groups)[group]
+        rows["patch"] = np.broadcast_to(patches, num_groups)[group]
+        while len(rows):
+            if self.buffer_count == len(self.buffer):
+                self.flush()
+            count = min(len(rows), len(self.buffer) - self.buffer_count)
+            self.buffer[self.buffer_count:self.buffer_count+count] = rows[:count]
+            self.buffer_count += count
+            rows = rows[count:]
+
+    def __write(self, rows):
+        """
+        Purpose:    Append rows to the file, opening it (and writing its header) the first time
+        Input:      A NumPy array of rows
+        Output:     None
+        """
+        if self.outfile is None:
+            if self.file_format == "csv":
+                self.outfile = open(self.path, 'w')
+                self.outfile.write(','.join(METRICS_DTYPE.names) + '\n')
+            else:
+                self.outfile = open(self.path + ".part" if self.file_format == "npz" else self.path, 'wb')
+                self.outfile.write(FILE_MAGIC)
+        if self.file_format == "csv":
+            np.savetxt(self.outfile, rows.tolist(), fmt="%d", delimiter=',')
+        else:
+            rows.tofile(self.outfile)
+
+"""
+ /$$$$$$$                            /$$
+| $$__  $$                          | $$
+| $$  \ $$  /$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$   /$$$$$$
+| $$$$$$$/ /$$__  $$ |____  $$ /$$__  $$ /$$__  $$ /$$__  $$
+| $$__  $$| $$$$$$$$  /$$$$$$$| $$  | $$| $$$$$$$$| $$  \__/
+| $$  \ $$| $$_____/ /$$__  $$| $$  | $$| $$_____/| $$
+| $$  | $$|  $$$$$$$|  $$$$$$$|  $$$$$$$|  $$$$$$$| $$
+|__/  |__/ \_______/ \_______/ \_______/ \_______/|__/
+"""
+
+def read_metrics(path):
+    """
+    Purpose:    Load a metrics file of any format. Binary files are memory-mapped instead of read
+    Input:      The path to a file written by `Metrics_Sink` (with its extension)
+    Output:     A NumPy array of rows (see `METRICS_DTYPE`)
+    """
+    with open(path, 'rb') as infile:
+        magic = infile.read(len(FILE_MAGIC))
+    if magic == FILE_MAGIC:
+        return np.memmap(path, dtype=METRICS_DTYPE, mode='r', offset=len(FILE_MAGIC))
+    if path.endswith(".npz"):
+        with np.load(path) as columns:
+            rows = np.zeros(len(columns["day"]), dtype=METRICS_DTYPE)
+            for name in METRICS_DTYPE.names:
+                rows[name] = columns[name]
+        return rows
+    if path.endswith(".csv"):
+        return np.atleast_1d(np.loadtxt(path, dtype=METRICS_DTYPE, delimiter=',', skiprows=1))
+    raise ValueError(path + " is not a metrics file")
+
+def load_runs(paths, age_group=ALL, patch=ALL):
+    """
+    Purpose:    Gather the counts of many runs (e.g. every replicate of `replicates.py`) into one
+                array. Runs that ended early keep their last day's counts, since nothing changes
+                once no one is latent or infectious
+    Input:      A list of metrics files, and the age group and patch to load (`ALL` loads the
+                totals, or the breakdown by the other one)
+    Output:     A (run, day, state, disease) int32 array of counts
+    """
+    runs = []
+    for path in paths:
+        rows = read_metrics(path)
+        runs.append(rows[(rows["age_group"] == age_group) & (rows["patch"] == patch)])
+    num_days = max((int(rows["day"].max()) + 1 for rows in runs if len(rows)), default=0)
+    num_diseases = max((int(rows["disease"].max()) + 1 for rows in runs if len(rows)), default=0)
+    counts = np.zeros((len(runs), num_days, NUM_STATES, num_diseases), dtype=np.int32)
+    for run, rows in enumerate(runs):
+        if not len(rows):
+            continue
+        counts[run, rows["day"], rows["state"], rows["disease"]] = rows["count"]
+        last_day = int(rows["day"].max())
+        counts[run, last_day+1:] = counts[run, last_day]
+    return counts
@@ -4,44 +4,169 @@
                 and enable pathfinding in the individuals
 """
 
-from pathfinding.core.diagonal_movement import DiagonalMovement
-from pathfinding.core.grid import Grid
-from pathfinding.finder.a_star import AStarFinder
+from collections import OrderedDict
+from hashlib import sha1
+import numpy as np
+from Pathfinder import Pathfinder
+import Terrain_File
+
+# the Obstacle_Grids this process has already loaded, by their arguments. Lets every
+#       `Simulation_Config` on the same terrain (e.g. every run of a parameter sweep) share it
+#       instead of reading it again
+LOADED_GRIDS = {}
+
+# the terrain file used when none is given
+DEFAULT_TERRAIN_FILE = "./resources/terrain.txt"
+
+def load_obstacle_grid(path_cache_size=0, path_cache_max_steps=0, pathfinder="jps", terrain_file=DEFAULT_TERRAIN_FILE):
+    """
+    Purpose:    Get an Obstacle_Grid, reusing one already loaded with the same arguments
+    Input:      The same arguments as `Obstacle_Grid`
+    Output:     An Obstacle_Grid object
+    """
+    key = (path_cache_size, path_cache_max_steps, pathfinder, terrain_file)
+    if key not in LOADED_GRIDS:
+        LOADED_GRIDS[key] = Obstacle_Grid(path_cache_size, path_cache_max_steps, pathfinder, terrain_file)
+    return LOADED_GRIDS[key]
+
+def load_terrain(terrain_file=DEFAULT_TERRAIN_FILE):
+    """
+    Purpose:    Read a terrain file. A binary terrain file (see `Terrain_File.py`) or a ".npy" file
+                (a 2D array of uint8 saved with `numpy.save`) is memory-mapped instead of read, so a
+                terrain of millions of cells is only paged in as it is used. Any other file is read
+                as text, one row per line and one digit per cell
+    Input:      The path to the terrain file
+    Output:     A tuple of the terrain, as a (row, col) uint8 NumPy array where zeros are obstacles
+                and all values greater than zero are the cost of stepping onto that cell, and a
+                fingerprint (sha1 hex digest) of the terrain
+    """
+    if Terrain_File.is_terrain_file(terrain_file):
+        return Terrain_File.read_terrain(terrain_file)
+    if terrain_file.endswith(".npy"):
+        terrain = np.load(terrain_file, mmap_mode='r')
+        if terrain.ndim != 2 or terrain.dtype != np.uint8:
+            raise ValueError(terrain_file + " must hold a 2D uint8 array, not a " + str(terrain.ndim) + "D " + str(terrain.dtype) + " one")
+        return terrain, Terrain_File.terrain_fingerprint(terrain)
+    with open(terrain_file) as input:
+        text = input.read()
+    rows = [row for row in text.split('\n') if row and not row.isspace()]
+    if rows and all(len(row) == len(rows[0]) for row in rows) and all(row.isdigit() for row in rows):
+        # every row is the same number of digits, so the characters can be converted all at once
+        terrain = (np.frombuffer(''.join(rows).encode(), dtype=np.uint8) - ord('0')).reshape(len(rows), len(rows[0]))
+    else:
+        # loop through entire terrain file and convert all chars to integers
+        terrain = np.array([[int(col) for col in row if col.isdigit()] for row in rows], dtype=np.uint8)
+    # the fingerprint of a text terrain is the hash of its text, like it always was, so the route
+    #       tables already precomputed for it are still found
+    return terrain, sha1(text.encode()).hexdigest()
 
 # the terrain grid class that we'll use for Individual's pathfinding
 class Obstacle_Grid():
-    def __init__(self):
-        # in the end, `self.terrain_grid` will be a 2D array of values where zeros are obstacles
-        #       and all values greater than zero are edge weights for all edges connected to that node
-        self.terrain_grid = []
-        with open("./resources/terrain.txt") as input:
-            rows = input.readlines()
-            # loop through entire terrain file and convert all chars to integers
-            for row in rows:
-                terrain_grid_row = []
-                for col in row:
-                    if col.isdigit():
-                        terrain_grid_row.append(int(col))
-                self.terrain_grid.append(terrain_grid_row)
-        # instantiate the Grid object using the newly converted terrain_grid
-        #       The pathfinding library requires this special object to work
-        self.grid = Grid(matrix=self.terrain_grid)
-        # define the A* pathfinding algorithm as the one we use. Another option is Dijkstra's
-        self.finder = AStarFinder(diagonal_movement=DiagonalMovement.always)
+    """
+    class:      Obstacle_Grid
+    input:      `path_cache_size`: the most paths the path cache holds (0 turns it off)
+                `path_cache_max_steps`: the most steps, summed over every cached path, the path
+                cache holds. This caps its memory, since long paths cost more than short ones
+                `pathfinder`: "jps" (Jump Point Search, or A* if the terrain has weights), "astar"
+                (always A*), or "library" (the `pathfinding` library's `AStarFinder`)
+                `terrain_file`: the terrain to load, as text or a ".npy" array (see `load_terrain`)
+    purpose:    Loads the terrain and finds shortest paths through it. Solved paths are kept in a
+                least-recently-used cache keyed by (location, destination), so a trip that was
+                solved before is handed back without running A* again. Paths are returned as
+                tuples so a cached path can't be changed by whoever asked for it.
+    """
+    def __init__(self, path_cache_size=0, path_cache_max_steps=0, pathfinder="jps", terrain_file=DEFAULT_TERRAIN_FILE):
+        # `self.terrain_grid` is a (row, col) array of values where zeros are obstacles and all values
+        #       greater than zero are edge weights for all edges connected to that node, and
+        #       `self.terrain_hash` is a fingerprint of the terrain, so anything precomputed from it
+        #       can tell if it changed
+        self.terrain_grid, self.terrain_hash = load_terrain(terrain_file)
+        self.num_rows, self.num_cols = self.terrain_grid.shape
+        self.pathfinder = pathfinder
+        if pathfinder == "library":
+            # only imported here, since the rest of the simulation doesn't need the library
+            from pathfinding.core.diagonal_movement import DiagonalMovement
+            from pathfinding.core.grid import Grid
+            from pathfinding.finder.a_star import AStarFinder
+            # instantiate the Grid object using the newly converted terrain_grid
+            #       The pathfinding library requires this special object to work
+            self.grid = Grid(matrix=self.terrain_grid)
+            # define the A* pathfinding algorithm as the one we use. Another option is Dijkstra's
+            self.finder = AStarFinder(diagonal_movement=DiagonalMovement.always)
+        elif pathfinder in ("jps", "astar"):
+            # the terrain packed into one flat occupancy map
+            self.native_finder = Pathfinder(self.terrain_grid)
+        else:
+            raise ValueError("Unknown pathfinder \"" + str(pathfinder) + "\". Use \"jps\", \"astar\", or \"library\".")
+
+        # the path cache, ordered from least to most recently used, and its limits
+        self.path_cache = OrderedDict()
+        self.path_cache_size = path_cache_size
+        self.path_cache_max_steps = path_cache_max_steps
+        # the number of steps held by every path in the cache
+        self.path_cache_steps = 0
+        # how often a path was found in the cache, had to be solved, and was pushed out of the cache
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        self.path_cache_evictions = 0
 
     def find_shortest_path(self, location, destination):
         """
         Purpose:    create a list of spots in a 2D grid that define the shortest path
                     between two spots
         Input:      Starting location (`location`) and Ending location (`destination`)
-        Output:     A list of spots/locations in the 2D grid
+        Output:     A tuple of (x, y) spots/locations in the 2D grid
         """
-        self.grid.cleanup()
-        self.start = self.grid.node(location[1],location[0])
-        self.end = self.grid.node(destination[1],destination[0])
-        path_list, _ = self.finder.find_path(self.start, self.end, self.grid)
+        key = (int(location[0]), int(location[1]), int(destination[0]), int(destination[1]))
+        path_list = self.path_cache.get(key)
+        if path_list is not None:
+            self.path_cache_hits += 1
+            self.path_cache.move_to_end(key)
+            return path_list
+        self.path_cache_misses += 1
+
+        if self.pathfinder == "jps":
+            path_list = self.native_finder.find_path(key[:2], key[2:])
+        elif self.pathfinder == "astar":
+            path_list = self.native_finder.find_path_astar(key[:2], key[2:])
+        else:
+            self.grid.cleanup()
+            start = self.grid.node(key[1],key[0])
+            end = self.grid.node(key[3],key[2])
+            path_list, _ = self.finder.find_path(start, end, self.grid)
+        path_list = tuple(path_list)
+        self.__cache_path(key, path_list)
         return path_list
 
+    def path_cache_report(self):
+        """
+        Purpose:    Summarize how well the path cache worked, to help choose its size
+        Input:      None
+        Output:     A string with the cache's hits, misses, hit rate, evictions, and contents
+        """
+        lookups = self.path_cache_hits + self.path_cache_misses
+        hit_rate = self.path_cache_hits / lookups if lookups else 0.0
+        return "Path cache: " + str(self.path_cache_hits) + " hits, " + str(self.path_cache_misses) + " misses (hit rate: " + \
+            str(round(hit_rate, 4)) + "), " + str(self.path_cache_evictions) + " evictions, " + str(len(self.path_cache)) + \
+            " paths of " + str(self.path_cache_steps) + " steps cached"
+
+    def __cache_path(self, key, path_list):
+        """
+        Purpose:    Add a path to the cache, evicting the least recently used paths until it fits
+        Input:      The (location row, location col, destination row, destination col) key and the path
+        Output:     None
+        """
+        # a path that could never fit isn't worth evicting everything else for
+        if self.path_cache_size <= 0 or len(path_list) > self.path_cache_max_steps:
+            return
+        while len(self.path_cache) >= self.path_cache_size or \
+                self.path_cache_steps + len(path_list) > self.path_cache_max_steps:
+            _, evicted = self.path_cache.popitem(last=False)
+            self.path_cache_steps -= len(evicted)
+            self.path_cache_evictions += 1
+        self.path_cache[key] = path_list
+        self.path_cache_steps += len(path_list)
+
     def print_path_to_file(self, path_list):
         """
         Purpose:    Test function that prints the terrain with the shortest path between two nodes
@@ -50,4 +175,11 @@ class Obstacle_Grid():
                     two nodes.
         Output:     None
         """
-        print(self.grid.grid_str(path=path_list, start=self.start, end=self.end))
\ No newline at end of file
+        # obstacles are '#', the start and end of the path are 's' and 'e', and the rest of it is 'x'
+        rows = [['#' if cost == 0 else ' ' for cost in row] for row in self.terrain_grid]
+        for x, y in path_list:
+            rows[y][x] = 'x'
+        if path_list:
+            rows[path_list[0][1]][path_list[0][0]] = 's'
+            rows[path_list[-1][1]][path_list[-1][0]] = 'e'
+        print('\n'.join(''.join(row) for row in rows))
\ No newline at end of file
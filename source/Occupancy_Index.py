@@ -0,0 +1,109 @@
+"""
+Module:     Occupancy_Index.py
+Purpose:    To look up which individuals are in a cell of the simulation grid in O(1), with an
+            index that is rebuilt from every individual's (row, col) once per day
+"""
+
+import numpy as np
+
+class Occupancy_Index():
+    """
+    class:      Occupancy_Index
+    input:      `num_rows`, `num_cols`: the size of the simulation grid, including its border
+    purpose:    A compressed sparse row (CSR) index from cells to individuals. `rebuild` counts the
+                individuals in every cell, turns the counts into `offsets` (where each cell's
+                individuals start), and lays every individual's index out in `order` cell by cell,
+                so the individuals in cell `c` are `order[offsets[c]:offsets[c+1]]`. Individuals
+                never have to be removed from a cell's list when they move; the next rebuild puts
+                them in their new cell.
+                `sparse`: when True, only the occupied cells are indexed. `cells` then holds the
+                sorted ids of the occupied cells and `offsets[k]` where the individuals of
+                `cells[k]` start, so the index takes memory and time in proportion to the
+                population instead of the area of the grid, and a cell is found by binary search
+    """
+    def __init__(self, num_rows, num_cols, sparse=False):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_cells = num_rows * num_cols
+        self.sparse = sparse
+        if sparse:
+            self.counts = None
+            self.occupied = np.zeros(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+        else:
+            self.counts = np.zeros(self.num_cells, dtype=np.int64)
+            self.offsets = np.zeros(self.num_cells + 1, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def rebuild(self, rows, cols, arrival=None):
+        """
+        Purpose:    Index every individual by the cell they are in
+        Input:      Arrays of every individual's row and column and, optionally, an array of
+                    when each individual arrived in their cell. Individuals in the same cell are
+                    ordered by arrival, or by index if `arrival` isn't given
+        Output:     None
+        """
+        cells = np.asarray(rows, dtype=np.int64) * self.num_cols + np.asarray(cols, dtype=np.int64)
+        # a stable sort by cell is the counting sort's placement step: every individual lands in
+        #       their cell's block, in the same relative order they were given in
+        if arrival is None:
+            self.order = np.argsort(cells, kind="stable")
+        else:
+            self.order = np.lexsort((arrival, cells))
+        if self.sparse:
+            # each occupied cell's block starts wherever the sorted cell ids change
+            sorted_cells = cells[self.order]
+            starts = np.flatnonzero(np.diff(sorted_cells)) + 1
+            self.occupied = sorted_cells[np.concatenate(([0], starts))] if len(cells) else sorted_cells
+            self.offsets = np.concatenate(([0], starts, [len(cells)])) if len(cells) else np.zeros(1, dtype=np.int64)
+            return
+        self.counts = np.bincount(cells, minlength=self.num_cells)
+        self.offsets[0] = 0
+        np.cumsum(self.counts, out=self.offsets[1:])
+
+    def __slot(self, cell):
+        """
+        Purpose:    Find where a cell's individuals are listed in `offsets`
+        Input:      The cell's row-major id
+        Output:     The cell's position in `offsets`, or None if the cell is empty (sparse only)
+        """
+        if not self.sparse:
+            return cell
+        slot = int(np.searchsorted(self.occupied, cell))
+        if slot < len(self.occupied) and self.occupied[slot] == cell:
+            return slot
+        return None
+
+    def count(self, row, col):
+        """
+        Purpose:    Count the individuals in a cell
+        Input:      The cell's row and column
+        Output:     An integer
+        """
+        slot = self.__slot(row * self.num_cols + col)
+        return 0 if slot is None else int(self.offsets[slot + 1] - self.offsets[slot])
+
+    def agents_in(self, row, col):
+        """
+        Purpose:    Look up the individuals in a cell
+        Input:      The cell's row and column
+        Output:     A NumPy array of the individuals' indices
+        """
+        slot = self.__slot(row * self.num_cols + col)
+        if slot is None:
+            return self.order[:0]
+        return self.order[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def cells(self):
+        """
+        Purpose:    Walk through every occupied cell, row by row, skipping the empty ones
+        Input:      None
+        Output:     A generator of (row, col, NumPy array of the indices of the individuals in the cell)
+        """
+        offsets, order = self.offsets, self.order
+        if self.sparse:
+            for slot, cell in enumerate(self.occupied.tolist()):
+                yield cell // self.num_cols, cell % self.num_cols, order[offsets[slot]:offsets[slot + 1]]
+            return
+        for cell in np.flatnonzero(self.counts).tolist():
+            yield cell // self.num_cols, cell % self.num_cols, order[offsets[cell]:offsets[cell + 1]]
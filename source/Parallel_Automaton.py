@@ -0,0 +1,437 @@
+"""
+Module:     Parallel_Automaton.py
+Purpose:    To run one large simulation on several cores: the grid is split into bands of rows,
+            and the individuals of each band are simulated by a `Vectorized_Automaton` in their
+            own worker process. At the end of every day, the bands only trade the individuals
+            who walked from one band into another and the infectious individuals along their edges
+"""
+
+import multiprocessing
+import numpy as np
+import constants
+from Event_Log import batch_records
+from Occupancy_Index import Occupancy_Index
+from Checkpoint import flatten_paths, unflatten_paths
+from Vectorized_Automaton import Vectorized_Automaton, Occupant, CHECKPOINT_FIELDS
+
+class Band_Event_Log():
+    """
+    class:      Band_Event_Log
+    input:      `event_log`: the run's `Event_Log`, whose level is copied
+    purpose:    Stands in for the event log in a band's worker process. The records are kept
+                instead of written, and handed to the main process with the day's counts, which
+                writes every band's records to the run's one event log.
+    """
+    def __init__(self, event_log):
+        self.transitions = event_log.transitions
+        self.exposures = event_log.exposures
+        self.moves = event_log.moves
+        self.records = []
+
+    def record_batch(self, *fields, **named_fields):
+        """
+        Purpose:    Keep many events of the same kind (see `Event_Log.record_batch`)
+        Input:      The same as `Event_Log.record_batch`
+        Output:     None
+        """
+        self.records.append(batch_records(*fields, **named_fields))
+
+    def take_records(self):
+        """
+        Purpose:    Hand over (and forget) every record kept so far
+        Input:      None
+        Output:     A NumPy array of records, or None if there are none
+        """
+        records = np.concatenate(self.records) if self.records else None
+        self.records = []
+        return records
+
+def band_edge(automaton, row):
+    """
+    Purpose:    Find the infectious individuals standing in one row of a band, whom the
+                individuals of the next band count as neighbors
+    Input:      The band's automaton and the row
+    Output:     A tuple of arrays of their rows and columns, and a (individual, disease) boolean
+                array of who is infectious with what
+    """
+    infectious = automaton.state_of_health == 2
+    edge = (automaton.row == row) & infectious.any(axis=1)
+    return automaton.row[edge], automaton.col[edge], infectious[edge]
+
+def run_band(config, band, first_row, last_row, state, seed, connection):
+    """
+    Purpose:    Simulate one band of the grid in a worker process, doing whatever the main
+                process asks until it asks it to stop
+    Input:      The config of the simulation, the band's number, its first row and the row after
+                its last, the band's part of the state of the automaton (see
+                `Vectorized_Automaton.checkpoint_state`), the seed of the simulation, and the
+                worker's end of its pipe to the main process
+    Output:     None
+    """
+    try:
+        config.event_log = Band_Event_Log(config.event_log)
+        # the band's grids only cover its rows and the row just past each of its edges
+        automaton = Vectorized_Automaton.from_checkpoint(state, config, (max(first_row - 1, 0), min(last_row + 1, config.NUM_ROWS_FULL)))
+        del state
+        while True:
+            message = connection.recv()
+            if message[0] == "day":
+                # every band draws from its own streams, derived from the seed, the band, and the
+                #       day, so a run is reproduced by its seed without saving them in checkpoints
+                config.rng.reseed([seed, band, automaton.num_days])
+                # which tells the band whether the simulation should end is ignored; the main
+                #       process decides that from every band's counts
+                automaton.process_day()
+                # the band's counts are taken before the individuals who walked out of it leave
+                leaving = np.nonzero((automaton.row < first_row) | (automaton.row >= last_row))[0]
+                connection.send(("done", (automaton.state_list, automaton.take_individuals(leaving), config.event_log.take_records())))
+            elif message[0] == "arrive":
+                automaton.add_individuals(message[1])
+                connection.send(("done", (band_edge(automaton, first_row), band_edge(automaton, last_row - 1))))
+            elif message[0] == "halo":
+                automaton.count_infectious(message[1])
+            elif message[0] == "individuals":
+                connection.send(("done", (automaton.id,) + automaton.individual_states()))
+            elif message[0] == "checkpoint":
+                connection.send(("done", automaton.checkpoint_state()))
+            else:
+                break
+    except (EOFError, BrokenPipeError):
+        # the main process went away, so there is nobody left to tell
+        pass
+    except Exception as error:
+        connection.send(("error", type(error).__name__ + ": " + str(error)))
+    finally:
+        connection.close()
+
+class Parallel_Automaton():
+    """
+    class:      Parallel_Automaton
+    input:      `config`: the `Simulation_Config` of the simulation, with its terrain, random number
+                streams, and event log (by default, the one in `constants.py`). Its "workers"
+                parameter is the number of bands (0 uses every core)
+    purpose:    Models the same disease spread as `Vectorized_Automaton` with the grid split into
+                bands of rows, one per worker process, drawn so that each starts with about as
+                many individuals. Every band processes its day at the same time, in the same two
+                phases (flag, then apply), against the infectious counts of the end of the last
+                day: its own, plus those of the row just past each of its edges (its halo), which
+                is as far as a neighborhood reaches. Afterwards the individuals who walked into
+                another band are handed over, and the bands trade their edges for the next day.
+                Each band draws from its own random number streams, so a run matches the
+                vectorized engine in distribution rather than draw for draw, and the same seed
+                and number of bands reproduce it. The workers are child processes, which the
+                workers of a pool aren't allowed, so `replicates.py` and `sweep.py` run the
+                vectorized engine instead (`server.py`'s workers can run it). `close` stops them.
+    """
+    """
+                     /$$           /$$   /$$
+                    |__/          |__/  | $$
+                    /$$ /$$$$$$$  /$$ /$$$$$$
+                    | $$| $$__  $$| $$|_  $$_/
+                    | $$| $$  \ $$| $$  | $$
+                    | $$| $$  | $$| $$  | $$ /$$
+                    | $$| $$  | $$| $$  |  $$$$/
+    /$$$$$$ /$$$$$$|__/|__/  |__/|__/   \___/   /$$$$$$ /$$$$$$
+    |______/|______/                            |______/|______/
+    """
+    def __init__(self, config=None):
+        self.config = config if config is not None else constants.current_config()
+        # the whole population is created at once, exactly as the vectorized engine creates it,
+        #       and then dealt out to the bands
+        population = Vectorized_Automaton(self.config)
+        state = population.checkpoint_state()
+        del population
+        self.__start(state)
+
+    """
+     /$$$$$$$            /$$                        /$$                     /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          |__/                       | $$                    | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$  /$$$$$$  /$$ /$$    /$$  /$$$$$$  /$$$$$$    /$$$$$$       | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/ /$$__  $$| $$|  $$  /$$/ |____  $$|_  $$_/   /$$__  $$      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  \__/| $$ \  $$/$$/   /$$$$$$$  | $$    | $$$$$$$$      | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$      | $$  \  $$$/   /$$__  $$  | $$ /$$| $$_____/      | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      | $$      | $$   \  $/   |  $$$$$$$  |  $$$$/|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def __start(self, state):
+        """
+        Purpose:    Split the automaton's state into bands and start a worker process for each
+        Input:      The state of the whole automaton (see `Vectorized_Automaton.checkpoint_state`)
+        Output:     None
+        """
+        # length of simulation in days
+        self.num_days = int(state["num_days"])
+        self.population = len(state["id"])
+        self.num_diseases = len(self.config.DISEASE_LIST)
+        self.state_list = state["state_list"].tolist()
+
+        # the first row of each band, followed by the row past the last band. A checkpoint keeps
+        #       its bands, so a resumed run goes on exactly as the run it was taken of
+        num_bands = min(self.config.WORKERS or multiprocessing.cpu_count(), self.config.NUM_ROWS)
+        if "band_edges" in state and len(state["band_edges"]) == num_bands + 1:
+            self.band_edges = state["band_edges"].copy()
+        else:
+            self.band_edges = self.__balanced_edges(state["row"], num_bands)
+
+        # which individuals are in each cell. Only built when something asks who is where
+        self.occupancy = Occupancy_Index(self.config.NUM_ROWS_FULL, self.config.NUM_COLS_FULL, self.config.GRID_MODE == "sparse")
+
+        # every record logged so far is written before the workers are forked with a copy of the log
+        self.config.event_log.flush()
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() \
+            else multiprocessing.get_context()
+        paths = unflatten_paths(state["path_lengths"], state["path_spots"])
+        band_of = self.__band_of(state["row"])
+        self.workers = []
+        self.connections = []
+        # whether the bands are working on something the main process hasn't had every answer to
+        self.waiting = False
+        for band in range(num_bands):
+            members = np.nonzero(band_of == band)[0]
+            band_state = {field: state[field][members] for field in CHECKPOINT_FIELDS}
+            band_state["path_lengths"], band_state["path_spots"] = flatten_paths([paths[i] for i in members.tolist()] if paths else [])
+            band_state["num_days"], band_state["state_list"] = state["num_days"], state["state_list"]
+            connection, worker_connection = context.Pipe()
+            worker = context.Process(target=run_band, args=(self.config, band, int(self.band_edges[band]), \
+                int(self.band_edges[band + 1]), band_state, self.config.rng.seed, worker_connection), daemon=True)
+            worker.start()
+            worker_connection.close()
+            self.workers.append(worker)
+            self.connections.append(connection)
+        print("Split the simulation grid into", num_bands, "bands of rows starting at rows", self.band_edges[:-1].tolist())
+
+        # nobody is arriving yet, but the bands need each other's edges before the first day
+        self.__exchange([self.__no_individuals()] * num_bands)
+
+    def __balanced_edges(self, rows, num_bands):
+        """
+        Purpose:    Split the rows inside the grid's border into bands of at least one row, each
+                    holding about as many of the individuals
+        Input:      The array of every individual's row and the number of bands
+        Output:     An array of the first row of each band, followed by the row past the last band
+        """
+        # cumulative[row - 1] is the number of individuals in rows 1 to `row`
+        cumulative = np.cumsum(np.bincount(rows, minlength=self.config.ROW_LIMIT)[1:self.config.ROW_LIMIT])
+        edges = [1]
+        for band in range(1, num_bands):
+            # the row after the one where a `band / num_bands` share of the individuals is reached
+            edge = int(np.searchsorted(cumulative, band * cumulative[-1] / num_bands)) + 2
+            edges.append(min(max(edge, edges[-1] + 1), self.config.ROW_LIMIT - num_bands + band))
+        edges.append(self.config.ROW_LIMIT)
+        return np.array(edges)
+
+    def __band_of(self, rows):
+        """
+        Purpose:    Find the band each of a set of rows is in
+        Input:      An array of rows
+        Output:     An array of band numbers
+        """
+        return np.clip(np.searchsorted(self.band_edges, rows, side="right") - 1, 0, len(self.band_edges) - 2)
+
+    def __no_individuals(self):
+        """
+        Purpose:    Make an empty set of individuals, in the form `Vectorized_Automaton.take_individuals` returns
+        Input:      None
+        Output:     A dictionary of empty arrays and an empty list of paths
+        """
+        individuals = {field: np.zeros(0, dtype=np.int64) for field in CHECKPOINT_FIELDS}
+        individuals["path"] = []
+        return individuals
+
+    def __ask(self, messages):
+        """
+        Purpose:    Send every band's worker a message and wait for all of their answers
+        Input:      A list of one message for each band
+        Output:     A list of each band's answer
+        """
+        stopped = {}
+        self.waiting = True
+        for band, (connection, message) in enumerate(zip(self.connections, messages)):
+            try:
+                connection.send(message)
+            except OSError:
+                stopped[band] = ("error", "its worker stopped unexpectedly")
+        answers = []
+        for band, connection in enumerate(self.connections):
+            try:
+                answer = stopped[band] if band in stopped else connection.recv()
+            except EOFError:
+                answer = ("error", "its worker stopped unexpectedly (exit code " + str(self.workers[band].exitcode) + ")")
+            if answer[0] == "error":
+                raise RuntimeError("Band " + str(band) + " of the parallel engine failed: " + answer[1])
+            answers.append(answer[1])
+        self.waiting = False
+        return answers
+
+    def __route(self, leaving):
+        """
+        Purpose:    Sort the individuals who walked out of their bands by the band they walked into
+        Input:      A list of what every band's `take_individuals` returned
+        Output:     A list of the individuals arriving in each band, in the same form
+        """
+        individuals = {field: np.concatenate([band[field] for band in leaving]) for field in CHECKPOINT_FIELDS}
+        paths = [path for band in leaving for path in band["path"]]
+        band_of = self.__band_of(individuals["row"])
+        arrivals = []
+        for band in range(len(self.connections)):
+            members = np.nonzero(band_of == band)[0]
+            arriving = {field: values[members] for field, values in individuals.items()}
+            arriving["path"] = [paths[i] for i in members.tolist()] if paths else []
+            arrivals.append(arriving)
+        return arrivals
+
+    def __exchange(self, arrivals):
+        """
+        Purpose:    Hand every band the individuals who walked into it, then hand every band the
+                    infectious individuals along the edges of the bands next to it, so it can
+                    recount its infectious counts for the next day
+        Input:      A list of the individuals arriving in each band (see `__route`)
+        Output:     None
+        """
+        edges = self.__ask([("arrive", individuals) for individuals in arrivals])
+        for band, connection in enumerate(self.connections):
+            # the bottom row of the band above and the top row of the band below
+            halo = ([edges[band - 1][1]] if band > 0 else []) + ([edges[band + 1][0]] if band + 1 < len(edges) else [])
+            connection.send(("halo", tuple(np.concatenate(parts) for parts in zip(*halo)) if halo else None))
+
+    def __gather_individuals(self):
+        """
+        Purpose:    Collect every band's individuals, in order of id like a whole `Vectorized_Automaton`'s
+        Input:      None
+        Output:     A tuple of arrays of every individual's id, state of health (for each disease),
+                    age group, row, and column
+        """
+        ids, state_of_health, age, row, col = (np.concatenate(values) for values in zip(*self.__ask([("individuals",)] * len(self.connections))))
+        order = np.argsort(ids, kind="stable")
+        return ids[order], state_of_health[order], age[order], row[order], col[order]
+
+    """
+     /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          | $$      | $$|__/                | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$ /$$   /$$| $$$$$$$ | $$ /$$  /$$$$$$$      | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/| $$  | $$| $$__  $$| $$| $$ /$$_____/      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  | $$| $$  \ $$| $$| $$| $$            | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$  | $$| $$  | $$| $$| $$| $$            | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      |  $$$$$$/| $$$$$$$/| $$| $$|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/       \______/ |_______/ |__/|__/ \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def start_of_day_metrics(self):
+        """
+        Purpose:        Returns the simulation state
+        Input:          None
+        Output:         Number of population who are susceptible, latent, infectious, recovered, and dead
+        """
+        return self.num_days, self.state_list
+
+    def process_day(self):
+        """
+        Purpose:        Processes the day in every band at the same time, then hands the individuals
+                        who walked into another band over and trades the bands' edges
+        Input:          None
+        Output:         True if the simulation should terminate. False otherwise.
+        """
+        days = self.__ask([("day",)] * len(self.connections))
+        # every band counted its individuals before any left it, so the counts add up to the whole population's
+        self.state_list = np.sum([state_list for state_list, _, _ in days], axis=0).tolist()
+        for _, _, records in days:
+            if records is not None:
+                self.config.event_log.write_records(records)
+        self.__exchange(self.__route([leaving for _, leaving, _ in days]))
+        self.num_days += 1
+
+        # the simulation will terminate whenever it has run SIM_MAX number of days
+        #   or there are no individuals in the latent or infectious stages
+        latent_infectious_present = any(self.state_list[1]) or any(self.state_list[2])
+        if self.num_days == self.config.SIM_MAX or not latent_infectious_present:
+            return True
+        return False
+
+    def close(self):
+        """
+        Purpose:    Stop the worker processes. No more days can be processed afterwards
+        Input:      None
+        Output:     None
+        """
+        for worker, connection in zip(self.workers, self.connections):
+            # workers left in the middle of a day (the run failed or was stopped) would only see
+            #       the message to stop once they finish it, so they are stopped right away
+            if self.waiting:
+                worker.terminate()
+            else:
+                try:
+                    connection.send(("stop",))
+                except OSError:
+                    pass
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
+        self.workers = []
+
+    def checkpoint_state(self):
+        """
+        Purpose:    Collect everything needed to continue the simulation from the end of the current
+                    day, laid out like a `Vectorized_Automaton`'s plus where the bands start
+        Input:      None
+        Output:     A dictionary of NumPy arrays
+        """
+        bands = self.__ask([("checkpoint",)] * len(self.connections))
+        paths = [path for band in bands for path in unflatten_paths(band["path_lengths"], band["path_spots"])]
+        ids = np.concatenate([band["id"] for band in bands])
+        order = np.argsort(ids, kind="stable")
+        state = {field: np.concatenate([band[field] for band in bands])[order] for field in CHECKPOINT_FIELDS}
+        state["path_lengths"], state["path_spots"] = flatten_paths([paths[i] for i in order.tolist()] if paths else [])
+        state["num_days"] = np.array(self.num_days)
+        state["state_list"] = np.array(self.state_list, dtype=np.int64)
+        state["band_edges"] = self.band_edges
+        return state
+
+    @classmethod
+    def from_checkpoint(cls, state, config=None):
+        """
+        Purpose:    Recreate an automaton from the arrays `checkpoint_state` returned, without
+                    drawing any random numbers or finding any paths
+        Input:      The dictionary of arrays (e.g. loaded from a checkpoint), and the config of the
+                    simulation (by default, the one in `constants.py`)
+        Output:     A `Parallel_Automaton` ready to process its next day
+        """
+        self = cls.__new__(cls)
+        self.config = config if config is not None else constants.current_config()
+        self.__start(state)
+        return self
+
+    def individual_states(self):
+        """
+        Purpose:    Hand out every individual's variables that the day's counts can be broken down by
+        Input:      None
+        Output:     A tuple of a (population, disease) array of states of health, and arrays of
+                    each individual's age group (the index of their age in "age_dist"), row, and column
+        """
+        return self.__gather_individuals()[1:]
+
+    def occupied_cells(self):
+        """
+        Purpose:    Walk through every occupied cell of the simulation grid (inside its border),
+                    for the Visualizer and anything else that needs to see who is where
+        Input:      None
+        Output:     A generator of (row, col, list of the `Occupant`s in the cell)
+        """
+        ids, state_of_health, _, rows, cols = self.__gather_individuals()
+        self.occupancy.rebuild(rows, cols)
+        for row, col, individuals in self.occupancy.cells():
+            if 0 < row < self.config.ROW_LIMIT and 0 < col < self.config.COL_LIMIT:
+                yield row, col, [Occupant(int(ids[i]), state_of_health[i].tolist()) for i in individuals.tolist()]
+
+    @property
+    def sim_grid(self):
+        """
+        Purpose:    Builds the simulation grid as a 2D list of lists of the occupants in each cell
+        Input:      None
+        Output:     The 2D simulation grid
+        """
+        sim_grid = [[[] for col in range(self.config.NUM_COLS_FULL)] for row in range(self.config.NUM_ROWS_FULL)]
+        for row, col, occupants in self.occupied_cells():
+            sim_grid[row][col] = occupants
+        return sim_grid
@@ -0,0 +1,273 @@
+"""
+Module:     Pathfinder.py
+Purpose:    To find shortest paths through the terrain without the `pathfinding` library's
+            per-cell Node objects, using a compact occupancy map, a binary heap, and
+            Jump Point Search when every open cell costs the same to walk onto
+"""
+
+from heapq import heappush, heappop
+from math import sqrt
+import numpy as np
+
+SQRT2 = sqrt(2)
+
+def octile(d_x, d_y):
+    """
+    Purpose:    Estimate the cost of walking between two cells when diagonal steps are allowed,
+                the same heuristic `AStarFinder` uses with diagonal movement
+    Input:      The absolute difference in columns (`d_x`) and rows (`d_y`) between the cells
+    Output:     The estimated cost as a float
+    """
+    if d_x < d_y:
+        return (SQRT2 - 1) * d_x + d_y
+    return (SQRT2 - 1) * d_y + d_x
+
+class Pathfinder():
+    """
+    class:      Pathfinder
+    input:      `terrain`: a 2D list or array of the terrain, where zeros are obstacles and all values greater
+                than zero are the cost of stepping onto that cell
+    purpose:    Holds the terrain as one flat `bytearray` with a border of obstacles around it, so a
+                cell is a single integer index and no bounds checks are needed. Paths are found with
+                A* (`find_path_astar`) or Jump Point Search (`find_path_jps`), both allowing diagonal
+                steps everywhere like `DiagonalMovement.always`. Either way, the path is a list of
+                (x, y) spots starting at the location, exactly like the `pathfinding` library returns.
+    """
+    def __init__(self, terrain):
+        terrain = np.asarray(terrain)
+        self.num_rows, self.num_cols = terrain.shape if terrain.size else (0, 0)
+        # the width of a row in the occupancy map, including the obstacles on either side of it
+        self.width = self.num_cols + 2
+        # the terrain is copied into the map a band of rows at a time, so a memory-mapped terrain
+        #       is never read into memory all at once
+        padded = np.zeros((self.num_rows + 2, self.width), dtype=np.uint8)
+        for row in range(0, self.num_rows, 4096):
+            band = np.minimum(terrain[row:row+4096], 255)
+            padded[1+row:1+row+len(band), 1:-1] = band
+        self.occupancy = bytearray(padded.tobytes())
+        # Jump Point Search skips over cells, so it is only correct when every open cell costs the same
+        self.uniform_cost = np.count_nonzero(np.bincount(padded.ravel(), minlength=256)[1:]) <= 1
+        del padded
+        # the change in index of a step in each of the eight directions, and the step's cost
+        self.neighbors = [(d_x + d_y * self.width, SQRT2 if d_x and d_y else 1.0) \
+            for d_y in (-1, 0, 1) for d_x in (-1, 0, 1) if d_x or d_y]
+
+    """
+     /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          | $$      | $$|__/                | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$ /$$   /$$| $$$$$$$ | $$ /$$  /$$$$$$$      | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/| $$  | $$| $$__  $$| $$| $$ /$$_____/      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  | $$| $$  \ $$| $$| $$| $$            | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$  | $$| $$  | $$| $$| $$| $$            | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      |  $$$$$$/| $$$$$$$/| $$| $$|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/       \______/ |_______/ |__/|__/ \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def find_path(self, location, destination):
+        """
+        Purpose:    Find the shortest path between two spots, with Jump Point Search if the terrain
+                    allows it and A* otherwise
+        Input:      Starting location (`location`) and Ending location (`destination`), as (row, col)
+        Output:     A list of (x, y) spots, or an empty list if the destination can't be reached
+        """
+        if self.uniform_cost:
+            return self.find_path_jps(location, destination)
+        return self.find_path_astar(location, destination)
+
+    def find_path_astar(self, location, destination):
+        """
+        Purpose:    Find the shortest path between two spots with A*
+        Input:      Starting location (`location`) and Ending location (`destination`), as (row, col)
+        Output:     A list of (x, y) spots, or an empty list if the destination can't be reached
+        """
+        start, end = self.__index(location), self.__index(destination)
+        # like the `pathfinding` library, an individual may start on an obstacle but never end on one
+        if not self.occupancy[end]:
+            return []
+        occupancy, neighbors, width = self.occupancy, self.neighbors, self.width
+        end_x, end_y = end % width, end // width
+        cost = {start: 0.0}
+        parent = {start: None}
+        closed = set()
+        # entries are (estimated total cost, order pushed, cell) so ties are broken first come, first served
+        open_heap = [(0.0, 0, start)]
+        pushed = 1
+        while open_heap:
+            _, _, cell = heappop(open_heap)
+            if cell in closed:
+                continue
+            if cell == end:
+                return self.__backtrace(parent, end)
+            closed.add(cell)
+            cell_cost = cost[cell]
+            for offset, step_cost in neighbors:
+                neighbor = cell + offset
+                weight = occupancy[neighbor]
+                if not weight or neighbor in closed:
+                    continue
+                neighbor_cost = cell_cost + step_cost * weight
+                if neighbor_cost < cost.get(neighbor, float("inf")):
+                    cost[neighbor] = neighbor_cost
+                    parent[neighbor] = cell
+                    heappush(open_heap, (neighbor_cost + octile(abs(neighbor % width - end_x), abs(neighbor // width - end_y)), pushed, neighbor))
+                    pushed += 1
+        return []
+
+    def find_path_jps(self, location, destination):
+        """
+        Purpose:    Find the shortest path between two spots with Jump Point Search. Only the jump
+                    points are pushed onto the heap; the straight and diagonal runs between them
+                    are filled back in afterwards so the path still moves one cell at a time
+        Input:      Starting location (`location`) and Ending location (`destination`), as (row, col)
+        Output:     A list of (x, y) spots, or an empty list if the destination can't be reached
+        """
+        start, end = self.__index(location), self.__index(destination)
+        if not self.occupancy[end]:
+            return []
+        width = self.width
+        end_x, end_y = end % width, end // width
+        cost = {start: 0.0}
+        parent = {start: None}
+        closed = set()
+        open_heap = [(0.0, 0, start)]
+        pushed = 1
+        while open_heap:
+            _, _, cell = heappop(open_heap)
+            if cell in closed:
+                continue
+            if cell == end:
+                return self.__backtrace(parent, end)
+            closed.add(cell)
+            cell_x, cell_y = cell % width, cell // width
+            for d_x, d_y in self.__pruned_directions(cell, parent[cell]):
+                jump_point = self.__jump(cell + d_x + d_y * width, d_x, d_y, end)
+                if jump_point is None or jump_point in closed:
+                    continue
+                jump_x, jump_y = jump_point % width, jump_point // width
+                jump_cost = cost[cell] + octile(abs(jump_x - cell_x), abs(jump_y - cell_y))
+                if jump_cost < cost.get(jump_point, float("inf")):
+                    cost[jump_point] = jump_cost
+                    parent[jump_point] = cell
+                    heappush(open_heap, (jump_cost + octile(abs(jump_x - end_x), abs(jump_y - end_y)), pushed, jump_point))
+                    pushed += 1
+        return []
+
+    """
+     /$$$$$$$            /$$                        /$$                     /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          |__/                       | $$                    | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$  /$$$$$$  /$$ /$$    /$$  /$$$$$$  /$$$$$$    /$$$$$$       | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/ /$$__  $$| $$|  $$  /$$/ |____  $$|_  $$_/   /$$__  $$      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  \__/| $$ \  $$/$$/   /$$$$$$$  | $$    | $$$$$$$$      | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$      | $$  \  $$$/   /$$__  $$  | $$ /$$| $$_____/      | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      | $$      | $$   \  $/   |  $$$$$$$  |  $$$$/|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def __index(self, location):
+        """
+        Purpose:    Convert a (row, col) spot to its index in the occupancy map
+        Input:      The spot
+        Output:     An integer index
+        """
+        return (int(location[0]) + 1) * self.width + int(location[1]) + 1
+
+    def __backtrace(self, parent, end):
+        """
+        Purpose:    Walk from the end of a search back to its start, filling in every cell between
+                    consecutive cells of the search (which are next to each other for A*, and on one
+                    straight or diagonal line for Jump Point Search)
+        Input:      The dictionary of each cell's parent and the index of the last cell
+        Output:     A list of (x, y) spots from the start to the end
+        """
+        width = self.width
+        path = [(end % width - 1, end // width - 1)]
+        cell = end
+        while parent[cell] is not None:
+            previous = parent[cell]
+            x, y = cell % width, cell // width
+            previous_x, previous_y = previous % width, previous // width
+            d_x = (previous_x > x) - (previous_x < x)
+            d_y = (previous_y > y) - (previous_y < y)
+            while (x, y) != (previous_x, previous_y):
+                x, y = x + d_x, y + d_y
+                path.append((x - 1, y - 1))
+            cell = previous
+        path.reverse()
+        return path
+
+    def __pruned_directions(self, cell, parent):
+        """
+        Purpose:    List the directions worth searching from a jump point: every open direction from
+                    the start, and otherwise only the natural and forced neighbors of the direction
+                    the search arrived from
+        Input:      The cell's index and its parent's index (None for the start)
+        Output:     A list of (d_x, d_y) directions
+        """
+        occupancy, width = self.occupancy, self.width
+        if parent is None:
+            return [(d_x, d_y) for d_y in (-1, 0, 1) for d_x in (-1, 0, 1) \
+                if (d_x or d_y) and occupancy[cell + d_x + d_y * width]]
+        x, y = cell % width, cell // width
+        parent_x, parent_y = parent % width, parent // width
+        d_x = (x > parent_x) - (x < parent_x)
+        d_y = (y > parent_y) - (y < parent_y)
+        row_step = d_y * width
+        directions = []
+        if d_x and d_y:
+            if occupancy[cell + row_step]:
+                directions.append((0, d_y))
+            if occupancy[cell + d_x]:
+                directions.append((d_x, 0))
+            if occupancy[cell + d_x + row_step]:
+                directions.append((d_x, d_y))
+            if not occupancy[cell - d_x] and occupancy[cell - d_x + row_step]:
+                directions.append((-d_x, d_y))
+            if not occupancy[cell - row_step] and occupancy[cell + d_x - row_step]:
+                directions.append((d_x, -d_y))
+        elif d_x:
+            if occupancy[cell + d_x]:
+                directions.append((d_x, 0))
+            if not occupancy[cell + width] and occupancy[cell + d_x + width]:
+                directions.append((d_x, 1))
+            if not occupancy[cell - width] and occupancy[cell + d_x - width]:
+                directions.append((d_x, -1))
+        else:
+            if occupancy[cell + row_step]:
+                directions.append((0, d_y))
+            if not occupancy[cell + 1] and occupancy[cell + 1 + row_step]:
+                directions.append((1, d_y))
+            if not occupancy[cell - 1] and occupancy[cell - 1 + row_step]:
+                directions.append((-1, d_y))
+        return directions
+
+    def __jump(self, cell, d_x, d_y, end):
+        """
+        Purpose:    Move from `cell` in direction (`d_x`, `d_y`) until reaching a jump point: the
+                    end, a cell with a forced neighbor, or (moving diagonally) a cell from which a
+                    straight move finds a jump point. The border of obstacles stops every move
+                    before it can leave the occupancy map
+        Input:      The index of the first cell to check, the direction, and the index of the end
+        Output:     The index of the jump point, or None if the move runs into an obstacle
+        """
+        occupancy, width = self.occupancy, self.width
+        row_step = d_y * width
+        step = d_x + row_step
+        while occupancy[cell]:
+            if cell == end:
+                return end
+            if d_x and d_y:
+                if (occupancy[cell - d_x + row_step] and not occupancy[cell - d_x]) or \
+                        (occupancy[cell + d_x - row_step] and not occupancy[cell - row_step]):
+                    return cell
+                if self.__jump(cell + d_x, d_x, 0, end) is not None or self.__jump(cell + row_step, 0, d_y, end) is not None:
+                    return cell
+            elif d_x:
+                if (occupancy[cell + d_x + width] and not occupancy[cell + width]) or \
+                        (occupancy[cell + d_x - width] and not occupancy[cell - width]):
+                    return cell
+            else:
+                if (occupancy[cell + 1 + row_step] and not occupancy[cell + 1]) or \
+                        (occupancy[cell - 1 + row_step] and not occupancy[cell - 1]):
+                    return cell
+            cell += step
+        return None
@@ -0,0 +1,246 @@
+"""
+Module:     Population.py
+Purpose:    To store every individual of the simulation in a handful of compact typed arrays
+            (one row per individual) instead of one Python object full of lists per individual
+"""
+
+from array import array
+import numpy as np
+from Checkpoint import flatten_paths, unflatten_paths
+import constants
+from Individual import Individual, DIE_WHEN_RECOVERED, MASK_WEARER, MASKED, QUARANTINER
+
+# the names of the arrays holding one value per individual, and one value per individual per disease
+INDIVIDUAL_FIELDS = ("ids", "ages", "rows", "cols", "tendency_rows", "tendency_cols", "tendency_patches", "path_steps", "flags")
+DISEASE_FIELDS = ("state_of_health", "days_in_state", "days_in_latent", "days_in_infectious", "immunity_duration", "disease_flags")
+
+def choose_locations(config, count, stream):
+    """
+    Purpose:    Selects `count` random locations, each within a patch selected at random (see
+                `Individual.chooseLocation`). Both engines place their population with it, so they
+                draw the same locations from the same seed
+    Input:      The `Simulation_Config` of the simulation, the number of locations to select, and
+                the random number stream to draw them from
+    Output:     Three integer arrays, the patches, the rows, and the columns of the selected locations
+    """
+    bounds = np.array([config.PATCHES[str(patch)]["bounds"] for patch in range(config.NUM_PATCHES)])
+    patch = stream.randint_batch(0, config.NUM_PATCHES-1, count)
+    # adding 1 to each random integer bound accounts for the empty grid border the user doesn't see
+    rows = stream.randint_batch(bounds[patch, 0]+1, bounds[patch, 2]+1)
+    cols = stream.randint_batch(bounds[patch, 1]+1, bounds[patch, 3]+1)
+    return patch, rows, cols
+
+class Population():
+    """
+    class:      Population
+    input:      `num_diseases`: how many diseases every individual has a state of health for (by
+                default, the number in `config`)
+                `config`: the `Simulation_Config` whose terrain, routes, and random number streams
+                individuals are created and moved with (by default, the one in `constants.py`)
+    purpose:    Holds every individual's variables in `array.array`s: int8 states of health, int16
+                day counters, uint16 locations, and one byte of packed flags per individual (and per
+                disease). Values for every disease are stored side by side, so an individual's value
+                for `disease` is at index `index * num_diseases + disease`. An `Individual` is only a
+                view of one row, so an individual costs tens of bytes instead of kilobytes. Paths are
+                kept in a plain list since they are tuples shared through the path cache.
+    """
+    def __init__(self, num_diseases=None, config=None):
+        self.config = config if config is not None else constants.current_config()
+        self.num_diseases = num_diseases if num_diseases is not None else len(self.config.DISEASE_LIST)
+        self.count = 0
+
+        # one value per individual
+        self.ids = array('I')
+        # the index of each individual's age in the list of possible ages
+        self.ages = array('B')
+        self.rows = array('H')
+        self.cols = array('H')
+        self.tendency_rows = array('H')
+        self.tendency_cols = array('H')
+        self.tendency_patches = array('H')
+        self.path_steps = array('I')
+        self.flags = array('B')
+        self.paths = []
+
+        # one value per individual per disease
+        self.state_of_health = array('b')
+        self.days_in_state = array('h')
+        self.days_in_latent = array('h')
+        self.days_in_infectious = array('h')
+        self.immunity_duration = array('h')
+        self.disease_flags = array('B')
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, count):
+        """
+        Purpose:    Add rows for `count` individuals, every variable set to zero
+        Input:      The number of rows to add
+        Output:     The index of the first new row
+        """
+        first = self.count
+        for field in INDIVIDUAL_FIELDS:
+            values = getattr(self, field)
+            values.frombytes(bytes(count * values.itemsize))
+        for field in DISEASE_FIELDS:
+            values = getattr(self, field)
+            values.frombytes(bytes(count * self.num_diseases * values.itemsize))
+        # None until the individual's path is found (see `Individual.apply_changes`)
+        self.paths.extend([None] * count)
+        self.count += count
+        return first
+
+    def add_batch(self, first_id, state_of_health):
+        """
+        Purpose:    Create many individuals at once, drawing their ages, disease variables,
+                    locations, and tendencies as whole arrays, and add them to the population. Their
+                    paths are only found once they first move (see `Individual.apply_changes`)
+        Input:      `first_id`: the id of the first new individual. The others are numbered on from it
+                    `state_of_health`: a (count, disease) array of the new individuals' states of health
+        Output:     The index of the first new individual
+        """
+        config = self.config
+        demographics = config.rng.demographics
+        count, num_diseases = len(state_of_health), self.num_diseases
+
+        # the draws are made in the same order as `Vectorized_Automaton`'s, so both engines start
+        #       from the same population for the same seed. Each age is drawn as an index into the
+        #       list of possible ages
+        possible_ages = list(config.AGE_DIST.keys())
+        ages = demographics.choice_batch([config.AGE_DIST[age] for age in possible_ages], count)
+
+        days_in_latent = np.empty((count, num_diseases), dtype=np.int16)
+        days_in_infectious = np.empty((count, num_diseases), dtype=np.int16)
+        immunity_duration = np.empty((count, num_diseases), dtype=np.int16)
+        disease_flags = np.zeros((count, num_diseases), dtype=np.uint8)
+        quarantiner = np.zeros(count, dtype=bool)
+        for disease in range(num_diseases):
+            params = config.DISEASE_LIST[disease]
+            days_in_latent[:, disease] = demographics.randint_batch(params["LATENT_PERIOD_MIN"], params["LATENT_PERIOD_MAX"], count)
+            days_in_infectious[:, disease] = demographics.randint_batch(params["INFECTIOUS_PERIOD_MIN"], params["INFECTIOUS_PERIOD_MAX"], count)
+            immunity_duration[:, disease] = demographics.randint_batch(params["IMMUNITY_DURATION_MIN"], params["IMMUNITY_DURATION_MAX"], count)
+            # see `add` for the meaning of each flag
+            mortality = np.array([params["AGE_DIST_DISEASE"][age] for age in possible_ages])
+            disease_flags[:, disease] = np.where(demographics.random_batch(count) < mortality[ages], DIE_WHEN_RECOVERED, 0)
+            disease_flags[:, disease] |= np.where(demographics.random_batch(count) < params["MASK_CHANCE"], MASK_WEARER, 0).astype(np.uint8)
+            disease_flags[:, disease] |= np.where(demographics.random_batch(count) < params["MASK_CHANCE"], MASKED, 0).astype(np.uint8)
+            # as in `add`, the last disease's draw decides whether the individual quarantines
+            quarantiner = (demographics.random_batch(count) < params["QUARAN_CHANCE"]) & (demographics.random_batch(count) < params["SYMP_CHANCE"])
+
+        # each individual's initial location in the simulation grid, and the location (and patch)
+        #       they want to travel to eventually
+        _, rows, cols = choose_locations(config, count, config.rng.placement)
+        tendency_patches, tendency_rows, tendency_cols = choose_locations(config, count, config.rng.placement)
+
+        columns = {"ids": np.arange(first_id, first_id + count), "ages": ages, "rows": rows, "cols": cols, \
+            "tendency_rows": tendency_rows, "tendency_cols": tendency_cols, "tendency_patches": tendency_patches, \
+            "path_steps": np.zeros(count), "flags": np.where(quarantiner, QUARANTINER, 0), \
+            "state_of_health": state_of_health, "days_in_state": np.zeros((count, num_diseases)), "days_in_latent": days_in_latent, \
+            "days_in_infectious": days_in_infectious, "immunity_duration": immunity_duration, "disease_flags": disease_flags}
+        first = self.count
+        for field, values in columns.items():
+            # values for every disease are stored side by side, which is the order of a (count, disease) array
+            getattr(self, field).frombytes(np.ascontiguousarray(values, dtype=getattr(self, field).typecode).tobytes())
+        self.paths.extend([None] * count)
+        self.count += count
+        return first
+
+    def add(self, iden, state, possible_ages, ages_dist, disease_type=0):
+        """
+        Purpose:    Create an individual, drawing their age, location, tendency, and disease
+                    variables, and add them to the population
+        Input:      `iden`: unique, identification integer (must be greater than or equal to zero)
+                    `state`: the individual's state of health for `disease_type`, an integer between zero and three
+                    `possible_ages`: the keys of the 'age_dist' field in `params.json`
+                    `ages_dist`: the ratio of the population in each of those ages
+                    `disease_type`: the disease `state` is for
+        Output:     The new individual's `Individual` view
+        """
+        config = self.config
+        rng, DISEASE_LIST = config.rng, config.DISEASE_LIST
+        index = self.extend(1)
+        individual = Individual(self, index)
+        num_diseases = self.num_diseases
+        base = index * num_diseases
+        # can be 0 (susceptible), 1 (latent), 2 (infectious), 3 (recovered), or 4 (immune)
+        if state != 0:
+            self.state_of_health[base + disease_type] = state
+
+        # unique identification number for this individual
+        self.ids[index] = iden
+
+        # determine the individual's age
+        age = rng.demographics.choices(possible_ages, ages_dist)
+        self.ages[index] = possible_ages.index(age)
+
+        # individual's initial location in the simulation grid.
+        individual.location = individual.chooseLocation(rng.placement)
+        # location this individual wants to travel to eventually, and the patch it is in
+        individual.tendency_patch = individual.choosePatch(rng.placement)
+        individual.tendency = individual.chooseLocation(rng.placement, individual.tendency_patch)
+
+        # the individual's path is only found once they first move, and individuals following the
+        #       route table look up one step at a time, so they never need one
+
+        # initialize all parameters that differ based on the disease for each disease
+        quarantiner = False
+        for disease in range(num_diseases):
+            self.days_in_latent[base + disease] = rng.demographics.randint(DISEASE_LIST[disease]["LATENT_PERIOD_MIN"], DISEASE_LIST[disease]["LATENT_PERIOD_MAX"])
+            self.days_in_infectious[base + disease] = rng.demographics.randint(DISEASE_LIST[disease]["INFECTIOUS_PERIOD_MIN"], DISEASE_LIST[disease]["INFECTIOUS_PERIOD_MAX"])
+            self.immunity_duration[base + disease] = rng.demographics.randint(DISEASE_LIST[disease]["IMMUNITY_DURATION_MIN"], DISEASE_LIST[disease]["IMMUNITY_DURATION_MAX"])
+            # if a random number is lower than the mortality rate of the individual's age group
+            #       they will die when recovered.
+            flags = DIE_WHEN_RECOVERED if rng.demographics.random() < DISEASE_LIST[disease]["AGE_DIST_DISEASE"][age] else 0
+            # the fact the individual will wear a mask when they know they are infected with this disease
+            if rng.demographics.random() < DISEASE_LIST[disease]["MASK_CHANCE"]:
+                flags |= MASK_WEARER
+            # if the individual wears a mask, they suffer a lower chance of getting infected
+            if rng.demographics.random() < DISEASE_LIST[disease]["MASK_CHANCE"]:
+                flags |= MASKED
+            self.disease_flags[base + disease] = flags
+            # the fact the individual does or does not quarantine when they know they're infected
+            #   'and-ing' with `random() < SYMP_CHANCE` says, "if the person knows they're sick,
+            #   they'll isolate. But if they don't show symptoms, they won't know they're sick
+            #   so they won't isolate"
+            quarantiner = bool(rng.demographics.random() < DISEASE_LIST[disease]["QUARAN_CHANCE"]) and bool(rng.demographics.random() < DISEASE_LIST[disease]["SYMP_CHANCE"])
+        self.flags[index] = QUARANTINER if quarantiner else 0
+        return individual
+
+    def memory_usage(self):
+        """
+        Purpose:    Add up the memory held by the population's arrays (not counting the paths
+                    themselves, which may be shared with the path cache)
+        Input:      None
+        Output:     The number of bytes
+        """
+        total = 8 * len(self.paths)
+        for field in INDIVIDUAL_FIELDS + DISEASE_FIELDS:
+            values = getattr(self, field)
+            total += values.itemsize * len(values)
+        return total
+
+    def checkpoint_state(self):
+        """
+        Purpose:    Collect every variable of every individual for a checkpoint. The paths are
+                    flattened into one array of (x, y) spots and the length of each path (see
+                    `Checkpoint.flatten_paths`)
+        Input:      None
+        Output:     A dictionary of NumPy arrays, viewing the population's own arrays where it can
+        """
+        state = {field: np.asarray(memoryview(getattr(self, field))) for field in INDIVIDUAL_FIELDS + DISEASE_FIELDS}
+        state["path_lengths"], state["path_spots"] = flatten_paths(self.paths)
+        return state
+
+    def restore_state(self, state):
+        """
+        Purpose:    Replace every individual with the ones saved by `checkpoint_state`
+        Input:      The dictionary of arrays `checkpoint_state` returned (or one loaded from a checkpoint)
+        Output:     None
+        """
+        for field in INDIVIDUAL_FIELDS + DISEASE_FIELDS:
+            values = array(getattr(self, field).typecode)
+            values.frombytes(np.ascontiguousarray(state[field]).tobytes())
+            setattr(self, field, values)
+        self.count = len(self.ids)
+        self.paths = unflatten_paths(state["path_lengths"], state["path_spots"])
@@ -0,0 +1,151 @@
+"""
+Module:     Random_Streams.py
+Purpose:    To give every part of the simulation that needs random numbers its own
+            independent, reproducible stream of them, all derived from one seed
+"""
+
+from bisect import bisect
+from itertools import accumulate
+import numpy as np
+
+# the purposes random numbers are drawn for. Each one gets its own stream so, for example, drawing
+#       more movement numbers never shifts which numbers the infection draws get
+STREAM_NAMES = ("movement", "infection", "placement", "demographics")
+
+class Random_Stream():
+    """
+    class:      Random_Stream
+    input:      `seed_sequence`: a NumPy `SeedSequence` the stream's generator is seeded from
+                `buffer_size`: how many random floats to draw at a time for `random`
+    purpose:    One independent stream of random numbers. Single draws (`random`, `randint`,
+                `choices`) are handed out of a buffer that is refilled with one batched draw,
+                which is much cheaper than asking the generator for one number at a time.
+                Whole arrays of draws come straight from the generator with the `_batch` helpers.
+    """
+    def __init__(self, seed_sequence, buffer_size=4096):
+        self.generator = np.random.default_rng(seed_sequence)
+        self.buffer_size = buffer_size
+        # floats drawn ahead of time and the index of the next one to hand out
+        self.buffer = []
+        self.buffer_index = 0
+
+    def random(self):
+        """
+        Purpose:    Draw one random float in [0, 1)
+        Input:      None
+        Output:     A float
+        """
+        if self.buffer_index == len(self.buffer):
+            self.buffer = self.generator.random(self.buffer_size).tolist()
+            self.buffer_index = 0
+        value = self.buffer[self.buffer_index]
+        self.buffer_index += 1
+        return value
+
+    def randint(self, low, high):
+        """
+        Purpose:    Draw one random integer, like `random.randint`
+        Input:      The lowest (`low`) and highest (`high`) integers that can be drawn
+        Output:     An integer in [low, high]
+        """
+        return low + int(self.random() * (high - low + 1))
+
+    def choices(self, population, weights):
+        """
+        Purpose:    Select one element of `population` at random, like `random.choices(...)[0]`
+        Input:      The elements to choose from (`population`) and their relative weights (`weights`)
+        Output:     One element of `population`
+        """
+        cumulative_weights = list(accumulate(weights))
+        return population[bisect(cumulative_weights, self.random() * cumulative_weights[-1], 0, len(population) - 1)]
+
+    def get_state(self):
+        """
+        Purpose:    Capture everything needed to continue this stream exactly where it is
+        Input:      None
+        Output:     A tuple of the generator's state (a dictionary) and a NumPy array of the
+                    buffered floats that haven't been handed out yet
+        """
+        return self.generator.bit_generator.state, np.array(self.buffer[self.buffer_index:], dtype=np.float64)
+
+    def set_state(self, generator_state, buffer):
+        """
+        Purpose:    Continue a stream from a state captured by `get_state`
+        Input:      The generator's state and the array of buffered floats
+        Output:     None
+        """
+        self.generator.bit_generator.state = generator_state
+        self.buffer = buffer.tolist()
+        self.buffer_index = 0
+
+    def random_batch(self, size):
+        """
+        Purpose:    Draw an array of random floats in [0, 1)
+        Input:      The shape of the array (`size`)
+        Output:     A NumPy array of floats
+        """
+        return self.generator.random(size)
+
+    def randint_batch(self, low, high, size=None):
+        """
+        Purpose:    Draw an array of random integers. `low` and `high` may be arrays themselves,
+                    in which case each element is drawn between its own bounds
+        Input:      The lowest (`low`) and highest (`high`) integers that can be drawn, and the
+                    shape of the array (`size`)
+        Output:     A NumPy array of integers in [low, high]
+        """
+        return self.generator.integers(low, np.asarray(high) + 1, size=size)
+
+    def choice_batch(self, weights, size):
+        """
+        Purpose:    Draw an array of indices, each selected according to `weights`
+        Input:      The relative weights of each index (`weights`) and the shape of the array (`size`)
+        Output:     A NumPy array of indices into `weights`
+        """
+        weights = np.asarray(weights, dtype=float)
+        return self.generator.choice(len(weights), size=size, p=weights/weights.sum())
+
+class Random_Streams():
+    """
+    class:      Random_Streams
+    input:      `seed`: an integer seed, or None to draw a fresh one from the OS
+    purpose:    Holds one `Random_Stream` for each name in `STREAM_NAMES` (e.g. `streams.infection`).
+                The streams are spawned from one NumPy `SeedSequence`, so they are statistically
+                independent of each other and the same seed always reproduces the same simulation.
+    """
+    def __init__(self, seed=None):
+        self.reseed(seed)
+
+    def reseed(self, seed):
+        """
+        Purpose:    Replace every stream with a fresh one derived from `seed`
+        Input:      An integer seed, or None to draw a fresh one from the OS
+        Output:     None
+        """
+        seed_sequence = np.random.SeedSequence(seed)
+        # when no seed is given, this is the one the OS provided, so the run can still be reproduced
+        self.seed = seed_sequence.entropy
+        for name, child_sequence in zip(STREAM_NAMES, seed_sequence.spawn(len(STREAM_NAMES))):
+            setattr(self, name, Random_Stream(child_sequence))
+
+    def get_state(self):
+        """
+        Purpose:    Capture the state of every stream, e.g. for a checkpoint
+        Input:      None
+        Output:     A dictionary of each stream's generator state, keyed by stream name, and a
+                    dictionary of each stream's buffered floats
+        """
+        generator_states, buffers = {}, {}
+        for name in STREAM_NAMES:
+            generator_states[name], buffers[name] = getattr(self, name).get_state()
+        return generator_states, buffers
+
+    def set_state(self, seed, generator_states, buffers):
+        """
+        Purpose:    Continue every stream from the states captured by `get_state`
+        Input:      The seed the streams were derived from, and the two dictionaries `get_state` returned
+        Output:     None
+        """
+        self.seed = seed
+        for name in STREAM_NAMES:
+            getattr(self, name).set_state(generator_states[name], buffers[name])
@@ -0,0 +1,221 @@
+"""
+Module:     Route_Table.py
+Purpose:    To precompute, for every patch, which way an individual anywhere on the terrain
+            should step to reach that patch, so individuals can walk to their destination
+            one O(1) lookup at a time instead of running A* for every trip
+"""
+
+from hashlib import sha1
+from heapq import heappush, heappop
+from json import dumps
+from math import inf, sqrt
+from os import path
+import numpy as np
+
+# the eight directions an individual can step in, as (row, col) offsets. A next-hop field stores
+#       the index of one of these, or -1 if there is no step to take
+DIRECTIONS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# the cost of each step. Diagonal steps are allowed everywhere, like `DiagonalMovement.always`
+STEP_COSTS = np.array([sqrt(2) if d_row and d_col else 1.0 for d_row, d_col in DIRECTIONS])
+
+# the Route_Tables this process has already loaded, by the terrain, patches, and cache folder they
+#       were built for, so a second `Simulation_Config` on them doesn't load the table from disk again
+LOADED_TABLES = {}
+
+def load_route_table(terrain, terrain_hash, patches, cache_folder):
+    """
+    Purpose:    Get a Route_Table, reusing one already loaded for the same terrain and patches
+    Input:      The same arguments as `Route_Table`
+    Output:     A Route_Table object
+    """
+    key = (terrain_hash, dumps(patches, sort_keys=True), cache_folder)
+    if key not in LOADED_TABLES:
+        LOADED_TABLES[key] = Route_Table(terrain, terrain_hash, patches, cache_folder)
+    return LOADED_TABLES[key]
+
+class Route_Table():
+    """
+    class:      Route_Table
+    input:      `terrain`: a 2D list or array of the terrain, where zeros are obstacles
+                `terrain_hash`: a hash of the terrain file's contents
+                `patches`: the "patches" field of the parameter file
+                `cache_folder`: the folder the precomputed table is saved to and loaded from
+    purpose:    For every patch, a Dijkstra search out of the patch's region (the open cells
+                inside its walls) gives every cell's distance to that patch and the direction of
+                the step that gets closest to it (its next hop). Individuals outside their
+                tendency's patch follow the next hops; once inside it they step straight towards
+                their tendency. A tendency chosen on (or just past) the patch's walls is walked to
+                as the nearest spot inside them. The table is saved to the cache folder under a
+                hash of the terrain and the patch bounds, so it is only computed once.
+    """
+    def __init__(self, terrain, terrain_hash, patches, cache_folder):
+        self.walkable = np.asarray(terrain) > 0
+        self.num_rows, self.num_cols = self.walkable.shape
+        # the rows and columns (inclusive) of each patch's region, the cells between its walls. A patch
+        #       too thin to have any cells between its walls uses its bounds instead
+        self.regions = np.array([[bounds[0]+1, bounds[1]+1, bounds[2]-1, bounds[3]-1] \
+            if bounds[2] - bounds[0] > 1 and bounds[3] - bounds[1] > 1 else bounds \
+                for bounds in (patches[str(patch)]["bounds"] for patch in range(len(patches)))]).reshape(-1, 4)
+
+        key = sha1((terrain_hash + dumps(self.regions.tolist())).encode()).hexdigest()
+        self.cache_file = path.join(cache_folder, "routes_" + key + ".npz")
+        if path.isfile(self.cache_file):
+            with np.load(self.cache_file) as cached:
+                self.distance = cached["distance"]
+                self.next_hop = cached["next_hop"]
+        else:
+            print("Precomputing the route table for", len(self.regions), "patches")
+            self.distance = np.empty((len(self.regions), self.num_rows, self.num_cols), dtype=np.float32)
+            self.next_hop = np.empty((len(self.regions), self.num_rows, self.num_cols), dtype=np.int8)
+            for patch in range(len(self.regions)):
+                self.distance[patch], self.next_hop[patch] = self.__flow_field(self.regions[patch])
+            np.savez(self.cache_file, distance=self.distance, next_hop=self.next_hop)
+
+    """
+     /$$$$$$$            /$$                        /$$                     /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          |__/                       | $$                    | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$  /$$$$$$  /$$ /$$    /$$  /$$$$$$  /$$$$$$    /$$$$$$       | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/ /$$__  $$| $$|  $$  /$$/ |____  $$|_  $$_/   /$$__  $$      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  \__/| $$ \  $$/$$/   /$$$$$$$  | $$    | $$$$$$$$      | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$      | $$  \  $$$/   /$$__  $$  | $$ /$$| $$_____/      | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      | $$      | $$   \  $/   |  $$$$$$$  |  $$$$/|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def __shifted(self, field, direction, fill):
+        """
+        Purpose:    Look up, for every cell, the value of `field` in the neighbor in `direction`
+        Input:      A 2D array, the index of a direction in `DIRECTIONS`, and the value to use for
+                    neighbors that fall off the terrain
+        Output:     A 2D array the same shape as `field`
+        """
+        d_row, d_col = DIRECTIONS[direction]
+        padded = np.pad(field, 1, constant_values=fill)
+        return padded[1+d_row:1+d_row+self.num_rows, 1+d_col:1+d_col+self.num_cols]
+
+    def __flow_field(self, region):
+        """
+        Purpose:    Compute every cell's distance to a patch region and the direction of its next hop
+        Input:      The (top row, left col, bottom row, right col) of the region
+        Output:     A 2D float array of distances (infinite where the region can't be reached) and
+                    a 2D int8 array of indices into `DIRECTIONS` (-1 where there is no next hop)
+        """
+        top, left, bottom, right = region
+        target = np.zeros_like(self.walkable)
+        target[top:bottom+1, left:right+1] = True
+
+        # a Dijkstra search out of every open cell of the region at once, on a flat copy of the
+        #       terrain with a border of obstacles around it (like `Pathfinder`'s occupancy map), so a
+        #       cell is a single integer index and no bounds checks are needed
+        width = self.num_cols + 2
+        open_cells = bytearray(np.pad(self.walkable, 1).astype(np.uint8).tobytes())
+        neighbors = [(d_row * width + d_col, cost) for (d_row, d_col), cost in zip(DIRECTIONS.tolist(), STEP_COSTS.tolist())]
+        distance = [inf] * len(open_cells)
+        rows, cols = np.nonzero(target & self.walkable)
+        # every source is at distance 0, and in increasing order of index, which is already a heap
+        open_heap = [(0.0, cell) for cell in ((rows + 1) * width + cols + 1).tolist()]
+        for _, cell in open_heap:
+            distance[cell] = 0.0
+        while open_heap:
+            cell_distance, cell = heappop(open_heap)
+            # a cell is pushed again whenever a shorter way to it is found; only the shortest counts
+            if cell_distance > distance[cell]:
+                continue
+            for step, cost in neighbors:
+                neighbor = cell + step
+                if open_cells[neighbor] and cell_distance + cost < distance[neighbor]:
+                    distance[neighbor] = cell_distance + cost
+                    heappush(open_heap, (cell_distance + cost, neighbor))
+        distance = np.array(distance).reshape(self.num_rows + 2, width)[1:-1, 1:-1]
+
+        # every cell (walkable or not, since individuals can be placed on obstacles) steps to the
+        #       neighbor that leaves it the shortest distance left to walk
+        candidates = np.stack([self.__shifted(distance, direction, np.inf) + STEP_COSTS[direction] \
+            for direction in range(len(DIRECTIONS))])
+        next_hop = np.argmin(candidates, axis=0).astype(np.int8)
+        next_hop[np.isinf(candidates.min(axis=0))] = -1
+        next_hop[target] = -1
+        return distance.astype(np.float32), next_hop
+
+    def __is_walkable(self, row, col):
+        """
+        Purpose:    Check if a spot is on the terrain and not an obstacle
+        Input:      The spot's row and column
+        Output:     True if an individual can step onto the spot. False otherwise.
+        """
+        return 0 <= row < self.num_rows and 0 <= col < self.num_cols and self.walkable[row, col]
+
+    """
+     /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          | $$      | $$|__/                | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$ /$$   /$$| $$$$$$$ | $$ /$$  /$$$$$$$      | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/| $$  | $$| $$__  $$| $$| $$ /$$_____/      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  | $$| $$  \ $$| $$| $$| $$            | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$  | $$| $$  | $$| $$| $$| $$            | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      |  $$$$$$/| $$$$$$$/| $$| $$|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/       \______/ |_______/ |__/|__/ \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def next_step(self, location, patch, tendency):
+        """
+        Purpose:    Find the spot an individual steps to next on their way to their tendency
+        Input:      The individual's (row, col) location, the patch their tendency is in, and
+                    their (row, col) tendency
+        Output:     The (row, col) of the next spot, or None if the individual has arrived (or
+                    can't get any closer)
+        """
+        row, col = int(location[0]), int(location[1])
+        top, left, bottom, right = self.regions[patch]
+        # outside of the patch, follow the next hops into it
+        if not (top <= row <= bottom and left <= col <= right):
+            direction = self.next_hop[patch, row, col]
+            if direction < 0:
+                return None
+            return (row + int(DIRECTIONS[direction][0]), col + int(DIRECTIONS[direction][1]))
+        # inside of the patch, step straight towards the tendency, sliding along obstacles if needed
+        target_row = int(min(max(tendency[0], top), bottom))
+        target_col = int(min(max(tendency[1], left), right))
+        d_row = (target_row > row) - (target_row < row)
+        d_col = (target_col > col) - (target_col < col)
+        for step_row, step_col in ((d_row, d_col), (d_row, 0), (0, d_col)):
+            if (step_row or step_col) and self.__is_walkable(row + step_row, col + step_col):
+                return (row + step_row, col + step_col)
+        return None
+
+    def next_steps(self, rows, cols, patches, tendency_rows, tendency_cols):
+        """
+        Purpose:    `next_step` for a whole population at once
+        Input:      Arrays of the individuals' rows, columns, tendency patches, tendency rows,
+                    and tendency columns
+        Output:     Arrays of the individuals' next rows and columns, and a boolean array that
+                    is True for the individuals that have arrived (their row and column are unchanged)
+        """
+        next_rows, next_cols = rows.copy(), cols.copy()
+        top, left, bottom, right = self.regions[patches].T
+        inside = (top <= rows) & (rows <= bottom) & (left <= cols) & (cols <= right)
+        moved = np.zeros(len(rows), dtype=bool)
+
+        # outside of the patch, follow the next hops into it
+        outside = np.nonzero(~inside)[0]
+        direction = self.next_hop[patches[outside], rows[outside], cols[outside]]
+        has_hop = direction >= 0
+        outside, direction = outside[has_hop], direction[has_hop]
+        next_rows[outside] += DIRECTIONS[direction, 0]
+        next_cols[outside] += DIRECTIONS[direction, 1]
+        moved[outside] = True
+
+        # inside of the patch, step straight towards the tendency, sliding along obstacles if needed
+        inside = np.nonzero(inside)[0]
+        target_rows = np.clip(tendency_rows[inside], top[inside], bottom[inside])
+        target_cols = np.clip(tendency_cols[inside], left[inside], right[inside])
+        d_row = np.sign(target_rows - rows[inside])
+        d_col = np.sign(target_cols - cols[inside])
+        for step_row, step_col in ((d_row, d_col), (d_row, 0 * d_col), (0 * d_row, d_col)):
+            candidate_rows, candidate_cols = rows[inside] + step_row, cols[inside] + step_col
+            on_terrain = (candidate_rows >= 0) & (candidate_rows < self.num_rows) & (candidate_cols >= 0) & (candidate_cols < self.num_cols)
+            can_step = ~moved[inside] & ((step_row != 0) | (step_col != 0)) & on_terrain
+            can_step[can_step] = self.walkable[candidate_rows[can_step], candidate_cols[can_step]]
+            next_rows[inside[can_step]] = candidate_rows[can_step]
+            next_cols[inside[can_step]] = candidate_cols[can_step]
+            moved[inside[can_step]] = True
+        return next_rows, next_cols, ~moved
@@ -0,0 +1,260 @@
+"""
+Module:     Simulation_Config.py
+Purpose:    To parse and check a parameter file once, into an object holding every setting of one
+            simulation, whose terrain, route table, random number streams, and event log are only
+            built the first time they are used. Importing the simulation's modules costs nothing,
+            several simulations can be set up side by side in one process, and simulations on the
+            same terrain share it
+"""
+
+from functools import cached_property
+from json import loads
+import Obstacle
+import Random_Streams
+import Event_Log
+import Route_Table
+
+# the values the parameter file's choices can take
+ENGINES = ("object", "vectorized", "parallel")
+GRID_MODES = ("dense", "sparse")
+ROUTINGS = ("astar", "route_table")
+PATHFINDERS = ("jps", "astar", "library")
+ANIMATION_FORMATS = ("gif", "apng", "mp4")
+METRICS_FORMATS = ("none", "csv", "npz", "binary")
+
+class Simulation_Config():
+    """
+    class:      Simulation_Config
+    input:      `params`: the parameter file's contents as a dictionary (see `from_file`)
+    purpose:    Every setting of the parameter file is an attribute, named as it was in
+                `constants.py`, and every choice is checked here instead of halfway through a run.
+                `terrain_grid`, `route_table`, `rng`, and `event_log` are built on first use. The
+                terrain and route table come from the caches in `Obstacle.py` and `Route_Table.py`,
+                so a second config on the same terrain doesn't load it again.
+    """
+    def __init__(self, params):
+        self.PARAMS = params
+
+        # paths to the resources and output folders
+        self.RESOURCES_FOLDER = params["resources"]
+        self.OUTPUT_FOLDER = params["output"]
+
+        # a boolean that's true when the user wants to visualize the simulation
+        self.MAKE_GIF = params["simulation"]["visualize"]
+
+        # the number of background threads resizing and quantizing the visualization's frames, so the
+        #       simulation doesn't wait for each one to be encoded
+        self.RENDER_WORKERS = params["simulation"].get("render_workers", 2)
+
+        # how the visualization is encoded: its format ("gif", "apng", or "mp4", which needs the
+        #       `imageio-ffmpeg` package), frames per second, size in pixels along its longer side (0 keeps
+        #       the canvas' size), which days are drawn (every day, every other day, ...), the number of
+        #       colors every frame is quantized to (0 doesn't quantize, except a GIF always has 256), and
+        #       how many frames may wait to be encoded before the simulation waits for them
+        animation = params.get("animation", {})
+        self.ANIMATION_FORMAT = animation.get("format", "gif")
+        self.ANIMATION_FPS = animation.get("fps", 10)
+        self.ANIMATION_SIZE = animation.get("size", 0)
+        self.ANIMATION_STRIDE = max(1, animation.get("stride", 1))
+        self.ANIMATION_PALETTE = animation.get("palette", 0)
+        self.ANIMATION_QUEUE = animation.get("queue", 8)
+
+        # every disease's parameters, in the order of their keys in the parameter file, so a
+        #       disease's number is its index in the list
+        self.DISEASE_LIST = []
+        for _, diseaseNumParam in params["diseases"].items():
+            self.DISEASE_LIST.append({
+                "INIT_INFECTIOUS": diseaseNumParam["init_infected"],
+                "AGE_DIST_DISEASE": diseaseNumParam["age_dist_disease"],
+                "LATENT_PERIOD_MIN": diseaseNumParam["latent_period_min"],
+                "LATENT_PERIOD_MAX": diseaseNumParam["latent_period_max"],
+                "INFECTIOUS_PERIOD_MIN": diseaseNumParam["infectious_period_min"],
+                "INFECTIOUS_PERIOD_MAX": diseaseNumParam["infectious_period_max"],
+                "TRANS_RATE": diseaseNumParam["transmission_rate"],
+                "MASK_CHANCE": diseaseNumParam["mask_wearer"],
+                "QUARAN_CHANCE": diseaseNumParam["separator"],
+                "SYMP_CHANCE": diseaseNumParam["symptomatic"],
+                "NEIGHBORHOOD": diseaseNumParam["neighborhood"],
+                "IS_SLIS": diseaseNumParam["SLIS"],
+                "IMMUNITY_DURATION_MIN": diseaseNumParam["immunity_duration_min"],
+                "IMMUNITY_DURATION_MAX": diseaseNumParam["immunity_duration_max"]
+            })
+
+        # the size of the simulation grid without the one-cell border. The grid doesn't have to be square
+        self.NUM_ROWS = params["simulation"]["num_row"]
+        self.NUM_COLS = params["simulation"]["num_col"]
+        # the size of the simulation grid with a one-cell border added to all four sides
+        self.NUM_ROWS_FULL = self.NUM_ROWS+2
+        self.NUM_COLS_FULL = self.NUM_COLS+2
+        # variables that will keep any for-loops using them from traversing through the one-cell
+        #       border of the simulation grid
+        self.ROW_LIMIT = self.NUM_ROWS+1
+        self.COL_LIMIT = self.NUM_COLS+1
+
+        # number of individuals in the simulation, their age distribution, and the maximum number
+        #       of days the simulation will run
+        self.POPULATION = params["simulation"]["population"]
+        self.AGE_DIST = params["simulation"]["age_dist"]
+        self.SIM_MAX = params["simulation"]["sim_max"]
+
+        # which engine processes each simulated day: "object" walks the grid one Individual at a time,
+        #       "vectorized" holds the whole population in NumPy arrays, and "parallel" splits the grid
+        #       into bands of rows, each held in NumPy arrays by its own worker process
+        self.ENGINE = params["simulation"].get("engine", "object")
+
+        # the number of worker processes (and so bands of rows) the "parallel" engine splits the grid
+        #       into. 0 uses one for every core
+        self.WORKERS = params["simulation"].get("workers", 0)
+
+        # how the simulation grid is stored: "dense" keeps an entry for every cell, "sparse" only keeps the
+        #       occupied cells and the infectious counts of the cells that hold infectious individuals
+        self.GRID_MODE = params["simulation"].get("grid_mode", "dense")
+
+        # a boolean that's true when the incrementally updated count of infectious individuals in each
+        #       cell should be checked against a full recount at the end of every day (slow; for debugging)
+        self.VERIFY_INFECTIOUS_COUNTS = params["simulation"].get("verify_infectious_counts", False)
+
+        # how individuals find their way to their tendency: "astar" runs A* for every trip, "route_table"
+        #       follows a table of next steps towards each patch that is precomputed once per terrain
+        self.ROUTING = params["simulation"].get("routing", "astar")
+
+        # the most paths, and the most steps summed over every path, the cache of A* paths holds. A
+        #       size of 0 turns the cache off
+        self.PATH_CACHE_SIZE = params["simulation"].get("path_cache", {}).get("size", 0)
+        self.PATH_CACHE_MAX_STEPS = params["simulation"].get("path_cache", {}).get("max_steps", 0)
+
+        # the algorithm that finds A* paths: "jps" (Jump Point Search on a compact occupancy map, falling
+        #       back to A* if the terrain has weights), "astar", or "library" (the `pathfinding` library)
+        self.PATHFINDER = params["simulation"].get("pathfinder", "jps")
+
+        # the terrain file in the resources folder: a text file with one digit per cell, a binary terrain
+        #       file (see `Terrain_File.py`), or a ".npy" file holding a 2D uint8 array
+        self.TERRAIN_FILE = self.RESOURCES_FOLDER + params["simulation"].get("terrain", "terrain.txt")
+
+        # the seed every random number in the simulation is derived from. `None` (or leaving it out of
+        #       the parameter file) draws a fresh seed from the OS every run
+        self.SEED = params["simulation"].get("seed", None)
+
+        # how much the event log records (see `Event_Log.py`) and the file in the output folder it
+        #       is written to
+        self.EVENT_LOG_LEVEL = params.get("event_log", {}).get("level", Event_Log.LEVEL_OFF)
+        self.EVENT_LOG_FILE = params.get("event_log", {}).get("file", "events.bin")
+
+        # how often (in days) a checkpoint is saved (0 never saves one), the file in the output folder
+        #       it is saved to, and whether every checkpoint is kept instead of only the latest one
+        self.CHECKPOINT_EVERY = params.get("checkpoint", {}).get("every", 0)
+        self.CHECKPOINT_FILE = params.get("checkpoint", {}).get("file", "checkpoint.npz")
+        self.CHECKPOINT_KEEP = params.get("checkpoint", {}).get("keep", False)
+
+        # whether every day's occupied cells are exported to a grid state file in the output folder
+        #       (see `Grid_State_File.py`), and its name
+        self.GRID_STATES_EXPORT = params.get("grid_states", {}).get("export", False)
+        self.GRID_STATES_FILE = params.get("grid_states", {}).get("file", "grid_states.bin")
+
+        # the format every day's counts are also written in as typed rows (see `Metrics_Sink.py`), the
+        #       file in the output folder (without its extension), and whether each day is also
+        #       broken down by age group and by patch
+        self.METRICS_FORMAT = params.get("metrics", {}).get("format", "none")
+        self.METRICS_FILE = params.get("metrics", {}).get("file", "metrics")
+        self.METRICS_BY_AGE = params.get("metrics", {}).get("by_age", False)
+        self.METRICS_BY_PATCH = params.get("metrics", {}).get("by_patch", False)
+
+        # locations in simulation grid where individuals will travel to and from, and how many there are
+        self.PATCHES = params["simulation"]["patches"]
+        self.NUM_PATCHES = len(self.PATCHES)
+
+        self.validate()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Purpose:    Load a parameter file
+        Input:      The path to the JSON parameter file
+        Output:     A `Simulation_Config` object
+        """
+        with open(path, 'r') as f:
+            return cls(loads(f.read()))
+
+    def validate(self):
+        """
+        Purpose:    Check every choice and size in the parameters, so a mistake is reported before
+                    anything is built instead of partway through a run
+        Input:      None
+        Output:     None
+        """
+        for name, value, choices in (("engine", self.ENGINE, ENGINES), ("grid_mode", self.GRID_MODE, GRID_MODES), \
+            ("routing", self.ROUTING, ROUTINGS), ("pathfinder", self.PATHFINDER, PATHFINDERS), \
+                ("animation format", self.ANIMATION_FORMAT, ANIMATION_FORMATS), ("metrics format", self.METRICS_FORMAT, METRICS_FORMATS)):
+            if value not in choices:
+                quoted = ["\"" + choice + "\"" for choice in choices]
+                raise ValueError("Unknown " + name + " \"" + str(value) + "\". Use " + \
+                    (", ".join(quoted[:-1]) + "," if len(quoted) > 2 else quoted[0]) + " or " + quoted[-1] + ".")
+        # an "mp4" animation needs optional packages, which are checked for now instead of at the first frame
+        if self.MAKE_GIF and self.ANIMATION_FORMAT == "mp4":
+            from Frame_Encoder import check_mp4_support
+            check_mp4_support()
+        if self.NUM_ROWS < 1 or self.NUM_COLS < 1:
+            raise ValueError("The simulation grid must have at least one row and column, not " + str(self.NUM_ROWS) + " by " + str(self.NUM_COLS))
+        if self.WORKERS < 0:
+            raise ValueError("The number of workers can't be negative (" + str(self.WORKERS) + ")")
+        if self.POPULATION < 0:
+            raise ValueError("The population can't be negative (" + str(self.POPULATION) + ")")
+        if not self.DISEASE_LIST:
+            raise ValueError("The parameters must have at least one disease")
+        if not self.PATCHES:
+            raise ValueError("The parameters must have at least one patch")
+        for patch in range(self.NUM_PATCHES):
+            if str(patch) not in self.PATCHES:
+                raise ValueError("The patches must be numbered from 0 to " + str(self.NUM_PATCHES - 1) + ", but patch " + str(patch) + " is missing")
+            top, left, bottom, right = self.PATCHES[str(patch)]["bounds"]
+            if not (0 <= top <= bottom < self.NUM_ROWS and 0 <= left <= right < self.NUM_COLS):
+                raise ValueError("Patch " + str(patch) + "'s bounds " + str([top, left, bottom, right]) + \
+                    " aren't inside the " + str(self.NUM_ROWS) + " by " + str(self.NUM_COLS) + " simulation grid")
+        for disease in self.DISEASE_LIST:
+            if len(disease["AGE_DIST_DISEASE"]) < len(self.AGE_DIST):
+                raise ValueError("Every disease's \"age_dist_disease\" needs a chance for each age in \"age_dist\"")
+
+    @cached_property
+    def terrain_grid(self):
+        """
+        The `Obstacle_Grid` individuals find their way through, loaded (or reused) on first use
+        """
+        terrain_grid = Obstacle.load_obstacle_grid(self.PATH_CACHE_SIZE, self.PATH_CACHE_MAX_STEPS, self.PATHFINDER, self.TERRAIN_FILE)
+        if (terrain_grid.num_rows, terrain_grid.num_cols) != (self.NUM_ROWS, self.NUM_COLS):
+            raise ValueError(self.TERRAIN_FILE + " is " + str(terrain_grid.num_rows) + " rows by " + str(terrain_grid.num_cols) + \
+                " columns, but the simulation grid is " + str(self.NUM_ROWS) + " by " + str(self.NUM_COLS) + " (\"num_row\" and \"num_col\")")
+        return terrain_grid
+
+    @cached_property
+    def route_table(self):
+        """
+        The precomputed routes to each patch, or None if individuals use A* to find their way
+        """
+        if self.ROUTING != "route_table":
+            return None
+        return Route_Table.load_route_table(self.terrain_grid.terrain_grid, self.terrain_grid.terrain_hash, self.PATCHES, self.RESOURCES_FOLDER)
+
+    @cached_property
+    def rng(self):
+        """
+        The random number streams for movement, infection, initial placement, and demographics
+        """
+        return Random_Streams.Random_Streams(self.SEED)
+
+    @cached_property
+    def event_log(self):
+        """
+        The event log every engine records what happens to individuals in
+        """
+        return Event_Log.Event_Log(self.OUTPUT_FOLDER+self.EVENT_LOG_FILE, self.EVENT_LOG_LEVEL)
+
+    def new_run(self):
+        """
+        Purpose:    Forget the random number streams and event log of the last run, so the next
+                    run with this config starts from the seed again. The terrain and route table
+                    are kept
+        Input:      None
+        Output:     None
+        """
+        self.__dict__.pop("rng", None)
+        self.__dict__.pop("event_log", None)
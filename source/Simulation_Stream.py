@@ -0,0 +1,169 @@
+"""
+Module:     Simulation_Stream.py
+Purpose:    To run a simulation in the background of an asyncio program and hand its days over as
+            they happen, so dashboards, early stopping, and output sinks can consume them while the
+            next day is being simulated
+Usage:      async for day, state_list in run(config):
+                ...
+            or, to stop the run as soon as the loop is left:
+            async with Simulation_Stream(config) as days:
+                async for day, state_list in days:
+                    if state_list[2][0] > 100:
+                        break
+"""
+
+import asyncio
+import constants
+from main import create_automaton
+
+# put on the queue after the last day
+END = None
+
+class Simulation_Stream():
+    """
+    class:      Simulation_Stream
+    input:      `config`: the `Simulation_Config` to run (by default, the one in `constants.py`).
+                Two streams running at the same time need their own configs, since a config holds
+                the random number streams and event log of one run
+                `queue_days`: how many days the simulation may get ahead of the consumer before it
+                waits for them to be taken
+                `executor`: the `concurrent.futures` executor the days are simulated in (by
+                default, the event loop's)
+    purpose:    An async iterator of (day, `state_list`) pairs, the same counts `main.py` writes to
+                `CAoutput.csv`. The automaton is created and every day processed in the executor,
+                one call at a time, so the event loop is never blocked, and each day is put on a
+                bounded queue as soon as it starts. A consumer that falls behind makes the
+                simulation wait instead of the queue growing. `stop` (or leaving `async with`)
+                lets the day being processed finish, then ends the run and closes its event log,
+                so a run stopped mid-epidemic leaves complete days behind. The automaton is
+                kept for looking at afterwards, but a "parallel" one's workers are stopped.
+    """
+    def __init__(self, config=None, queue_days=4, executor=None):
+        self.config = config if config is not None else constants.current_config()
+        self.queue_days = queue_days
+        self.executor = executor
+        # the automaton, once it is created, so it can be looked at after the run
+        self.simulation_grid = None
+        self.queue = None
+        self.producer = None
+        self.stopping = False
+        # the first error the simulation ran into, raised again to the consumer
+        self.error = None
+
+    def start(self):
+        """
+        Purpose:    Start simulating in the background. Iterating starts the run if it hasn't been
+        Input:      None
+        Output:     None
+        """
+        if self.producer is None:
+            self.queue = asyncio.Queue(max(1, self.queue_days))
+            self.producer = asyncio.get_running_loop().create_task(self.__produce())
+
+    async def stop(self):
+        """
+        Purpose:    End the run after the day being processed, and wait until it has
+        Input:      None
+        Output:     None
+        """
+        self.stopping = True
+        if self.producer is None:
+            return
+        # the simulation may be waiting for room on the queue, which nobody will take days off
+        #       anymore. Once there is room it puts its day and sees it has to stop
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        # shielded, so cancelling the consumer while it waits doesn't cancel the day being
+        #       processed; the run still ends cleanly once the day is done
+        await asyncio.shield(self.producer)
+        if self.error is not None:
+            raise self.error
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.stopping:
+            raise StopAsyncIteration
+        self.start()
+        item = await self.queue.get()
+        if item is END:
+            self.stopping = True
+            await asyncio.shield(self.producer)
+            if self.error is not None:
+                raise self.error
+            raise StopAsyncIteration
+        return item
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, error_type, error, traceback):
+        await self.stop()
+
+    async def __produce(self):
+        """
+        Purpose:    Simulate days in the executor and put each one on the queue, until the
+                    simulation ends or the run is stopped
+        Input:      None
+        Output:     None
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            self.simulation_grid = await loop.run_in_executor(self.executor, create_automaton, self.config)
+            sim_ended = False
+            while not self.stopping:
+                day, state_list = self.simulation_grid.start_of_day_metrics()
+                # copied, so the consumer never sees the counts of a day that is still being processed
+                await self.queue.put((day, [list(counts) for counts in state_list]))
+                if sim_ended or self.stopping:
+                    break
+                sim_ended = await loop.run_in_executor(self.executor, self.simulation_grid.process_day)
+        except Exception as error:
+            self.error = error
+        finally:
+            # write out whatever is left in the event log's buffer
+            self.config.event_log.close()
+            # and stop the parallel engine's worker processes, which aren't needed anymore
+            if self.simulation_grid is not None and hasattr(self.simulation_grid, "close"):
+                self.simulation_grid.close()
+        if not self.stopping:
+            await self.queue.put(END)
+
+async def run(config=None, queue_days=4, executor=None):
+    """
+    Purpose:    Run a simulation, handing over its days as they happen. Leaving the loop early
+                stops the run (once the generator is closed)
+    Input:      The config, the most days the simulation may get ahead of the consumer, and the
+                executor to simulate in (see `Simulation_Stream`)
+    Output:     An async generator of (day, `state_list`) pairs
+    """
+    async with Simulation_Stream(config, queue_days, executor) as days:
+        async for day, state_list in days:
+            yield day, state_list
+
+"""
+                         /$$
+                        |__/
+ /$$$$$$/$$$$   /$$$$$$  /$$ /$$$$$$$
+| $$_  $$_  $$ |____  $$| $$| $$__  $$
+| $$ \ $$ \ $$  /$$$$$$$| $$| $$  \ $$
+| $$ | $$ | $$ /$$__  $$| $$| $$  | $$
+| $$ | $$ | $$|  $$$$$$$| $$| $$  | $$
+|__/ |__/ |__/ \_______/|__/|__/  |__/
+"""
+
+if __name__ == "__main__":
+    # python Simulation_Stream.py <parameter file> [last day]
+    #       prints every day as it happens, stopping after "last day" if it is given
+    from sys import argv
+
+    async def print_days(last_day):
+        async with Simulation_Stream() as days:
+            async for day, state_list in days:
+                print(day, state_list)
+                if day == last_day:
+                    break
+
+    asyncio.run(print_days(int(argv[2]) if len(argv) > 2 else None))
@@ -0,0 +1,111 @@
+"""
+Module:     Sparse_Grid.py
+Purpose:    To store the number of infectious individuals in each cell of the simulation grid
+            only for the cells that hold any, so the memory and per-day work of the "sparse" grid
+            mode scale with the population instead of the area of the grid
+"""
+
+import numpy as np
+
+class Sparse_Count_Grid():
+    """
+    class:      Sparse_Count_Grid
+    input:      `num_diseases`: how many diseases a count is kept for
+    purpose:    A drop-in for the (row, col, disease) NumPy array of infectious counts the object
+                engine keeps, backed by a dictionary keyed by (row, col). Only cells holding at
+                least one infectious individual have an entry, so looking up a cell that isn't
+                next to anyone infectious finds nothing and reads as zero. A cell's entry is
+                dropped as soon as its last infectious individual leaves or recovers.
+    """
+    def __init__(self, num_diseases):
+        self.num_diseases = num_diseases
+        # (row, col) -> list of the number of infectious individuals of each disease
+        self.counts = {}
+
+    def __getitem__(self, key):
+        row, col, disease = key
+        counts = self.counts.get((row, col))
+        return 0 if counts is None else counts[disease]
+
+    def __setitem__(self, key, value):
+        row, col, disease = key
+        counts = self.counts.get((row, col))
+        if counts is None:
+            if value == 0:
+                return
+            counts = self.counts[(row, col)] = [0] * self.num_diseases
+        counts[disease] = value
+        if not any(counts):
+            del self.counts[(row, col)]
+
+    def __len__(self):
+        return len(self.counts)
+
+    def mismatches(self, other):
+        """
+        Purpose:    Compare two grids cell by cell
+        Input:      The other `Sparse_Count_Grid`
+        Output:     A list of the (row, col, disease) entries the two grids disagree on
+        """
+        mismatches = []
+        for cell in self.counts.keys() | other.counts.keys():
+            for disease in range(self.num_diseases):
+                if self[cell + (disease,)] != other[cell + (disease,)]:
+                    mismatches.append(cell + (disease,))
+        return sorted(mismatches)
+
+class Sorted_Count_Grid():
+    """
+    class:      Sorted_Count_Grid
+    input:      `num_rows`, `num_cols`: the size of the simulation grid, including its border
+                `num_diseases`: how many diseases a count is kept for
+    purpose:    The vectorized engine's infectious counts in the "sparse" grid mode: a sorted array
+                of the (row-major) ids of the cells holding infectious individuals, with a row of
+                per-disease counts for each. Every individual's neighbors are looked up with one
+                binary search per neighboring cell, instead of convolving the whole grid.
+    """
+    def __init__(self, num_rows, num_cols, num_diseases):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_diseases = num_diseases
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros((0, num_diseases), dtype=np.int32)
+
+    def recount(self, rows, cols, infectious):
+        """
+        Purpose:    Count the infectious individuals in every cell from scratch
+        Input:      Arrays of every individual's row and column, and a (population, disease)
+                    boolean array of who is infectious with what
+        Output:     None
+        """
+        anyone = infectious.any(axis=1)
+        cells = rows[anyone].astype(np.int64) * self.num_cols + cols[anyone]
+        self.cells, slots = np.unique(cells, return_inverse=True)
+        self.counts = np.zeros((len(self.cells), self.num_diseases), dtype=np.int32)
+        np.add.at(self.counts, slots.reshape(-1), infectious[anyone].astype(np.int32))
+
+    def neighborhood_counts(self, rows, cols, kernel):
+        """
+        Purpose:    Count the infectious individuals around each of a set of cells
+        Input:      Arrays of the cells' rows and columns, and the (3, 3, disease) neighborhood
+                    kernel, whose [1, 1] entry is the cell itself
+        Output:     A (cell, disease) array of the number of infectious neighbors
+        """
+        rows = rows.astype(np.int64)
+        cols = cols.astype(np.int64)
+        num_infectious_neighbors = np.zeros((len(rows), self.num_diseases), dtype=np.int32)
+        if len(self.cells) == 0:
+            return num_infectious_neighbors
+        for d_row in range(3):
+            for d_col in range(3):
+                if not kernel[d_row, d_col].any():
+                    continue
+                neighbor_rows = rows + d_row - 1
+                neighbor_cols = cols + d_col - 1
+                # cells past the edge of the grid have no infectious individuals in them
+                inside = (neighbor_rows >= 0) & (neighbor_rows < self.num_rows) & (neighbor_cols >= 0) & (neighbor_cols < self.num_cols)
+                neighbors = neighbor_rows * self.num_cols + neighbor_cols
+                slots = np.minimum(np.searchsorted(self.cells, neighbors), len(self.cells) - 1)
+                found = inside & (self.cells[slots] == neighbors)
+                num_infectious_neighbors[found] += kernel[d_row, d_col] * self.counts[slots[found]]
+        return num_infectious_neighbors
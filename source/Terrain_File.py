@@ -0,0 +1,110 @@
+"""
+Module:     Terrain_File.py
+Purpose:    To store terrains in a binary file that is memory-mapped instead of parsed, so a
+            terrain of millions of cells loads instantly and every process reading it shares
+            the same pages of memory
+"""
+
+from hashlib import sha1
+from os import replace
+import struct
+import numpy as np
+
+# the first bytes of every terrain file, and the version of the layout below
+MAGIC = b"SLIRTERR"
+VERSION = 1
+# how the cells are stored: one byte per cell (the cost of stepping onto it), or one bit per cell
+#       (walkable or not) for terrains without weights
+ENCODING_UINT8 = 0
+ENCODING_BITS = 1
+# magic, version, encoding, rows, cols, and the sha1 of the terrain, padded so the cells start on
+#       a 64 byte boundary
+HEADER = struct.Struct("<8sHBxII20s")
+HEADER_SIZE = 64
+
+def terrain_fingerprint(terrain):
+    """
+    Purpose:    Hash a terrain's cells. The shape is part of the hash, since the same bytes can be
+                laid out in many shapes. Large terrains are hashed a band of rows at a time, so a
+                memory-mapped terrain is never read into memory all at once
+    Input:      A (row, col) uint8 NumPy array
+    Output:     The sha1 hex digest
+    """
+    fingerprint = sha1(str(terrain.shape).encode())
+    for row in range(0, terrain.shape[0], 4096):
+        fingerprint.update(np.ascontiguousarray(terrain[row:row+4096]).data)
+    return fingerprint.hexdigest()
+
+def write_terrain(file_name, terrain, packed=False):
+    """
+    Purpose:    Write a terrain file. It is written next to its final name first and then renamed,
+                so a half-written terrain is never left behind
+    Input:      The path to write, a 2D array of the terrain (zeros are obstacles, all values
+                greater than zero are the cost of stepping onto that cell, up to 255), and whether
+                to store one bit per cell instead of one byte. Bits can only hold terrains whose
+                open cells all cost 1, and the loaded terrain is then unpacked into memory instead
+                of being mapped
+    Output:     The terrain's fingerprint
+    """
+    terrain = np.asarray(terrain)
+    if terrain.ndim != 2:
+        raise ValueError("A terrain must be 2D, not " + str(terrain.ndim) + "D")
+    if terrain.min(initial=0) < 0 or terrain.max(initial=0) > 255:
+        raise ValueError("Terrain costs must be between 0 and 255")
+    terrain = terrain.astype(np.uint8, copy=False)
+    if packed and terrain.max(initial=0) > 1:
+        raise ValueError("Only terrains whose open cells all cost 1 can be stored one bit per cell")
+    fingerprint = terrain_fingerprint(terrain)
+    num_rows, num_cols = terrain.shape
+    header = HEADER.pack(MAGIC, VERSION, ENCODING_BITS if packed else ENCODING_UINT8, num_rows, num_cols, bytes.fromhex(fingerprint))
+    with open(file_name + ".tmp", 'wb') as outfile:
+        outfile.write(header.ljust(HEADER_SIZE, b'\0'))
+        for row in range(0, num_rows, 4096):
+            band = terrain[row:row+4096]
+            outfile.write(np.packbits(band, axis=1).tobytes() if packed else np.ascontiguousarray(band).tobytes())
+    replace(file_name + ".tmp", file_name)
+    return fingerprint
+
+def is_terrain_file(file_name):
+    """
+    Purpose:    Check if a file is a terrain file, by its first bytes rather than its name
+    Input:      The path to the file
+    Output:     True if the file starts with `MAGIC`. False otherwise
+    """
+    with open(file_name, 'rb') as infile:
+        return infile.read(len(MAGIC)) == MAGIC
+
+def read_header(file_name):
+    """
+    Purpose:    Read and check a terrain file's header
+    Input:      The path to the terrain file
+    Output:     A tuple of the encoding, the number of rows and columns, and the fingerprint
+    """
+    with open(file_name, 'rb') as infile:
+        header = infile.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(file_name + " is not a terrain file")
+    _, version, encoding, num_rows, num_cols, fingerprint = HEADER.unpack_from(header)
+    if version != VERSION:
+        raise ValueError(file_name + " is a version " + str(version) + " terrain file, but only version " + str(VERSION) + " can be read")
+    if encoding not in (ENCODING_UINT8, ENCODING_BITS):
+        raise ValueError(file_name + " has an unknown cell encoding (" + str(encoding) + ")")
+    return encoding, num_rows, num_cols, fingerprint.hex()
+
+def read_terrain(file_name, verify=False):
+    """
+    Purpose:    Load a terrain file. One byte per cell terrains are memory-mapped read-only, so
+                nothing is copied or parsed; the fingerprint is read from the header
+    Input:      The path to the terrain file, and whether to rehash the cells and check them
+                against the fingerprint in the header (reads the whole terrain)
+    Output:     A tuple of the terrain, as a (row, col) uint8 NumPy array, and its fingerprint
+    """
+    encoding, num_rows, num_cols, fingerprint = read_header(file_name)
+    if encoding == ENCODING_UINT8:
+        terrain = np.memmap(file_name, dtype=np.uint8, mode='r', offset=HEADER_SIZE, shape=(num_rows, num_cols))
+    else:
+        packed = np.memmap(file_name, dtype=np.uint8, mode='r', offset=HEADER_SIZE, shape=(num_rows, (num_cols + 7) // 8))
+        terrain = np.unpackbits(packed, axis=1, count=num_cols)
+    if verify and terrain_fingerprint(terrain) != fingerprint:
+        raise ValueError(file_name + " is corrupted: its cells don't match the hash in its header")
+    return terrain, fingerprint
@@ -0,0 +1,485 @@
+"""
+Module:     Vectorized_Automaton.py
+Purpose:    To create an array-backed cellular automaton that models the same disease spread
+            as `Cellular_Automaton`, but processes the entire population at once with NumPy
+            instead of walking the grid one Individual at a time
+"""
+
+from collections import namedtuple
+import numpy as np
+import constants
+from Event_Log import EVENT_CREATED, EVENT_TRANSITION, EVENT_EXPOSURE, EVENT_MOVE
+from Occupancy_Index import Occupancy_Index
+from Sparse_Grid import Sorted_Count_Grid
+from Checkpoint import flatten_paths, unflatten_paths
+from Population import choose_locations
+
+# stand-in for an `Individual` when the visualizer asks for the occupied cells. The visualizer
+#       only ever reads an occupant's state of health
+Occupant = namedtuple("Occupant", ["id", "state_of_health"])
+
+# the arrays that hold the state of the population, which a checkpoint has to save
+CHECKPOINT_FIELDS = ("id", "state_of_health", "age", "days_in_state", "days_in_latent", "days_in_infectious", \
+    "immunity_duration", "die_when_recovered", "mask_wearer", "prevention_factor", "quarantiner", "row", "col", \
+        "tendency_patch", "tendency_row", "tendency_col", "path_step")
+
+class Vectorized_Automaton():
+    """
+    class:      Vectorized_Automaton
+    input:      `config`: the `Simulation_Config` of the simulation, with its terrain, random number
+                streams, and event log (by default, the one in `constants.py`)
+    purpose:    A cellular automaton that simulates disease spread in a population held as a
+                structure of arrays. Row `i` of every array below belongs to the individual with
+                the id `i+1`, and column `d` of the two dimensional arrays belongs to disease `d`
+                in `DISEASE_LIST`. The day is still processed in two phases (flag, then apply),
+                so a change to an individual's state of health does not affect their neighbors
+                until the following day.
+    """
+    """
+                     /$$           /$$   /$$
+                    |__/          |__/  | $$
+                    /$$ /$$$$$$$  /$$ /$$$$$$
+                    | $$| $$__  $$| $$|_  $$_/
+                    | $$| $$  \ $$| $$  | $$
+                    | $$| $$  | $$| $$  | $$ /$$
+                    | $$| $$  | $$| $$  |  $$$$/
+    /$$$$$$ /$$$$$$|__/|__/  |__/|__/   \___/   /$$$$$$ /$$$$$$
+    |______/|______/                            |______/|______/
+    """
+    def __init__(self, config=None):
+        self.config = config if config is not None else constants.current_config()
+        # length of simulation in days
+        self.num_days = 0
+
+        # population variables. Like `Cellular_Automaton`, everyone initially infectious is created
+        #       even if they add up to more than the population
+        self.num_diseases = len(self.config.DISEASE_LIST)
+        self.population = max(self.config.POPULATION, sum(disease["INIT_INFECTIOUS"] for disease in self.config.DISEASE_LIST))
+
+        self.state_list = [([0] * self.num_diseases) for state in range(5)]
+        # the rows of the grid the grids below cover, from the first to the one after the last
+        self.grid_rows = (0, self.config.NUM_ROWS_FULL)
+
+        self.__setup_parameters()
+
+        # populate the structure-of-arrays population
+        print("Populating grid with infectious and susceptible individuals")
+        self.__populate()
+
+        self.__setup_grids()
+
+        print("Populated main simulation grid with initially infected and susceptible Individuals")
+
+    """
+     /$$$$$$$            /$$                        /$$                     /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          |__/                       | $$                    | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$  /$$$$$$  /$$ /$$    /$$  /$$$$$$  /$$$$$$    /$$$$$$       | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/ /$$__  $$| $$|  $$  /$$/ |____  $$|_  $$_/   /$$__  $$      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  \__/| $$ \  $$/$$/   /$$$$$$$  | $$    | $$$$$$$$      | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$      | $$  \  $$$/   /$$__  $$  | $$ /$$| $$_____/      | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      | $$      | $$   \  $/   |  $$$$$$$  |  $$$$/|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def __setup_parameters(self):
+        """
+        Purpose:    Turn the per-disease parameters into the vectors and kernel the whole-array
+                    operations use
+        Input:      None
+        Output:     None
+        """
+        # per-disease parameters as vectors so they broadcast against the (population, disease) arrays
+        self.trans_rate = np.array([disease["TRANS_RATE"] for disease in self.config.DISEASE_LIST])
+        self.neighborhood = np.array([disease["NEIGHBORHOOD"] for disease in self.config.DISEASE_LIST])
+
+        # the 3x3 convolution kernel applied to `infectious_count_grid` for each disease. The
+        #       center cell always counts, the north, south, east, and west cells count when using
+        #       the von Neumann neighborhood, and the corner cells count when using the Moore neighborhood
+        self.kernel = np.zeros((3, 3, self.num_diseases), dtype=np.int32)
+        self.kernel[1, 1, :] = 1
+        self.kernel[[0, 1, 1, 2], [1, 0, 2, 1], :] = (self.neighborhood > 0)
+        self.kernel[[0, 0, 2, 2], [0, 2, 0, 2], :] = (self.neighborhood == 2)
+
+    def __setup_grids(self):
+        """
+        Purpose:    Create and fill the grids that are rebuilt from the individuals' locations
+        Input:      None
+        Output:     None
+        """
+        # (row, col, disease) count of infectious individuals in each cell of `grid_rows`, the first
+        #       of which is row 0 of the arrays. In the "sparse" grid mode only the cells holding
+        #       infectious individuals are stored
+        self.sparse = self.config.GRID_MODE == "sparse"
+        num_rows = self.grid_rows[1] - self.grid_rows[0]
+        if self.sparse:
+            self.infectious_count_grid = Sorted_Count_Grid(num_rows, self.config.NUM_COLS_FULL, self.num_diseases)
+        else:
+            self.infectious_count_grid = np.zeros((num_rows, self.config.NUM_COLS_FULL, self.num_diseases), dtype=np.int32)
+        self.count_infectious()
+
+        # which individuals are in each cell of `grid_rows`. Only built when something asks who is where
+        self.occupancy = Occupancy_Index(num_rows, self.config.NUM_COLS_FULL, self.sparse)
+
+    def __populate(self):
+        """
+        Purpose:    Draws every individual's age, disease durations, prevention behavior, location,
+                    and destination as whole arrays
+        Input:      None
+        Output:     None
+        """
+        N, D = self.population, self.num_diseases
+
+        # the ids match the ones `Cellular_Automaton` hands out (starting at one)
+        self.id = np.arange(1, N+1)
+
+        # can be 0 (susceptible), 1 (latent), 2 (infectious), 3 (recovered), or 4 (immune)
+        self.state_of_health = np.zeros((N, D), dtype=np.int8)
+        # the first individuals are the initially infectious ones for each disease, in disease order,
+        #       just like `Cellular_Automaton.__populate_with_infectious`
+        first = 0
+        for disease in range(D):
+            num_infectious = self.config.DISEASE_LIST[disease]["INIT_INFECTIOUS"]
+            self.state_of_health[first:first+num_infectious, disease] = 2
+            first += num_infectious
+
+        # determine every individual's age as an index into the list of possible ages
+        ages = list(self.config.AGE_DIST.keys())
+        self.age = self.config.rng.demographics.choice_batch([self.config.AGE_DIST[age] for age in ages], N)
+
+        # number of units of time each individual has spent in their current state
+        self.days_in_state = np.zeros((N, D), dtype=np.int16)
+        # number of days each individual will suffer in the latent and infectious stages, and retain immunity
+        self.days_in_latent = np.empty((N, D), dtype=np.int16)
+        self.days_in_infectious = np.empty((N, D), dtype=np.int16)
+        self.immunity_duration = np.empty((N, D), dtype=np.int16)
+        # individual's prevention behavior for each disease. See `Individual` for their meaning
+        self.die_when_recovered = np.empty((N, D), dtype=bool)
+        self.mask_wearer = np.empty((N, D), dtype=bool)
+        self.prevention_factor = np.empty((N, D), dtype=np.float32)
+        self.quarantiner = np.empty((N, D), dtype=bool)
+        for disease in range(D):
+            params = self.config.DISEASE_LIST[disease]
+            self.days_in_latent[:, disease] = self.config.rng.demographics.randint_batch(params["LATENT_PERIOD_MIN"], params["LATENT_PERIOD_MAX"], N)
+            self.days_in_infectious[:, disease] = self.config.rng.demographics.randint_batch(params["INFECTIOUS_PERIOD_MIN"], params["INFECTIOUS_PERIOD_MAX"], N)
+            self.immunity_duration[:, disease] = self.config.rng.demographics.randint_batch(params["IMMUNITY_DURATION_MIN"], params["IMMUNITY_DURATION_MAX"], N)
+            mortality = np.array([params["AGE_DIST_DISEASE"][age] for age in ages])
+            self.die_when_recovered[:, disease] = self.config.rng.demographics.random_batch(N) < mortality[self.age]
+            self.mask_wearer[:, disease] = self.config.rng.demographics.random_batch(N) < params["MASK_CHANCE"]
+            self.prevention_factor[:, disease] = np.where(self.config.rng.demographics.random_batch(N) < params["MASK_CHANCE"], 0.5, 1.0)
+            self.quarantiner[:, disease] = (self.config.rng.demographics.random_batch(N) < params["QUARAN_CHANCE"]) & (self.config.rng.demographics.random_batch(N) < params["SYMP_CHANCE"])
+
+        # each individual's location in the simulation grid and the location (and patch) they want to travel to
+        _, self.row, self.col = choose_locations(self.config, N, self.config.rng.placement)
+        self.tendency_patch, self.tendency_row, self.tendency_col = choose_locations(self.config, N, self.config.rng.placement)
+
+        # the path to each individual's tendency and how far along it they have walked. A path is
+        #       None until the individual first moves (see `__move`), so creating the population
+        #       doesn't have to find everyone's path up front. Individuals following the route table
+        #       don't need paths at all
+        self.path = [None] * N if self.config.route_table is None else []
+        self.path_step = np.zeros(N, dtype=np.int32)
+
+        if self.config.event_log.transitions:
+            for disease in range(D):
+                self.config.event_log.record_batch(EVENT_CREATED, self.num_days, self.id, disease, new_state=self.state_of_health[:, disease], \
+                    rows=self.row, cols=self.col, detail=np.column_stack((self.days_in_latent[:, disease], \
+                        self.days_in_infectious[:, disease], self.immunity_duration[:, disease])))
+
+    def count_infectious(self, halo=None):
+        """
+        Purpose:    Count the number of infectious people in every cell for every disease
+        Input:      Optionally, infectious individuals who aren't part of this automaton but whose
+                    neighbors are, e.g. the individuals just past the edge of one band of the
+                    grid (see `Parallel_Automaton`), as a tuple of arrays of their rows and
+                    columns and a (individual, disease) boolean array of who is infectious with what
+        Output:     None
+        """
+        rows, cols, infectious = self.row, self.col, self.state_of_health == 2
+        if halo is not None:
+            rows, cols, infectious = np.concatenate((rows, halo[0])), np.concatenate((cols, halo[1])), np.concatenate((infectious, halo[2]))
+        top, bottom = self.grid_rows
+        if top > 0 or bottom < self.config.NUM_ROWS_FULL:
+            # only the individuals in the rows the grid covers are counted, on its own rows
+            inside = (rows >= top) & (rows < bottom)
+            rows, cols, infectious = rows[inside] - top, cols[inside], infectious[inside]
+        if self.sparse:
+            self.infectious_count_grid.recount(rows, cols, infectious)
+            return
+        self.infectious_count_grid.fill(0)
+        for disease in range(self.num_diseases):
+            np.add.at(self.infectious_count_grid[:, :, disease], (rows[infectious[:, disease]], cols[infectious[:, disease]]), 1)
+
+    def __infection_pressure(self):
+        """
+        Purpose:    Convolve `infectious_count_grid` with each disease's neighborhood kernel and
+                    scale it by the transmission rate. In the "sparse" grid mode, only the
+                    neighborhoods of the cells individuals stand in are counted
+        Input:      None
+        Output:     A (population, disease) array holding the chance each individual becomes
+                    infected with each disease if they are susceptible to it
+        """
+        # the rows of the individuals in the grid's own rows (see `grid_rows`)
+        local_row = self.row - self.grid_rows[0] if self.grid_rows[0] else self.row
+        if self.sparse:
+            num_infectious_neighbors = self.infectious_count_grid.neighborhood_counts(local_row, self.col, self.kernel)
+            return num_infectious_neighbors * self.trans_rate
+        if self.population == 0:
+            return np.zeros((0, self.num_diseases))
+        # only the rows individuals stand in are convolved
+        top, bottom = int(local_row.min()), int(local_row.max()) + 1
+        rows, cols = bottom - top, self.infectious_count_grid.shape[1]
+        # the rows from just above the top one to just below the bottom one, padded with zeros
+        #       where they are past the grid, so the neighbors of the border cells can be sliced like any other
+        first, last = max(top - 1, 0), min(bottom + 1, self.infectious_count_grid.shape[0])
+        padded = np.pad(self.infectious_count_grid[first:last], ((1 - (top - first), 1 - (last - bottom)), (1, 1), (0, 0)))
+        num_infectious_neighbors = np.zeros((rows, cols, self.num_diseases), dtype=self.infectious_count_grid.dtype)
+        for d_row in range(3):
+            for d_col in range(3):
+                num_infectious_neighbors += self.kernel[d_row, d_col] * padded[d_row:d_row+rows, d_col:d_col+cols]
+        # For N infectious people in your neighborhood, you have N * TRANS_RATE chance of getting infected
+        return (num_infectious_neighbors * self.trans_rate)[local_row - top, self.col]
+
+    def __move(self):
+        """
+        Purpose:    Moves every individual one spot along their path, selecting a new destination
+                    for the individuals that have reached theirs
+        Input:      None
+        Output:     None
+        """
+        # with the route table, everyone takes their next step in one lookup
+        if self.config.route_table is not None:
+            self.row, self.col, arrived = self.config.route_table.next_steps(self.row, self.col, self.tendency_patch, \
+                self.tendency_row, self.tendency_col)
+            arrived = np.nonzero(arrived)[0]
+            self.tendency_patch[arrived], self.tendency_row[arrived], self.tendency_col[arrived] = \
+                choose_locations(self.config, len(arrived), self.config.rng.movement)
+            return
+
+        arrived = []
+        for i in range(self.population):
+            path = self.path[i]
+            if path is None:
+                path = self.path[i] = self.config.terrain_grid.find_shortest_path((self.row[i], self.col[i]), (self.tendency_row[i], self.tendency_col[i]))
+            step = self.path_step[i]
+            if step < len(path):
+                # the path is a tuple of (x, y) spots in the terrain grid
+                self.row[i] = path[step][1]
+                self.col[i] = path[step][0]
+                self.path_step[i] = step + 1
+            else:
+                arrived.append(i)
+        # individuals that have reached their desired location (tendency) get a new one, and
+        #       will start walking towards it the following day
+        if arrived:
+            arrived = np.array(arrived)
+            self.tendency_patch[arrived], self.tendency_row[arrived], self.tendency_col[arrived] = \
+                choose_locations(self.config, len(arrived), self.config.rng.movement)
+            for i in arrived:
+                self.path[i] = self.config.terrain_grid.find_shortest_path((self.row[i], self.col[i]), (self.tendency_row[i], self.tendency_col[i]))
+            self.path_step[arrived] = 0
+
+    def __count_states(self):
+        """
+        Purpose:    Recounts `self.state_list`, the number of susceptible, latent, infectious,
+                    recovered, and dead individuals for each disease
+        Input:      None
+        Output:     None
+        """
+        self.state_list = [([0] * self.num_diseases) for state in range(5)]
+        # There is only one pool of susceptibles. An individual only counts as susceptible if they are
+        #       susceptible to all diseases, and each element of the `susceptible` element holds that count
+        num_susceptible = int(np.count_nonzero(~self.state_of_health.any(axis=1)))
+        self.state_list[0] = [num_susceptible] * self.num_diseases
+        for state in range(1, 5):
+            self.state_list[state] = np.count_nonzero(self.state_of_health == state, axis=0).tolist()
+
+    """
+     /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$
+    | $$__  $$          | $$      | $$|__/                | $$$    /$$$            | $$    | $$                      | $$
+    | $$  \ $$ /$$   /$$| $$$$$$$ | $$ /$$  /$$$$$$$      | $$$$  /$$$$  /$$$$$$  /$$$$$$  | $$$$$$$   /$$$$$$   /$$$$$$$  /$$$$$$$
+    | $$$$$$$/| $$  | $$| $$__  $$| $$| $$ /$$_____/      | $$ $$/$$ $$ /$$__  $$|_  $$_/  | $$__  $$ /$$__  $$ /$$__  $$ /$$_____/
+    | $$____/ | $$  | $$| $$  \ $$| $$| $$| $$            | $$  $$$| $$| $$$$$$$$  | $$    | $$  \ $$| $$  \ $$| $$  | $$|  $$$$$$
+    | $$      | $$  | $$| $$  | $$| $$| $$| $$            | $$\  $ | $$| $$_____/  | $$ /$$| $$  | $$| $$  | $$| $$  | $$ \____  $$
+    | $$      |  $$$$$$/| $$$$$$$/| $$| $$|  $$$$$$$      | $$ \/  | $$|  $$$$$$$  |  $$$$/| $$  | $$|  $$$$$$/|  $$$$$$$ /$$$$$$$/
+    |__/       \______/ |_______/ |__/|__/ \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/
+    """
+
+    def start_of_day_metrics(self):
+        """
+        Purpose:        Returns the simulation state
+        Input:          None
+        Output:         Number of population who are susceptible, latent, infectious, recovered, and dead
+        """
+        return self.num_days, self.state_list
+
+    def process_day(self):
+        """
+        Purpose:        Flags every individual that progresses to the next stage of a disease, then
+                        applies those changes and moves everyone, all as whole-array operations
+        Input:          None
+        Output:         True if the simulation should terminate. False otherwise.
+        """
+        # add one day to every individual's time in their current state
+        self.days_in_state += 1
+
+        # one Bernoulli draw per individual per disease, compared against the infection pressure of
+        #       the cell the individual is standing in
+        pressure = self.__infection_pressure()
+        is_infected = self.config.rng.infection.random_batch((self.population, self.num_diseases)) < pressure
+        if self.config.event_log.exposures:
+            # the draws of the individuals who are susceptible to a disease and have infectious neighbors
+            exposed, disease = np.nonzero((self.state_of_health == 0) & (pressure > 0))
+            self.config.event_log.record_batch(EVENT_EXPOSURE, self.num_days, self.id[exposed], disease, rows=self.row[exposed], \
+                cols=self.col[exposed], value=pressure[exposed, disease], detail=is_infected[exposed, disease])
+
+        # flag the individuals that progress to the next stage of each disease. See
+        #       `Individual.check_if_progressing` for the conditions
+        state = self.state_of_health
+        change = ((state == 0) & is_infected) | \
+            ((state == 1) & (self.days_in_state == self.days_in_latent)) | \
+                ((state == 2) & (self.days_in_state == self.days_in_infectious)) | \
+                    ((state == 3) & (self.days_in_state == self.immunity_duration))
+
+        # apply the flagged changes, then move everyone along their paths
+        self.days_in_state[change] = 0
+        state[change] = (state[change] + 1) % 4
+        if self.config.event_log.transitions:
+            changed, disease = np.nonzero(change)
+            self.config.event_log.record_batch(EVENT_TRANSITION, self.num_days, self.id[changed], disease, old_state=(state[changed, disease] + 3) % 4, \
+                new_state=state[changed, disease], rows=self.row[changed], cols=self.col[changed])
+        if self.config.event_log.moves:
+            old_row, old_col = self.row.copy(), self.col.copy()
+        self.__move()
+        if self.config.event_log.moves:
+            moved = np.nonzero((old_row != self.row) | (old_col != self.col))[0]
+            self.config.event_log.record_batch(EVENT_MOVE, self.num_days, self.id[moved], rows=self.row[moved], cols=self.col[moved])
+
+        self.__count_states()
+        # update the infectious count grid for the next simulation day
+        self.count_infectious()
+        self.num_days += 1
+
+        # the simulation will terminate whenever it has run SIM_MAX number of days
+        #   or there are no individuals in the latent or infectious stages
+        latent_infectious_present = any(self.state_list[1]) or any(self.state_list[2])
+        if self.num_days == self.config.SIM_MAX or not latent_infectious_present:
+            return True
+        return False
+
+    def checkpoint_state(self):
+        """
+        Purpose:    Collect everything needed to continue the simulation from the end of the current
+                    day. The infectious counts aren't saved, since they are rebuilt from the individuals
+        Input:      None
+        Output:     A dictionary of NumPy arrays
+        """
+        state = {field: getattr(self, field) for field in CHECKPOINT_FIELDS}
+        state["path_lengths"], state["path_spots"] = flatten_paths(self.path)
+        state["num_days"] = np.array(self.num_days)
+        state["state_list"] = np.array(self.state_list, dtype=np.int64)
+        return state
+
+    @classmethod
+    def from_checkpoint(cls, state, config=None, grid_rows=None):
+        """
+        Purpose:    Recreate an automaton from the arrays `checkpoint_state` returned, without
+                    drawing any random numbers or finding any paths. The per-disease parameters
+                    are read from the parameter file again, so a branch can change them
+        Input:      The dictionary of arrays (e.g. loaded from a checkpoint), the config of the
+                    simulation (by default, the one in `constants.py`), and the first row and the
+                    row after the last of the grid its individuals can stand in or be neighbors
+                    of (by default, the whole grid). An automaton holding one band of the grid
+                    (see `Parallel_Automaton`) only keeps grids of those rows
+        Output:     A `Vectorized_Automaton` ready to process its next day
+        """
+        self = cls.__new__(cls)
+        self.config = config if config is not None else constants.current_config()
+        self.num_days = int(state["num_days"])
+        # the whole population, or only part of it (e.g. one band of the grid, see `Parallel_Automaton`)
+        self.population = len(state["id"])
+        self.num_diseases = len(self.config.DISEASE_LIST)
+        self.state_list = state["state_list"].tolist()
+        self.grid_rows = grid_rows if grid_rows is not None else (0, self.config.NUM_ROWS_FULL)
+        self.__setup_parameters()
+        for field in CHECKPOINT_FIELDS:
+            setattr(self, field, state[field].copy())
+        self.path = unflatten_paths(state["path_lengths"], state["path_spots"])
+        self.__setup_grids()
+        return self
+
+    def take_individuals(self, indices):
+        """
+        Purpose:    Take individuals out of the automaton, e.g. to hand them to another one (see
+                    `Parallel_Automaton`). The infectious counts aren't updated until `count_infectious`
+        Input:      An array of the indices of the individuals to take out
+        Output:     A dictionary of their arrays (see `CHECKPOINT_FIELDS`) and their paths, under "path"
+        """
+        leaving = np.zeros(self.population, dtype=bool)
+        leaving[indices] = True
+        individuals = {field: getattr(self, field)[leaving] for field in CHECKPOINT_FIELDS}
+        individuals["path"] = []
+        # most days nobody leaves, and the arrays don't need to be copied
+        if not len(indices):
+            return individuals
+        for field in CHECKPOINT_FIELDS:
+            setattr(self, field, getattr(self, field)[~leaving])
+        # individuals following the route table have no paths
+        if self.config.route_table is None:
+            individuals["path"] = [self.path[i] for i in np.nonzero(leaving)[0].tolist()]
+            self.path = [path for path, left in zip(self.path, leaving.tolist()) if not left]
+        self.population = len(self.id)
+        return individuals
+
+    def add_individuals(self, individuals):
+        """
+        Purpose:    Add the individuals `take_individuals` took out of another automaton. Everyone is
+                    kept in order of id, so the order of the individuals (and so of their random
+                    draws) doesn't depend on when they arrived. The infectious counts aren't updated
+                    until `count_infectious`
+        Input:      The dictionary `take_individuals` returned
+        Output:     None
+        """
+        if len(individuals["id"]) == 0:
+            return
+        order = np.argsort(np.concatenate((self.id, individuals["id"])), kind="stable")
+        for field in CHECKPOINT_FIELDS:
+            setattr(self, field, np.concatenate((getattr(self, field), individuals[field]))[order])
+        if self.config.route_table is None:
+            paths = self.path + individuals["path"]
+            self.path = [paths[i] for i in order.tolist()]
+        self.population = len(self.id)
+
+    def individual_states(self):
+        """
+        Purpose:    Hand out every individual's variables that the day's counts can be broken down by
+        Input:      None
+        Output:     A tuple of a (population, disease) array of states of health, and arrays of
+                    each individual's age group (the index of their age in "age_dist"), row, and column
+        """
+        return self.state_of_health, self.age, self.row, self.col
+
+    def occupied_cells(self):
+        """
+        Purpose:    Walk through every occupied cell of the simulation grid (inside its border),
+                    for the Visualizer and anything else that needs to see who is where
+        Input:      None
+        Output:     A generator of (row, col, list of the `Occupant`s in the cell)
+        """
+        top = self.grid_rows[0]
+        self.occupancy.rebuild(self.row - top, self.col)
+        for row, col, individuals in self.occupancy.cells():
+            row += top
+            if 0 < row < self.config.ROW_LIMIT and 0 < col < self.config.COL_LIMIT:
+                yield row, col, [Occupant(int(self.id[i]), self.state_of_health[i].tolist()) for i in individuals.tolist()]
+
+    @property
+    def sim_grid(self):
+        """
+        Purpose:    Builds the simulation grid as a 2D list of lists of the occupants in each cell
+        Input:      None
+        Output:     The 2D simulation grid
+        """
+        sim_grid = [[[] for col in range(self.config.NUM_COLS_FULL)] for row in range(self.config.NUM_ROWS_FULL)]
+        for row, col, occupants in self.occupied_cells():
+            sim_grid[row][col] = occupants
+        return sim_grid
@@ -1,20 +1,29 @@
+from itertools import product
 from math import ceil, sqrt
-from os import mkdir, path
-from shutil import rmtree
 from PIL import Image
-from imageio import get_writer, imread
-from constants import DISEASE_LIST, RESOURCES_FOLDER, OUTPUT_FOLDER, ITERATOR_LIMIT, GRID_SIZE
+import numpy as np
+from Frame_Encoder import Frame_Encoder, make_palette
+import constants
 
 class Visualizer():
     """
     class:      Visualizer
-    input:      None
+    input:      `first_day`: the first day that will be visualized (not zero when continuing from
+                a checkpoint, in which case the animation starts at the checkpoint)
+                `animate`: False to only draw frames (see `draw_frame`) without encoding an animation
+                `config`: the `Simulation_Config` of the simulation (by default, the one in `constants.py`)
     purpose:    Using PIL, we create a .png image of the individual's positions in the simulation
                 grid. Each individual is represented by an image corresponding to their state of health
                 (e.g. susceptible -> 0.png). We will paste in their image onto a black image called `canvas`.
                 If there are multiple individuals in a simulation grid cell, we break down the cell into an
                 NxN mini grid, where N (number of state-of-health images) is equal to the ceiling of the square
                 root of the number of individuals in the simulation cell.
+                Every tile is cut once into a tile atlas, keyed by the individual's states of
+                health and the tile's size, and frames are drawn by copying tiles into a NumPy
+                array. Only the cells whose occupants changed since the previous frame are redrawn,
+                and each finished frame is handed to a `Frame_Encoder`, which appends it to the
+                animation in the background, so the simulation doesn't wait for it to be encoded
+                and no image of a single day is ever written to disk.
     """
     """
                      /$$           /$$   /$$                          
@@ -28,23 +37,49 @@ class Visualizer():
     |______/|______/                            |______/|______/
     """
 
-    def __init__(self):
-        # open the background image to which we will paste the individuals' tiles,
-        #       appending each modified image to `images`. `images` starts with a 
-        #       defining image that will signifiy the beginning of the gif if looped
-        #       infinitely
-        self.canvas = Image.open(RESOURCES_FOLDER+"images/bkgd.png").resize((4998,4998))
-        self.canvas_ind = Image.open(RESOURCES_FOLDER+"images/bkgd_ind.png")
-        self.tiles = [Image.open(RESOURCES_FOLDER+"images/0.png"),
-                        Image.open(RESOURCES_FOLDER+"images/1.png"),
-                        Image.open(RESOURCES_FOLDER+"images/2.png"),
-                        Image.open(RESOURCES_FOLDER+"images/3.png"),
-                        Image.open(RESOURCES_FOLDER+"images/4.png")]
-        self.image_num = 0
-        self.temp_image_folder = OUTPUT_FOLDER+"days/"
-        if path.isdir(OUTPUT_FOLDER+"days/"):
-            rmtree(self.temp_image_folder)
-        mkdir(self.temp_image_folder)
+    def __init__(self, first_day=0, animate=True, config=None):
+        self.config = config if config is not None else constants.current_config()
+        # calculate how large a tile should be in pixels to fit the longer side of the
+        #       simulation grid in about 5000 pixels. The canvas has the same shape as the
+        #       simulation grid, so rectangular grids aren't squashed into a square
+        self.default_tile_size = ceil(5000/max(self.config.NUM_ROWS, self.config.NUM_COLS))
+        self.canvas_size = (self.config.NUM_COLS*self.default_tile_size, self.config.NUM_ROWS*self.default_tile_size)
+        # open the background image to which we will paste the individuals' tiles.
+        #       `background` is kept untouched to clear cells with, and `frame` is the image
+        #       being drawn, which is carried over from one day to the next
+        self.canvas = Image.open(self.config.RESOURCES_FOLDER+"images/bkgd.png").resize(self.canvas_size)
+        self.background = np.asarray(self.canvas)
+        self.frame = np.array(self.canvas)
+        self.canvas_ind = Image.open(self.config.RESOURCES_FOLDER+"images/bkgd_ind.png")
+        self.tiles = [Image.open(self.config.RESOURCES_FOLDER+"images/0.png"),
+                        Image.open(self.config.RESOURCES_FOLDER+"images/1.png"),
+                        Image.open(self.config.RESOURCES_FOLDER+"images/2.png"),
+                        Image.open(self.config.RESOURCES_FOLDER+"images/3.png"),
+                        Image.open(self.config.RESOURCES_FOLDER+"images/4.png")]
+        # the state tiles shrunk to fit every disease of an individual side by side in one tile
+        N = ceil(sqrt(max(1, len(self.config.DISEASE_LIST))))
+        self.mini_disease_tile_size = int((1 / N) * 250)
+        self.disease_tiles = [tile.resize((self.mini_disease_tile_size, self.mini_disease_tile_size)) for tile in self.tiles]
+        # the tile atlas: (states of health, tile size) -> the tile as a (size, size, 3) array.
+        #       Every combination of states is cut at the size of a whole cell up front, and the
+        #       smaller sizes of crowded cells are cut the first time they are needed
+        self.tile_atlas = {}
+        for state_of_health in product(range(len(self.tiles)), repeat=len(self.config.DISEASE_LIST)):
+            self.__atlas_tile(state_of_health, self.default_tile_size)
+        # the states of health of the occupants drawn in every cell of the previous frame, by (row, col)
+        self.drawn_cells = {}
+
+        # the day the next call to `visualize` draws. Only every ANIMATION_STRIDE-th day is drawn
+        self.image_num = first_day
+
+        # the animation is ANIMATION_SIZE pixels along its longer side (0 keeps the canvas' size)
+        self.animation_size = None
+        if self.config.ANIMATION_SIZE:
+            scale = self.config.ANIMATION_SIZE / max(self.canvas_size)
+            self.animation_size = (max(1, round(self.canvas_size[0]*scale)), max(1, round(self.canvas_size[1]*scale)))
+        self.encoder = None
+        if animate:
+            self.__open_encoder(first_day)
 
     """
      /$$$$$$$            /$$                        /$$                     /$$      /$$             /$$     /$$                       /$$                
@@ -57,21 +92,40 @@ class Visualizer():
     |__/      |__/      |__/    \_/     \_______/   \___/   \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/  
     """
 
+    def __open_encoder(self, first_day):
+        """
+        Purpose:    Start encoding the animation, beginning with the opening image
+        Input:      The first day that will be visualized
+        Output:     None
+        """
+        config = self.config
+        # every frame is made of the background and the tiles (and the opening image), so the
+        #       palette is chosen from a sample of them. A GIF can't be drawn without one
+        self.beginning = Image.open(config.RESOURCES_FOLDER+'images/beginning.png').convert(self.canvas.mode)
+        palette = None
+        if config.ANIMATION_PALETTE or config.ANIMATION_FORMAT == "gif":
+            samples = [self.background[::8, ::8], np.asarray(self.beginning)[::8, ::8]] + list(self.tile_atlas.values())
+            palette = make_palette(samples, config.ANIMATION_PALETTE or 256)
+        self.encoder = Frame_Encoder(config.OUTPUT_FOLDER+"simulation", config.ANIMATION_FORMAT, config.ANIMATION_FPS, self.animation_size, \
+            palette, config.RENDER_WORKERS, config.ANIMATION_QUEUE)
+        # the opening image is stretched to the shape of the simulation grid, since every frame
+        #       of the animation has to be the same size
+        if first_day == 0:
+            self.encoder.add_frame(self.beginning.resize(self.canvas_size))
+
     def __generate_tile(self, state_of_health):
         # within each cell of the simulation grid there will be rows and cols
         mini_row = 0
         mini_col = 0
-        N = ceil(sqrt(max(1, len(DISEASE_LIST))))
-        mini_disease_tile_size = int((1 / N) * 250)
+        N = ceil(sqrt(max(1, len(self.config.DISEASE_LIST))))
+        mini_disease_tile_size = self.mini_disease_tile_size
         copy_canvas_ind = self.canvas_ind.copy()
-        # for row in range(N):
-        #     for col in range(N):
-                # remember, `state_of_health` is a list with the individual's state of health for
-                #   all simulated diseases. For every disease in the individual's state_of_health,
-                #   paste the equivalent tile (0.png, 1.png, etc.) to a canvas tile. After all diseases
-                #   have been pasted, return the canvas tile to the caller.
-        for disease in range(len(DISEASE_LIST)):
-            tile = self.tiles[state_of_health[disease]].resize((mini_disease_tile_size, mini_disease_tile_size))
+        # remember, `state_of_health` is a list with the individual's state of health for
+        #   all simulated diseases. For every disease in the individual's state_of_health,
+        #   paste the equivalent tile (0.png, 1.png, etc.) to a canvas tile. After all diseases
+        #   have been pasted, return the canvas tile to the caller.
+        for disease in range(len(self.config.DISEASE_LIST)):
+            tile = self.disease_tiles[state_of_health[disease]]
             # if we've filled a row inside the cell, jump to the beginning of the next row
             if mini_col == N:
                 mini_row += 1
@@ -82,6 +136,45 @@ class Visualizer():
             mini_col += 1
         return copy_canvas_ind
 
+    def __atlas_tile(self, state_of_health, size):
+        """
+        Purpose:    Look up a tile in the tile atlas, cutting it the first time it is asked for
+        Input:      The individual's states of health (a tuple) and the tile's size in pixels
+        Output:     The tile as a (size, size, 3) uint8 array
+        """
+        key = (state_of_health, size)
+        tile = self.tile_atlas.get(key)
+        if tile is None:
+            tile = self.tile_atlas[key] = np.asarray(self.__generate_tile(state_of_health).resize((size, size)).convert(self.canvas.mode))
+        return tile
+
+    def __draw_cell(self, row, col, occupants):
+        """
+        Purpose:    Redraw one cell of the frame: clear it to the background, then copy in a tile
+                    for each of its occupants, in an NxN mini grid
+        Input:      The cell's row and column, and a tuple of its occupants' states of health
+        Output:     None
+        """
+        default_tile_size = self.default_tile_size
+        top = (row-1)*default_tile_size
+        left = (col-1)*default_tile_size
+        self.frame[top:top+default_tile_size, left:left+default_tile_size] = \
+            self.background[top:top+default_tile_size, left:left+default_tile_size]
+        # Each cell of the simulation grid can hold multiple individuals. Therefore, we
+        #       need to find the new size of each tile so we can fit them all in that cell.
+        #       Each cell could be composed of an `NxN` grid to display all individuals in the 
+        #       spot. We will calculate the dimensions of the grid by taking the square root 
+        #       of the number of individuals in the spot and taking the ceiling of the result. 
+        #       That value will be N.
+        N = ceil(sqrt(max(1, len(occupants))))
+        mini_tile_size = int(default_tile_size / N)
+        for position, state_of_health in enumerate(occupants):
+            mini_row, mini_col = divmod(position, N)
+            mini_top = top + mini_row*mini_tile_size
+            mini_left = left + mini_col*mini_tile_size
+            self.frame[mini_top:mini_top+mini_tile_size, mini_left:mini_left+mini_tile_size] = \
+                self.__atlas_tile(state_of_health, mini_tile_size)
+
     """
     /$$$$$$$            /$$       /$$ /$$                 /$$      /$$             /$$     /$$                       /$$                
     | $$__  $$          | $$      | $$|__/                | $$$    /$$$            | $$    | $$                      | $$                
@@ -93,62 +186,52 @@ class Visualizer():
     |__/       \______/ |_______/ |__/|__/ \_______/      |__/     |__/ \_______/   \___/  |__/  |__/ \______/  \_______/|_______/  
     """
 
-    def visualize(self, sim_grid):
+    def visualize(self, occupied_cells):
         """
-        Purpose:    Save the simulation state as a .png, where individuals are represented
+        Purpose:    Add the simulation state to the animation, where individuals are represented
                     as colored tiles and the colors reflect the state of health of an
-                    individual
-        Input:      `sim_grid`: a copy of the entire simulation grid
+                    individual. Days between every ANIMATION_STRIDE-th day are skipped
+        Input:      `occupied_cells`: the (row, col, individuals) of every occupied cell inside the
+                    grid's border, from the automaton's `occupied_cells`
         Output:     None
         """
-        # we don't want to make any changes to the base canvas, which is a black square image.
-        #       If we didn't make a copy to modify, the state from the day before would be visible
-        #       on the following day (i.e. not good)
-        canvas_copy = self.canvas.copy()
-        # calculate how large a tile should be in pixels to fit GRID_SIZE times GRID_SIZE
-        #       of them in the simulation grid
-        default_tile_size = ceil(5000/GRID_SIZE)
-        # loop through entire effective area of simulation grid and form the state image
-        for row in range(1, ITERATOR_LIMIT):
-            for col in range(1, ITERATOR_LIMIT):
-                # Each cell of the simulation grid can hold multiple individuals. Therefore, we
-                #       need to find the new size of each tile so we can fit them all in that cell.
-                #       Each cell could be composed of an `NxN` grid to display all individuals in the 
-                #       spot. We will calculate the dimensions of the grid by taking the square root 
-                #       of the number of individuals in the spot and taking the ceiling of the result. 
-                #       That value will be N.
-                N = ceil(sqrt(max(1, len(sim_grid[row][col]))))
-                mini_tile_size = int(default_tile_size / N)
-                # within each cell of the simulation grid there will be rows and cols
-                mini_row = 0
-                mini_col = 0
-                # for each individual in this cell, generate a tile representing the individual's
-                #   state of health for all modeled diseases
-                for individual in sim_grid[row][col]:
-                    tile = self.__generate_tile(individual.state_of_health).resize((mini_tile_size, mini_tile_size))
-                    # if we've filled a row inside the cell, jump to the beginning of the next row
-                    if mini_col == N:
-                        mini_row += 1
-                        mini_col = 0
-                    # paste the tile representing the individual's state of health to the canvas
-                    canvas_copy.paste(tile, \
-                        box=((col-1)*default_tile_size + (mini_col*mini_tile_size), \
-                            (row-1)*default_tile_size + (mini_row*mini_tile_size)))
-                    mini_col += 1
-        # save the changes made to the image
-        canvas_copy.save(OUTPUT_FOLDER+"days/"+str(self.image_num)+".png", quality=95)
+        day = self.image_num
         self.image_num += 1
+        if day % self.config.ANIMATION_STRIDE:
+            return
+        # the states of health of every occupied cell's occupants. Empty cells are left as the
+        #       canvas' background
+        cells = {}
+        for row, col, individuals in occupied_cells:
+            cells[(row, col)] = tuple(tuple(individual.state_of_health) for individual in individuals)
+        self.draw_frame(cells)
+        # the encoder copies the frame, since it keeps being drawn on
+        self.encoder.add_frame(self.frame)
+
+    def draw_frame(self, cells):
+        """
+        Purpose:    Draw a frame. The frame still holds the previous one, so only the cells that
+                    changed are redrawn, whatever order the frames are drawn in
+        Input:      `cells`: a dictionary of (row, col) -> a tuple of the states of health (each a
+                    tuple) of the cell's occupants, for every occupied cell inside the grid's border
+        Output:     The frame, as a (row, col, 3) uint8 array that is drawn over by the next call
+        """
+        for row, col in self.drawn_cells.keys() - cells.keys():
+            self.__draw_cell(row, col, ())
+        for (row, col), occupants in cells.items():
+            if self.drawn_cells.get((row, col)) != occupants:
+                self.__draw_cell(row, col, occupants)
+        self.drawn_cells = cells
+        return self.frame
 
     def finish_and_save_gif(self, num_days):
-        # save the list of simulation images as a gif
-        with get_writer(OUTPUT_FOLDER+'simulation.gif', mode='I') as writer:
-            image = imread(RESOURCES_FOLDER+'images/beginning.png')
-            writer.append_data(image)
-            for filename in range(num_days):
-                image = imread(self.temp_image_folder+str(filename)+'.png')
-                writer.append_data(image)
-                print("Processed day", filename, end='\r', flush=True)
-        rmtree(self.temp_image_folder)
+        """
+        Purpose:    Encode the frames still waiting in the queue and close the animation
+        Input:      `num_days`: the last day of the simulation
+        Output:     None
+        """
+        self.encoder.close()
+        print("Saved the animation of the simulation to", self.encoder.path)
 
 if __name__ == "__main__":
     Visualize = Visualizer()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Module:     benchmark_memory.py
+Purpose:    To measure how much memory a population takes when it is stored in a `Population`
+            compared to the one-object-per-individual layout `Individual` used to have
+Usage:      python benchmark_memory.py <parameter file> [population size ...]
+            Defaults to 10,000, 100,000, and 1,000,000 individuals. The old layout is only
+            built up to 100,000 individuals (it needs gigabytes beyond that); larger sizes
+            are estimated from the per-individual cost at 100,000
+"""
+
+from sys import argv
+from time import time
+import tracemalloc
+from constants import DISEASE_LIST
+from Population import Population
+
+# the largest population the old layout is actually built for
+LEGACY_LIMIT = 100000
+
+class Legacy_Individual():
+    """
+    class:      Legacy_Individual
+    input:      `iden`: the individual's id
+                `num_diseases`: how many diseases the individual has variables for
+    purpose:    The variables the old `Individual` object held, with the same Python types, so
+                its memory can be measured without drawing random numbers or finding paths. The
+                path is left empty in both layouts, since paths are shared through the path cache
+    """
+    def __init__(self, iden, num_diseases):
+        self.state_of_health = [0] * num_diseases
+        self.id = iden
+        self.die_when_recovered = [False] * num_diseases
+        self.location = (iden % 100 + 1, iden // 100 % 100 + 1)
+        self.tendency_patch = iden % 5
+        self.tendency = (iden % 97 + 1, iden // 97 % 100 + 1)
+        self.path = ()
+        self.path_step = 0
+        self.days_in_state = [0] * num_diseases
+        self.days_in_latent = [10 + disease for disease in range(num_diseases)]
+        self.days_in_infectious = [12 + disease for disease in range(num_diseases)]
+        self.immunity_duration = [100 + disease for disease in range(num_diseases)]
+        self.prevention_factor = [0.5] * num_diseases
+        self.quarantiner = False
+        self.mask_wearer = [True] * num_diseases
+        self.change = [False] * num_diseases
+        self.updated = False
+
+def measure(build):
+    """
+    Purpose:    Measure the memory allocated (and still held) by a function
+    Input:      A function that builds and returns a population
+    Output:     A tuple of the bytes held and the seconds it took
+    """
+    tracemalloc.start()
+    start_timer = time()
+    population = build()
+    seconds = time() - start_timer
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del population
+    return held, seconds
+
+def build_compact(size):
+    """
+    Purpose:    Build a `Population` of `size` individuals. Nothing keeps an `Individual` view of
+                every individual (the simulation grid is an `Occupancy_Index` of indices), so
+                views are only made while they are used and aren't counted
+    Input:      The population size
+    Output:     The population
+    """
+    population = Population(len(DISEASE_LIST))
+    population.extend(size)
+    for index in range(size):
+        population.ids[index] = index
+    return population
+
+def megabytes(num_bytes):
+    return str(round(num_bytes / 2**20, 1)) + " MB"
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in argv[2:]] or [10000, 100000, 1000000]
+    num_diseases = len(DISEASE_LIST)
+    print("Diseases:", num_diseases)
+    legacy_per_individual = None
+    for size in sizes:
+        compact_bytes, compact_seconds = measure(lambda: build_compact(size))
+        if size <= LEGACY_LIMIT:
+            legacy_bytes, legacy_seconds = measure(lambda: [Legacy_Individual(iden, num_diseases) for iden in range(size)])
+            legacy_per_individual = legacy_bytes / size
+            legacy = megabytes(legacy_bytes) + " (" + str(round(legacy_per_individual)) + " bytes each, " + str(round(legacy_seconds, 2)) + " s)"
+        elif legacy_per_individual is not None:
+            legacy_bytes = legacy_per_individual * size
+            legacy = "~" + megabytes(legacy_bytes) + " (estimated)"
+        else:
+            legacy_bytes, legacy = None, "not measured"
+        print(str(size).rjust(9), "individuals:", "Population", megabytes(compact_bytes), "(" + str(round(compact_bytes / size)) + \
+            " bytes each, " + str(round(compact_seconds, 2)) + " s); old Individuals", legacy + \
+                ("; " + str(round(legacy_bytes / compact_bytes, 1)) + "x smaller" if legacy_bytes else ""))
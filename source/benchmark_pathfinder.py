@@ -0,0 +1,79 @@
+"""
+Module:     benchmark_pathfinder.py
+Purpose:    To compare the speed and path costs of the `pathfinding` library's A* against
+            the Jump Point Search and A* in `Pathfinder.py` on the shipped terrain
+Usage:      python benchmark_pathfinder.py [number of trips] [terrain file]
+            Run from the folder holding `resources`, like `main.py`. Defaults to 500 trips
+            over ./resources/terrain.txt. The terrain file may be text or ".npy"
+"""
+
+from math import sqrt
+from sys import argv
+from time import time
+import numpy as np
+from Obstacle import load_terrain
+from Pathfinder import Pathfinder
+from pathfinding.core.diagonal_movement import DiagonalMovement
+from pathfinding.core.grid import Grid
+from pathfinding.finder.a_star import AStarFinder
+
+def path_cost(terrain, path_list):
+    """
+    Purpose:    Add up the cost of walking a path, weighting each step by the cell it steps onto
+    Input:      The terrain and a list of (x, y) spots
+    Output:     The cost as a float
+    """
+    cost = 0.0
+    for (x_a, y_a), (x_b, y_b) in zip(path_list, path_list[1:]):
+        cost += (sqrt(2) if x_a != x_b and y_a != y_b else 1.0) * terrain[y_b][x_b]
+    return cost
+
+def run_library(terrain, trips):
+    """
+    Purpose:    Find every trip's path with the `pathfinding` library, the way `Obstacle_Grid` used to
+    Input:      The terrain and a list of ((row, col), (row, col)) trips
+    Output:     The list of paths and the seconds it took, including building the Grid
+    """
+    start_timer = time()
+    grid = Grid(matrix=terrain)
+    finder = AStarFinder(diagonal_movement=DiagonalMovement.always)
+    paths = []
+    for location, destination in trips:
+        grid.cleanup()
+        path_list, _ = finder.find_path(grid.node(location[1], location[0]), grid.node(destination[1], destination[0]), grid)
+        paths.append(list(path_list))
+    return paths, time() - start_timer
+
+def run_native(terrain, trips, method):
+    """
+    Purpose:    Find every trip's path with `Pathfinder`
+    Input:      The terrain, a list of ((row, col), (row, col)) trips, and "jps" or "astar"
+    Output:     The list of paths and the seconds it took, including building the occupancy map
+    """
+    start_timer = time()
+    finder = Pathfinder(terrain)
+    find_path = finder.find_path_jps if method == "jps" else finder.find_path_astar
+    paths = [find_path(location, destination) for location, destination in trips]
+    return paths, time() - start_timer
+
+if __name__ == "__main__":
+    num_trips = int(argv[1]) if len(argv) > 1 else 500
+    terrain, _ = load_terrain(argv[2] if len(argv) > 2 else "./resources/terrain.txt")
+    num_rows, num_cols = terrain.shape
+    # trips between random open cells, the same for every finder
+    generator = np.random.default_rng(0)
+    open_cells = np.argwhere(terrain > 0)
+    trips = [(tuple(open_cells[a]), tuple(open_cells[b])) for a, b in generator.integers(0, len(open_cells), (num_trips, 2))]
+
+    print("Terrain:", num_rows, "x", num_cols, "with", len(open_cells), "open cells;", num_trips, "trips")
+    library_paths, library_time = run_library(terrain, trips)
+    library_costs = np.array([path_cost(terrain, path_list) for path_list in library_paths])
+    print("library A*:".ljust(14), str(round(library_time, 3)).rjust(8), "seconds")
+    for method in ("astar", "jps"):
+        paths, seconds = run_native(terrain, trips, method)
+        costs = np.array([path_cost(terrain, path_list) for path_list in paths])
+        # the paths may differ where there are ties, but their costs must not
+        mismatches = int(np.count_nonzero(np.abs(costs - library_costs) > 1e-6)) + \
+            sum(bool(path_list) != bool(library_path) for path_list, library_path in zip(paths, library_paths))
+        print(("native " + method + ":").ljust(14), str(round(seconds, 3)).rjust(8), "seconds", \
+            "(" + str(round(library_time / seconds, 1)) + "x faster),", mismatches, "paths with a different cost")
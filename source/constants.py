@@ -1,76 +1,47 @@
 """
     Module:     constants.py
     Purpose:    To separate the constants used in `main()` from the main code for easier reading.
+                The values are those of the `Simulation_Config` in use, which is only loaded from
+                the parameter file on the command line once one of them is first asked for.
 """
 
-from json import loads
 from sys import argv
-import Obstacle
+from Simulation_Config import Simulation_Config
 
-# grab the parameters file from the command line and load into a python dictionary
-PARAMS = {}
-with open(argv[1], 'r') as f:
-    PARAMS = loads(f.read())
+# the config every module that isn't handed one uses, loaded from the parameter file on the
+#       command line the first time one of its values is asked for (see `__getattr__`)
+_config = None
 
-# paths to the resources and output folders
-RESOURCES_FOLDER = PARAMS["resources"]
-OUTPUT_FOLDER = PARAMS["output"]
+def current_config():
+    """
+    Purpose:    Get the config in use, loading it from the parameter file given on the command
+                line if none has been set
+    Input:      None
+    Output:     A `Simulation_Config` object
+    """
+    global _config
+    if _config is None:
+        _config = Simulation_Config.from_file(argv[1])
+    return _config
 
-# a boolean that's true when the user wants to visualize the simulation
-MAKE_GIF = PARAMS["simulation"]["visualize"]
+def use_config(config):
+    """
+    Purpose:    Make a config the one in use, e.g. to run a simulation whose parameters didn't come
+                from the command line
+    Input:      A `Simulation_Config` object, or None to load the command line's again when it's
+                next needed
+    Output:     None
+    """
+    global _config
+    _config = config
 
-# loop through all diseases in the parameters file and store their parameters in the list
-DISEASE_LIST = []
-# this is how you iterate through the keys of a python dictionary
-#   Since each key is an integer starting from zero, we can easily
-#   associate a key to an index in a list (e.g. `DISEASE_LIST`)
-# Here, we append another dictionary to the `DISEASE_LIST` list, so
-#   when we start the simulation, we can iterate through `DISEASE_LIST`
-#   when processing each cell.
-for _, diseaseNumParam in PARAMS["diseases"].items():
-    DISEASE_LIST.append({
-        "INIT_INFECTIOUS": diseaseNumParam["init_infected"],
-        "AGE_DIST_DISEASE": diseaseNumParam["age_dist_disease"],
-        "LATENT_PERIOD_MIN": diseaseNumParam["latent_period_min"],
-        "LATENT_PERIOD_MAX": diseaseNumParam["latent_period_max"],
-        "INFECTIOUS_PERIOD_MIN": diseaseNumParam["infectious_period_min"],
-        "INFECTIOUS_PERIOD_MAX": diseaseNumParam["infectious_period_max"],
-        "TRANS_RATE": diseaseNumParam["transmission_rate"],
-        "MASK_CHANCE": diseaseNumParam["mask_wearer"],
-        "QUARAN_CHANCE": diseaseNumParam["separator"],
-        "SYMP_CHANCE": diseaseNumParam["symptomatic"],
-        "NEIGHBORHOOD": diseaseNumParam["neighborhood"],
-        "IS_SLIS": diseaseNumParam["SLIS"],
-        "IMMUNITY_DURATION_MIN": diseaseNumParam["immunity_duration_min"],
-        "IMMUNITY_DURATION_MAX": diseaseNumParam["immunity_duration_max"]
-    })
-
-# the size of the simulation grid with a one-cell border added to all four sides
-NUM_ROWS_FULL = PARAMS["simulation"]["num_row"]+2
-NUM_COLS_FULL = PARAMS["simulation"]["num_col"]+2
-# the size of the simulation grid without the one-cell border
-GRID_SIZE = PARAMS["simulation"]["num_row"]
-# variable that will keep any for-loops using it from traversing through the one-cell 
-#       border of the simulation grid, i.e. it will prevent crashes caused by references
-#       out of list bounds
-ITERATOR_LIMIT = GRID_SIZE+1
-
-# number of individuals in the simulation
-POPULATION = PARAMS["simulation"]["population"]
-
-# age distribution of the population
-AGE_DIST = PARAMS["simulation"]["age_dist"]
-
-# the maximum number of days the simulation will run
-SIM_MAX = PARAMS["simulation"]["sim_max"]
-
-# locations in simulation grid where individuals will travel to and from
-PATCHES = PARAMS["simulation"]["patches"]
-# the number of patches in the simulation
-NUM_PATCHES = len(PATCHES)
-
-# instantiate the Obstacle_grid once and let everyone just import it
-terrain_grid = Obstacle.Obstacle_Grid()
+def __getattr__(name):
+    # `from constants import NUM_ROWS` (or `constants.terrain_grid`) is looked up in the config in
+    #       use, so nothing is loaded until a value is actually needed. The names are the same as
+    #       the attributes of `Simulation_Config`
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return getattr(current_config(), name)
 
 """
                          /$$          
@@ -85,7 +56,8 @@ terrain_grid = Obstacle.Obstacle_Grid()
 
 if __name__ == "__main__":
     # unit tests
-    grid = Obstacle.Obstacle_Grid()
+    import Obstacle
+    grid = Obstacle.Obstacle_Grid(terrain_file=current_config().TERRAIN_FILE)
     path_list = grid.find_shortest_path((94,75),(3,9))
     grid.mark_path(path_list)
     grid.print_path_to_file(path_list)
@@ -0,0 +1,25 @@
+"""
+Module:     convert_terrain.py
+Purpose:    To convert a terrain from the text (or ".npy") format into the binary terrain format
+            of `Terrain_File.py`, which the simulation memory-maps instead of parsing
+Usage:      python convert_terrain.py <input terrain file> <output terrain file> [--packed]
+            `--packed` stores one bit per cell instead of one byte, for terrains whose open
+            cells all cost 1. Point the "terrain" simulation parameter at the output file to use it
+"""
+
+from sys import argv
+from time import time
+from Obstacle import load_terrain
+from Terrain_File import write_terrain, read_terrain
+
+if __name__ == "__main__":
+    start_timer = time()
+    terrain, _ = load_terrain(argv[1])
+    print("Read", argv[1] + ":", terrain.shape[0], "rows by", terrain.shape[1], "columns in", round(time() - start_timer, 3), "seconds")
+    fingerprint = write_terrain(argv[2], terrain, packed="--packed" in argv[3:])
+    # read the new file back and check every cell made it
+    start_timer = time()
+    converted, _ = read_terrain(argv[2], verify=True)
+    if (converted != terrain).any():
+        raise RuntimeError(argv[2] + " doesn't hold the same terrain as " + argv[1])
+    print("Wrote", argv[2], "(sha1", fingerprint + "); reading it back took", round(time() - start_timer, 3), "seconds")
@@ -1,7 +1,7 @@
 from sys import argv
-from constants import GRID_SIZE, RESOURCES_FOLDER
+from constants import NUM_ROWS, NUM_COLS, RESOURCES_FOLDER
 with open(RESOURCES_FOLDER+"terrain.txt", 'w') as output:
-    for row in range(GRID_SIZE):
-        for col in range(GRID_SIZE):
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
             output.write(argv[2])
         output.write('\n')
\ No newline at end of file
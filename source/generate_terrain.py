@@ -1,6 +1,7 @@
 from sys import argv
 from operator import sub
 from json import loads, dump
+from Terrain_File import write_terrain
 from pygame import Rect, image, init, display, event, QUIT, MOUSEBUTTONDOWN, mouse, KEYDOWN, key, K_LSHIFT, K_LCTRL, K_z, K_y, draw, quit
 
 def populate_gridline_list(gridline_list, grid_x, grid_y, grid_factor_x, grid_factor_y):
@@ -74,26 +75,26 @@ def save_screen_as_bkgr(pygameScreen):
 
 def output_to_file(grid_x, grid_y, terrain_grid):
     """
-    Purpose:    Output `terrain_grid` to a .txt file
+    Purpose:    Output `terrain_grid` to a binary terrain file (see `Terrain_File.py`), which
+                the simulation memory-maps instead of parsing
     Input:      `grid_x`: the number of columns in the simulation grid
                 `grid_y`: the number of rows in the simulation grid
                 `terrain_grid`: a 2D list of 1s and 0s
     Output:     None
     """
-    # output `terrain_grid` to a file
-    with open('./resources/terrain.txt', 'w') as outfile:
-        for row in range(grid_y):
-            for col in range(grid_x):
-                outfile.write(str(terrain_grid[row][col]))
-            outfile.write('\n')
-    
-def update_patches(patch_list, grid_factor_x, grid_factor_y):
+    # output `terrain_grid` to a file. Every cell is a 0 or a 1, so it is stored one bit per cell
+    write_terrain('./resources/terrain.terrain', terrain_grid, packed=True)
+
+def update_patches(patch_list, grid_x, grid_y, grid_factor_x, grid_factor_y):
     """
     Purpose:    Modifies the `sim_params.json` parameter file to add
                 patches to be used in simulation, each with their
-                top left and bottom right bounds
+                top left and bottom right bounds, and to point it at the
+                new terrain and its size
     Input:      `patch_list`: a list of pygame rectangles representing
                 the simulation patches
+                `grid_x`: the number of columns in the simulation grid
+                `grid_y`: the number of rows in the simulation grid
                 `grid_factor_x`: the simulation grid cell width in number of pixels
                 `grid_factor_y`: the simulation grid cell height in number of pixels
     Output:     None
@@ -103,6 +104,10 @@ def update_patches(patch_list, grid_factor_x, grid_factor_y):
     patch_count = 0
     with open("./resources/sim_params.json", 'r') as infile:
         parameters = loads(infile.read())
+    # the terrain written by `output_to_file`
+    parameters['simulation']['terrain'] = 'terrain.terrain'
+    parameters['simulation']['num_row'] = grid_y
+    parameters['simulation']['num_col'] = grid_x
     # this removes the patches from a previous terrain
     parameters['simulation']['patches'] = {}
     # iterate through all patches drawn to the pygame window and store
@@ -335,13 +340,13 @@ def main():
             if response == 'y':
                 # create the terrain grid from the rectangles drawn in the pygame window
                 terrain_grid = create_terrain_grid(patch_list, exit_list, grid_x, grid_y, grid_factor_x, grid_factor_y)
-                # draw converted rectangles to the .txt file
+                # draw converted rectangles to the terrain file
                 output_to_file(grid_x, grid_y, terrain_grid)
                 # save the pygame screen as a .png to use as the background image of the simulation
                 #   visualization .gif
                 save_screen_as_bkgr(screen)
                 # update the patches document in the `params.json` file
-                update_patches(patch_list, grid_factor_x, grid_factor_y)
+                update_patches(patch_list, grid_x, grid_y, grid_factor_x, grid_factor_y)
             elif response == 'n':
                 second_response = input("Are you sure? (Y/N) ")
                 if second_response == "Y":
@@ -10,72 +10,232 @@
 
 ###################################################################################################
 
+from os.path import splitext
+from sys import argv
 from time import time
 from Visualizer import Visualizer
 from Cellular_Automaton import Cellular_Automaton
-from constants import OUTPUT_FOLDER, MAKE_GIF
+from Vectorized_Automaton import Vectorized_Automaton
+from Parallel_Automaton import Parallel_Automaton
+from Checkpoint import save_checkpoint, load_checkpoint
+from Metrics_Sink import Metrics_Sink, patch_lookup_grid
+from Grid_State_File import Grid_State_Writer
+import constants
 
 # the `if __name__ == "__main__":` at the very bottom of this script calls this function
-def main():
-    # instantiate the cellular automaton class so we can begin the simulation
-    simulation_grid = Cellular_Automaton()
-
-    # used to find how much time it takes to create each day's image
-    debug_timer_vis = 0.0
-
-    # boolean that `simulation_grid` will set to True if the simulation should terminate
-    sim_ended = False
-    
-    # open a 'csv' file for outputting the daily reports (the number of susceptible, latent, infectious,
-    #       and recovered individuals at the end of the day)
-    outfile = open(OUTPUT_FOLDER+"CAoutput.csv", 'w')
-    # output the header of the .csv output file
-    outfile.write("day|susceptible|latent|infectious|recovered|dead\n")
-
-    # instantiate visualizer class to create gif of simulation if the user wants
-    if MAKE_GIF:
-        print("Instantiating visualizer object")
-        sim_gif = Visualizer()
-        print("Complete")
-
-    # loop at least SIM_MAX days and until there are no individuals in the latent nor infectious stages
-    state_list = []
-    day = 0
-    while not sim_ended:
-        # get the state of the simulation for the current day
-        day, state_list = simulation_grid.start_of_day_metrics()
-        # outputs the beginning-of-day state of the grid to csv output file
-        write_to_output(outfile, day, state_list)
-
-        # process for the next day in the simulation
-        print("Processing day", day, end='\r', flush=True)
-        # process day needs to handle every disease since main does not "know" there
-        #       are multiple diseases
-        sim_ended = simulation_grid.process_day()
-
-        if MAKE_GIF:
-            debug_timer_vis += make_days_image(sim_gif, simulation_grid.sim_grid)
-    # get the state of the simulation for the last day
-    day, state_list = simulation_grid.start_of_day_metrics()
-    # output the last day's numbers to csv file
-    write_to_output(outfile, day, state_list)
-    if MAKE_GIF:
-        finish_visualization(sim_gif, day, debug_timer_vis)
+def main(checkpoint_file=None, branch=False, config=None, on_day=None):
+    """
+    Purpose:    Run the simulation from start to finish
+    Input:      `checkpoint_file`: a checkpoint to continue from instead of starting on day zero
+                `branch`: False to resume the run the checkpoint was taken of (its event log is
+                cut back to the checkpoint and continued), True to start a new run from it
+                `config`: the `Simulation_Config` to run (by default, the one in `constants.py`,
+                loaded from the parameter file on the command line)
+                `on_day`: a function called with every day and its `state_list` as soon as it is
+                written, e.g. to stream them somewhere
+    Output:     None
+    """
+    if config is None:
+        config = constants.current_config()
+    if checkpoint_file is None:
+        # the seed lets this exact run be reproduced by putting it in the parameter file
+        print("Random seed:", config.rng.seed)
+        # instantiate the cellular automaton class so we can begin the simulation
+        simulation_grid = create_automaton(config)
+        # every day's `state_list` so far, which a checkpoint needs to rewrite the output file
+        history = []
+    else:
+        simulation_grid, history = restore_automaton(config, checkpoint_file, branch)
+
+    # the outputs that are only opened once the run starts, closed however it ends
+    metrics = None
+    grid_states = None
+    try:
+        # used to find how much time it takes to create each day's image
+        debug_timer_vis = 0.0
+
+        # boolean that `simulation_grid` will set to True if the simulation should terminate
+        sim_ended = False
+
+        # open a 'csv' file for outputting the daily reports (the number of susceptible, latent, infectious,
+        #       and recovered individuals at the end of the day)
+        with open(config.OUTPUT_FOLDER+"CAoutput.csv", 'w') as outfile:
+            # output the header of the .csv output file
+            outfile.write("day|susceptible|latent|infectious|recovered|dead\n")
+            # the same counts as typed rows, if the user wants them
+            metrics = create_metrics_sink(config, config.OUTPUT_FOLDER + config.METRICS_FILE)
+            # the days simulated before the checkpoint this run continues from, if any. Their breakdowns
+            #       by age group and patch weren't saved, so only their totals are written
+            for day, state_list in enumerate(history):
+                write_to_output(outfile, day, state_list)
+                if metrics is not None:
+                    metrics.write_day(day, state_list)
+
+            # instantiate visualizer class to create gif of simulation if the user wants
+            if config.MAKE_GIF:
+                print("Instantiating visualizer object")
+                sim_gif = Visualizer(simulation_grid.num_days, config=config)
+                print("Complete")
+            # the export of every day's occupied cells, to be drawn after the run, if the user wants it. A
+            #       resumed run continues the file the checkpoint was taken of
+            if config.GRID_STATES_EXPORT:
+                grid_states = Grid_State_Writer(config.OUTPUT_FOLDER+config.GRID_STATES_FILE, config.NUM_ROWS, config.NUM_COLS, \
+                    len(config.DISEASE_LIST), simulation_grid.num_days if checkpoint_file is not None and not branch else 0)
+
+            # loop at least SIM_MAX days and until there are no individuals in the latent nor infectious stages
+            state_list = []
+            day = 0
+            while not sim_ended:
+                # get the state of the simulation for the current day
+                day, state_list = simulation_grid.start_of_day_metrics()
+                # outputs the beginning-of-day state of the grid to csv output file
+                write_to_output(outfile, day, state_list)
+                if metrics is not None:
+                    metrics.write_day(day, state_list, simulation_grid)
+                if on_day is not None:
+                    on_day(day, state_list)
+                history.append([list(counts) for counts in state_list])
+
+                # process for the next day in the simulation
+                print("Processing day", day, end='\r', flush=True)
+                # process day needs to handle every disease since main does not "know" there
+                #       are multiple diseases
+                sim_ended = simulation_grid.process_day()
+
+                if config.MAKE_GIF:
+                    debug_timer_vis += make_days_image(sim_gif, simulation_grid.occupied_cells())
+                # numbered like the Visualizer's images: the state at the end of the day just processed
+                if config.GRID_STATES_EXPORT:
+                    grid_states.write_day(simulation_grid.num_days - 1, simulation_grid)
+                if config.CHECKPOINT_EVERY and not sim_ended and simulation_grid.num_days % config.CHECKPOINT_EVERY == 0:
+                    # every day exported so far has to be on disk, so resuming can cut the file off right here
+                    if config.GRID_STATES_EXPORT:
+                        grid_states.flush()
+                    write_checkpoint(config, simulation_grid, history)
+            # get the state of the simulation for the last day
+            day, state_list = simulation_grid.start_of_day_metrics()
+            # output the last day's numbers to csv file
+            write_to_output(outfile, day, state_list)
+        if metrics is not None:
+            metrics.write_day(day, state_list, simulation_grid)
+        if on_day is not None:
+            on_day(day, state_list)
+        if config.MAKE_GIF:
+            finish_visualization(sim_gif, day, debug_timer_vis)
+        # only the object engine caches each cell's infection pressure
+        if isinstance(simulation_grid, Cellular_Automaton):
+            write_cache_report(config, simulation_grid.pressure_cache_history)
+        # how often A* paths were reused, to help choose the size of the path cache
+        print(config.terrain_grid.path_cache_report())
+    finally:
+        # the parallel engine's worker processes aren't needed anymore, even if the run failed
+        if isinstance(simulation_grid, Parallel_Automaton):
+            simulation_grid.close()
+        # write out whatever is left in the buffers of the metrics, the event log, and the grid
+        #       state export, so a failed or stopped run keeps every day it got through
+        if metrics is not None:
+            metrics.close()
+        config.event_log.close()
+        if grid_states is not None:
+            grid_states.close()
 
 ####################################################################################
 #                                   FUNCTIONS                                      #
 ####################################################################################
 
-def make_days_image(sim_gif, sim_grid):
+def create_automaton(config):
+    """
+    Purpose:    Instantiate the cellular automaton engine selected by the "engine" field
+                in the parameter file
+    Input:      The `Simulation_Config` of the simulation
+    Output:     A `Cellular_Automaton`, `Vectorized_Automaton`, or `Parallel_Automaton` object
+    """
+    if config.ENGINE == "object":
+        return Cellular_Automaton(config)
+    if config.ENGINE == "vectorized":
+        return Vectorized_Automaton(config)
+    if config.ENGINE == "parallel":
+        return Parallel_Automaton(config)
+    raise ValueError("Unknown simulation engine \"" + str(config.ENGINE) + "\". Use \"object\", \"vectorized\", or \"parallel\".")
+
+def create_metrics_sink(config, path):
+    """
+    Purpose:    Open the sink every day's counts are written to as typed rows, as set up by the
+                "metrics" field in the parameter file
+    Input:      The `Simulation_Config` of the simulation, and the file to write, without its extension
+    Output:     A `Metrics_Sink` object, or None if the "format" is "none"
+    """
+    if config.METRICS_FORMAT == "none":
+        return None
+    patch_grid = patch_lookup_grid(config.PATCHES, config.NUM_ROWS_FULL, config.NUM_COLS_FULL) if config.METRICS_BY_PATCH else None
+    return Metrics_Sink(path, config.METRICS_FORMAT, len(config.AGE_DIST) if config.METRICS_BY_AGE else 0, patch_grid)
+
+def checkpoint_meta(config):
+    """
+    Purpose:    Describe the simulation a checkpoint belongs to, so it is never loaded into a
+                different one
+    Input:      The `Simulation_Config` of the simulation
+    Output:     A dictionary
+    """
+    return {"engine": config.ENGINE, "population": config.POPULATION, "num_diseases": len(config.DISEASE_LIST), \
+        "num_rows": config.NUM_ROWS, "num_cols": config.NUM_COLS}
+
+def write_checkpoint(config, simulation_grid, history):
+    """
+    Purpose:    Save the full state of the simulation at the end of the current day
+    Input:      `config`: the `Simulation_Config` of the simulation
+                `simulation_grid`: the automaton
+                `history`: every day's `state_list` so far
+    Output:     None
+    """
+    debug_start_timer = time()
+    file_name = config.OUTPUT_FOLDER + config.CHECKPOINT_FILE
+    if config.CHECKPOINT_KEEP:
+        root, extension = splitext(file_name)
+        file_name = root + "_" + str(simulation_grid.num_days) + extension
+    save_checkpoint(file_name, simulation_grid, history, config.rng, config.event_log, checkpoint_meta(config))
+    print("Saved checkpoint of day", simulation_grid.num_days, "to", file_name, "in", round(time() - debug_start_timer, 3), "seconds")
+
+def restore_automaton(config, checkpoint_file, branch):
+    """
+    Purpose:    Recreate the automaton, random number streams, and event log saved in a checkpoint
+    Input:      `config`: the `Simulation_Config` of the simulation
+                `checkpoint_file`: the checkpoint to load
+                `branch`: True if this run is a new branch from the checkpoint instead of the run
+                it was taken of. A branch writes a new event log of what happens after the
+                checkpoint, and if its parameter file has a different "seed", it draws a
+                different future from the same past
+    Output:     A tuple of the automaton and every day's `state_list` before the checkpoint
+    """
+    meta, arrays = load_checkpoint(checkpoint_file)
+    for key, value in checkpoint_meta(config).items():
+        if meta.get(key) != value:
+            raise ValueError(checkpoint_file + " was taken of a simulation with " + key + " " + str(meta.get(key)) + \
+                ", but this one has " + str(value))
+    config.rng.set_state(meta["seed"], meta["rng"], meta["buffers"])
+    if branch and config.SEED is not None and config.SEED != meta["seed"]:
+        config.rng.reseed(config.SEED)
+    if not branch:
+        config.event_log.resume(meta["event_log_records"])
+    if config.ENGINE == "object":
+        simulation_grid = Cellular_Automaton.from_checkpoint(arrays, config)
+    elif config.ENGINE == "parallel":
+        simulation_grid = Parallel_Automaton.from_checkpoint(arrays, config)
+    else:
+        simulation_grid = Vectorized_Automaton.from_checkpoint(arrays, config)
+    print("Branched" if branch else "Resumed", "from day", meta["day"], "of", checkpoint_file, "with random seed", config.rng.seed)
+    return simulation_grid, arrays["history"].tolist()
+
+def make_days_image(sim_gif, occupied_cells):
     """
     Purpose:    Produce a picture of the simulation state, using colored images
                 to represent individuals in the different stages of the disease(s)
     Input:      `sim_gif`: the object of the Visualizer class
-                `sim_grid`: the 2D simulation grid (automaton)
+                `occupied_cells`: the automaton's occupied cells (see `occupied_cells`)
     Output:     The time in seconds for the visualization of one day
     """
     debug_start_timer = time()
-    sim_gif.visualize(sim_grid)
+    sim_gif.visualize(occupied_cells)
     return time() - debug_start_timer
 
 def write_to_output(outfile, day, state_list):
@@ -87,16 +247,35 @@ def write_to_output(outfile, day, state_list):
     """
     outfile.write(str(day)+'|'+str(state_list[0])+'|'+str(state_list[1])+'|'+str(state_list[2])+'|'+str(state_list[3])+'|'+str(state_list[4])+'\n')
 
+def write_cache_report(config, pressure_cache_history):
+    """
+    Purpose:    Print to a file how often each day's infection pressure was reused from the
+                cache instead of being recomputed
+    Input:      `config`: the `Simulation_Config` of the simulation
+                `pressure_cache_history`: a list of [hits, misses] pairs, one for each day
+    Output:     None
+    """
+    total_hits = 0
+    total_lookups = 0
+    with open(config.OUTPUT_FOLDER+"CAcache.csv", 'w') as outfile:
+        outfile.write("day|hits|misses|hit_rate\n")
+        for day, (hits, misses) in enumerate(pressure_cache_history):
+            hit_rate = hits / max(1, hits + misses)
+            outfile.write(str(day)+'|'+str(hits)+'|'+str(misses)+'|'+str(round(hit_rate, 4))+'\n')
+            total_hits += hits
+            total_lookups += hits + misses
+    print("Infection pressure cache hit rate:", round(total_hits / max(1, total_lookups), 4))
+
 def finish_visualization(sim_gif, last_day, debug_timer_vis):
     """
-    Purpose:    Concatenate all the images produced by `make_days_image` into a gif
+    Purpose:    Finish encoding the animation of the images produced by `make_days_image`
     Input:      `sim_gif`: the object of the Visualizer class
                 `last_day`: an integer representing the last day of the simulation
                 `debug_timer_vis`: a float of a running timer used to time the 
                 visualization processing
     Output:     None
     """
-    print("Preparing the .gif of the simulation.")
+    print("Finishing the animation of the simulation.")
     debug_start_timer = time()
     sim_gif.finish_and_save_gif(last_day)
     debug_timer_vis += time() - debug_start_timer
@@ -107,11 +286,18 @@ def finish_visualization(sim_gif, last_day, debug_timer_vis):
 ####################################################################################
 
 # the `int main()` of the program
+#       python main.py <parameter file> [--resume <checkpoint> | --branch <checkpoint>]
 if __name__ == "__main__":
     # gonna use this to find the execution time
     debug_timer = time()
+    # a checkpoint to continue from, if one was given
+    checkpoint_file, branch = None, False
+    if "--resume" in argv:
+        checkpoint_file = argv[argv.index("--resume") + 1]
+    elif "--branch" in argv:
+        checkpoint_file, branch = argv[argv.index("--branch") + 1], True
     # start the simulation
-    main()
+    main(checkpoint_file, branch)
     # find the total execution time
     print("Entire simulation took", time() - debug_timer, "seconds")
 
@@ -0,0 +1,39 @@
+"""
+Module:     read_event_log.py
+Purpose:    To rebuild the history of individuals from an event log written during a simulation
+Usage:      python read_event_log.py <event log> [id ...]
+            Without any ids, prints how many of each kind of event the log holds
+"""
+
+from sys import argv
+import numpy as np
+from Event_Log import read_events, individual_history, describe, EVENT_NAMES
+
+def print_summary(events):
+    """
+    Purpose:    Print how many individuals and how many of each kind of event an event log holds
+    Input:      The records from `read_events`
+    Output:     None
+    """
+    print(len(events), "events for", len(np.unique(events["id"])), "individuals over", \
+        int(events["day"].max()) + 1 if len(events) else 0, "days")
+    for event, name in EVENT_NAMES.items():
+        print("   ", name + ":", int(np.count_nonzero(events["event"] == event)))
+
+def print_history(events, iden):
+    """
+    Purpose:    Print every event of one individual in the order they happened
+    Input:      The records from `read_events` and the individual's id
+    Output:     None
+    """
+    print("ID:", iden)
+    for record in individual_history(events, iden):
+        print("   ", describe(record))
+    print('\n')
+
+if __name__ == "__main__":
+    events = read_events(argv[1])
+    if len(argv) == 2:
+        print_summary(events)
+    for iden in argv[2:]:
+        print_history(events, int(iden))
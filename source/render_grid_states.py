@@ -0,0 +1,83 @@
+"""
+Module:     render_grid_states.py
+Purpose:    To draw a finished simulation from the grid state file it exported (see the
+            "grid_states" parameters), with the Visualizer's tiles, across a pool of processes
+Usage:      python render_grid_states.py <parameter file> <grid state file> [number of processes] [--frames <folder>]
+            The parameter file is the one the simulation ran with. Without `--frames`, the
+            animation is written to the output folder as set by the "animation" parameters. With
+            it, every day is saved as `<day>.png` in the folder instead. The number of processes
+            defaults to the number of cores
+"""
+
+import multiprocessing
+from os import makedirs
+from sys import argv
+from time import time
+from PIL import Image
+from Grid_State_File import read_grid_states, days, day_cells
+from Visualizer import Visualizer
+from constants import NUM_ROWS, NUM_COLS, ANIMATION_STRIDE
+
+# each worker's Visualizer and grid state file, set up once by `start_worker`
+worker = {}
+
+def start_worker(grid_state_file, frames_folder):
+    """
+    Purpose:    Set up a worker process with its own Visualizer and its own mapping of the file
+    Input:      The grid state file, and the folder to save frames in (None to hand them back)
+    Output:     None
+    """
+    worker["visualizer"] = Visualizer(animate=False)
+    worker["header"], worker["records"] = read_grid_states(grid_state_file)
+    worker["frames_folder"] = frames_folder
+
+def render_day(day):
+    """
+    Purpose:    Draw one day in a worker process. Each worker's Visualizer keeps its last frame, so
+                it only redraws the cells that differ from the last day it drew
+    Input:      The day
+    Output:     The day, and the frame (shrunk to the animation's size) or None if it was saved
+    """
+    visualizer = worker["visualizer"]
+    frame = visualizer.draw_frame(day_cells(worker["records"], day, worker["header"][2]))
+    if worker["frames_folder"] is not None:
+        Image.fromarray(frame).save(worker["frames_folder"] + str(day) + ".png")
+        return day, None
+    image = Image.fromarray(frame)
+    if visualizer.animation_size is not None:
+        image = image.resize(visualizer.animation_size)
+    return day, image
+
+def main():
+    grid_state_file = argv[2]
+    num_processes = int(argv[3]) if len(argv) > 3 and argv[3].isdigit() else multiprocessing.cpu_count()
+    frames_folder = None
+    if "--frames" in argv:
+        frames_folder = argv[argv.index("--frames") + 1].rstrip('/') + '/'
+        makedirs(frames_folder, exist_ok=True)
+
+    (num_rows, num_cols, _), records = read_grid_states(grid_state_file)
+    if (num_rows, num_cols) != (NUM_ROWS, NUM_COLS):
+        raise ValueError(grid_state_file + " is of a " + str(num_rows) + " by " + str(num_cols) + \
+            " grid, but the parameter file's grid is " + str(NUM_ROWS) + " by " + str(NUM_COLS))
+    todo = [int(day) for day in days(records) if day % ANIMATION_STRIDE == 0]
+    del records
+    print("Drawing", len(todo), "days on", num_processes, "processes")
+
+    # the animation is encoded here, in day order, as the workers hand the frames back
+    visualizer = None if frames_folder is not None else Visualizer()
+    with multiprocessing.Pool(num_processes, start_worker, (grid_state_file, frames_folder)) as pool:
+        # consecutive days go to the same worker, so it redraws as little as possible
+        chunk_size = max(1, len(todo) // (4 * num_processes))
+        for day, image in pool.imap(render_day, todo, chunk_size):
+            if visualizer is not None:
+                visualizer.encoder.add_frame(image)
+            print("Drew day", day, end='\r', flush=True)
+    print()
+    if visualizer is not None:
+        visualizer.finish_and_save_gif(todo[-1] if todo else 0)
+
+if __name__ == "__main__":
+    debug_timer = time()
+    main()
+    print("Drawing took", time() - debug_timer, "seconds")
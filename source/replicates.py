@@ -0,0 +1,124 @@
+"""
+Module:     replicates.py
+Purpose:    To run many independent replicates of the same simulation across a pool of
+            processes and summarize them day by day
+Usage:      python replicates.py <parameter file> <number of replicates> [number of processes]
+            The number of processes defaults to the number of cores. Replicate `k` is seeded
+            with [seed, k], where seed is the "seed" field of the parameter file (or one drawn
+            from the OS), so putting that list in the "seed" field reproduces the replicate
+            with `main.py`.
+Output:     `replicates.csv`: every replicate's daily counts, written as each replicate finishes
+            `replicates_summary.csv`: the mean and quantiles of every count on every day, followed
+            by each replicate's own count
+            `replicate_<k>_<metrics file>`: replicate `k`'s typed rows, if the "metrics" parameters
+            ask for them. `Metrics_Sink.load_runs` reads them all back into one array
+"""
+
+import multiprocessing
+from sys import argv
+from time import time
+import numpy as np
+from constants import current_config
+from main import create_automaton, create_metrics_sink
+
+# the names of the five counts in a day's `state_list`
+STATE_NAMES = ("susceptible", "latent", "infectious", "recovered", "dead")
+# the quantiles reported for every count
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def run_replicate(arguments):
+    """
+    Purpose:    Run one replicate from start to finish in a worker process. The terrain, path
+                finder, and route table were loaded before the pool was forked, so every worker
+                reads the same copy of them instead of loading its own
+    Input:      A tuple of the replicate's number and its seed
+    Output:     A tuple of the replicate's number and a list of its (day, `state_list`) pairs
+    """
+    replicate, seed = arguments
+    config = current_config()
+    config.rng.reseed(seed)
+    # each replicate gets its own event log, since they run at the same time
+    config.event_log.path = config.OUTPUT_FOLDER + "replicate_" + str(replicate) + "_" + config.EVENT_LOG_FILE
+    metrics = create_metrics_sink(config, config.OUTPUT_FOLDER + "replicate_" + str(replicate) + "_" + config.METRICS_FILE)
+    simulation_grid = create_automaton(config)
+    history = []
+    sim_ended = False
+    while not sim_ended:
+        day, state_list = simulation_grid.start_of_day_metrics()
+        history.append((day, [list(counts) for counts in state_list]))
+        if metrics is not None:
+            metrics.write_day(day, state_list, simulation_grid)
+        sim_ended = simulation_grid.process_day()
+    day, state_list = simulation_grid.start_of_day_metrics()
+    history.append((day, [list(counts) for counts in state_list]))
+    if metrics is not None:
+        metrics.write_day(day, state_list, simulation_grid)
+        metrics.close()
+    config.event_log.close()
+    return replicate, history
+
+def summarize(histories, outfile):
+    """
+    Purpose:    Write the mean, quantiles, and per-replicate values of every count on every day.
+                Replicates that ended early keep their last day's counts, since nothing changes
+                once no one is latent or infectious
+    Input:      A list of every replicate's history (ordered by replicate) and the open output file
+    Output:     None
+    """
+    config = current_config()
+    num_days = max(history[-1][0] for history in histories) + 1
+    # counts[replicate, day, state, disease]
+    counts = np.zeros((len(histories), num_days, len(STATE_NAMES), len(config.DISEASE_LIST)), dtype=np.int64)
+    for replicate, history in enumerate(histories):
+        for day, state_list in history:
+            counts[replicate, day:] = state_list
+    means = counts.mean(axis=0)
+    quantiles = np.quantile(counts, QUANTILES, axis=0)
+
+    outfile.write("day|state|disease|mean|" + '|'.join("q" + str(int(q * 100)).zfill(2) for q in QUANTILES) + '|' + \
+        '|'.join("replicate_" + str(replicate) for replicate in range(len(histories))) + '\n')
+    for day in range(num_days):
+        for state, name in enumerate(STATE_NAMES):
+            for disease in range(len(config.DISEASE_LIST)):
+                outfile.write(str(day) + '|' + name + '|' + str(disease) + '|' + str(round(float(means[day, state, disease]), 4)) + '|' + \
+                    '|'.join(str(round(float(value), 4)) for value in quantiles[:, day, state, disease]) + '|' + \
+                    '|'.join(str(int(value)) for value in counts[:, day, state, disease]) + '\n')
+
+def main():
+    num_replicates = int(argv[2])
+    num_processes = int(argv[3]) if len(argv) > 3 else multiprocessing.cpu_count()
+    config = current_config()
+    # the replicates already run in parallel, and a pool's workers can't start the processes of
+    #       the "parallel" engine's bands, so they run on the engine it's built on
+    if config.ENGINE == "parallel":
+        print("The \"parallel\" engine can't run inside the replicates' workers, so they use the \"vectorized\" engine")
+        config.ENGINE = "vectorized"
+    # every replicate's seed is derived from this one
+    base_seed = config.rng.seed
+    print("Running", num_replicates, "replicates on", num_processes, "processes with seed", base_seed)
+
+    histories = [None] * num_replicates
+    # forking shares everything the config loaded with the workers, copy-on-write, so the terrain
+    #       and route table are loaded now instead of once in every worker
+    config.terrain_grid, config.route_table
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() \
+        else multiprocessing.get_context()
+    with context.Pool(num_processes) as pool, open(config.OUTPUT_FOLDER + "replicates.csv", 'w') as outfile:
+        outfile.write("replicate|day|susceptible|latent|infectious|recovered|dead\n")
+        finished = 0
+        for replicate, history in pool.imap_unordered(run_replicate, [(k, [base_seed, k]) for k in range(num_replicates)]):
+            histories[replicate] = history
+            for day, state_list in history:
+                outfile.write(str(replicate) + '|' + str(day) + '|' + '|'.join(str(counts) for counts in state_list) + '\n')
+            outfile.flush()
+            finished += 1
+            print("Finished", finished, "of", num_replicates, "replicates", end='\r', flush=True)
+    print()
+
+    with open(config.OUTPUT_FOLDER + "replicates_summary.csv", 'w') as outfile:
+        summarize(histories, outfile)
+
+if __name__ == "__main__":
+    debug_timer = time()
+    main()
+    print("All replicates took", time() - debug_timer, "seconds")
@@ -0,0 +1,247 @@
+"""
+Module:     server.py
+Purpose:    To keep a simulation service running on localhost, so scenarios can be explored without
+            paying for the startup of every run: the modules are imported, and the terrain and
+            route tables loaded, once, and every run is forked from that warm process
+Usage:      python server.py <parameter file> [port] [number of workers]
+            The parameter file is the base every run starts from. The port defaults to 8765 and
+            the number of workers (runs at the same time) to the number of cores. Runs asked for
+            while every worker is busy wait for one to finish.
+            POST /run       The body is a json object, e.g.
+                                {"overrides": {"diseases.0.transmission_rate": 0.05, "simulation.seed": 7}}
+                            whose "overrides" set fields of the base parameters, given by their
+                            path with '.' between keys ('*' matches every key), as in a sweep spec
+                            (see `sweep.py`). The response is streamed as one json object per line:
+                                {"run": <number>, "output": <folder>, "seed": <seed>}
+                                {"day": <day>, "states": <state_list>}      (for every day, as it starts)
+                                {"done": true, "days": <days>, "seconds": <seconds>}
+                            or {"error": <message>} if the run failed. A run writes its output
+                            files to `<output folder>server/run_<number>/` unless "output" is
+                            overridden. Closing the connection stops the run
+            GET /status     How many runs are running and have been run, and how many terrains
+                            and route tables are loaded
+            For example:    curl -N -d '{"overrides": {"simulation.population": 500}}' localhost:8765/run
+"""
+
+from contextlib import redirect_stdout
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+import multiprocessing
+from os import makedirs
+from signal import signal, SIGTERM
+from sys import argv, exit
+from threading import BoundedSemaphore, Lock
+from time import time
+import constants
+import Obstacle
+import Route_Table
+import main as simulation
+from Simulation_Config import Simulation_Config
+from sweep import set_parameter
+
+# the port the server listens on when none is given
+DEFAULT_PORT = 8765
+
+def run_worker(config, connection):
+    """
+    Purpose:    Run one simulation in a forked worker process, sending every day's counts back as
+                soon as the day starts
+    Input:      The run's config, and the worker's end of the pipe to the server
+    Output:     None
+    """
+    # stopping the worker (when the client goes away) ends the run like an error would, so a
+    #       "parallel" run's own workers are stopped with it
+    signal(SIGTERM, lambda signal_number, frame: exit(1))
+    try:
+        connection.send(("seed", config.rng.seed))
+        # `main.py` prints its progress, which goes to the run's folder instead of the server's terminal
+        with open(config.OUTPUT_FOLDER + "stdout.txt", 'w') as logfile, redirect_stdout(logfile):
+            simulation.main(config=config, on_day=lambda day, state_list: \
+                connection.send(("day", day, [[int(count) for count in counts] for counts in state_list])))
+        connection.send(("done",))
+    except Exception as error:
+        connection.send(("error", type(error).__name__ + ": " + str(error)))
+    finally:
+        connection.close()
+
+class Simulation_Server(ThreadingHTTPServer):
+    """
+    class:      Simulation_Server
+    input:      `address`: the (host, port) to listen on
+                `config`: the base `Simulation_Config` every run's overrides are applied to
+                `num_workers`: the most runs at the same time
+    purpose:    Every request is handled on its own thread, which forks a worker process for the
+                run and streams what it sends back. Each run's config is checked here, and its
+                terrain and route table loaded here (once, through the caches in `Obstacle.py` and
+                `Route_Table.py`), before the worker is forked, so a bad request is answered
+                straight away and every worker starts warm.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, config, num_workers):
+        super().__init__(address, Run_Handler)
+        self.config = config
+        self.num_workers = num_workers
+        self.workers = BoundedSemaphore(num_workers)
+        # forking shares everything the server has loaded with the workers, copy-on-write
+        self.context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() \
+            else multiprocessing.get_context()
+        # the number of runs started so far, and the workers of the runs running now
+        self.lock = Lock()
+        self.num_runs = 0
+        self.running = set()
+
+    def prepare_run(self, overrides):
+        """
+        Purpose:    Make the config of a new run, loading its terrain and route table if this
+                    process hasn't already
+        Input:      A dictionary of {parameter path: value}
+        Output:     A tuple of the run's number and its config
+        """
+        params = deepcopy(self.config.PARAMS)
+        for parameter_path, value in overrides.items():
+            set_parameter(params, parameter_path, value)
+        with self.lock:
+            run = self.num_runs
+            self.num_runs += 1
+        if "output" not in overrides:
+            params["output"] = self.config.OUTPUT_FOLDER + "server/run_" + str(run) + "/"
+        config = Simulation_Config(params)
+        config.terrain_grid, config.route_table
+        makedirs(config.OUTPUT_FOLDER, exist_ok=True)
+        return run, config
+
+    def stop_runs(self):
+        """
+        Purpose:    Stop the workers of every run still running, since they aren't daemons and
+                    would otherwise keep the server's process from exiting
+        Input:      None
+        Output:     None
+        """
+        with self.lock:
+            running = list(self.running)
+        for worker in running:
+            worker.terminate()
+        for worker in running:
+            worker.join()
+
+    def status(self):
+        """
+        Purpose:    Describe what the server is doing
+        Input:      None
+        Output:     A dictionary
+        """
+        return {"workers": self.num_workers, "running": len(self.running), "runs": self.num_runs, \
+            "terrains": len(Obstacle.LOADED_GRIDS), "route_tables": len(Route_Table.LOADED_TABLES)}
+
+class Run_Handler(BaseHTTPRequestHandler):
+    """
+    class:      Run_Handler
+    input:      (made by `Simulation_Server` for every request)
+    purpose:    Answers POST /run by streaming a run's days back as lines of json, and GET /status
+    """
+    def do_GET(self):
+        if self.path != "/status":
+            self.__send_json(404, {"error": "Unknown path " + self.path + ". Use POST /run or GET /status."})
+            return
+        self.__send_json(200, self.server.status())
+
+    def do_POST(self):
+        if self.path != "/run":
+            self.__send_json(404, {"error": "Unknown path " + self.path + ". Use POST /run or GET /status."})
+            return
+        try:
+            request = loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            run, config = self.server.prepare_run(request.get("overrides", {}))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            self.__send_json(400, {"error": type(error).__name__ + ": " + str(error)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        with self.server.workers:
+            self.__stream_run(run, config)
+
+    def __stream_run(self, run, config):
+        """
+        Purpose:    Fork a worker for the run and pass on everything it sends, stopping it if the
+                    client goes away
+        Input:      The run's number and config
+        Output:     None
+        """
+        server = self.server
+        receiver, sender = server.context.Pipe(duplex=False)
+        # not a daemon, so the run can start worker processes of its own (the "parallel" engine's bands)
+        worker = server.context.Process(target=run_worker, args=(config, sender))
+        debug_timer = time()
+        last_day = -1
+        try:
+            worker.start()
+            with server.lock:
+                server.running.add(worker)
+            sender.close()
+            while True:
+                try:
+                    message = receiver.recv()
+                except EOFError:
+                    self.__send_line({"error": "The worker of run " + str(run) + " stopped unexpectedly (exit code " + \
+                        str(worker.exitcode) + ")"})
+                    break
+                if message[0] == "seed":
+                    self.__send_line({"run": run, "output": config.OUTPUT_FOLDER, "seed": message[1]})
+                elif message[0] == "day":
+                    last_day = message[1]
+                    self.__send_line({"day": last_day, "states": message[2]})
+                elif message[0] == "done":
+                    self.__send_line({"done": True, "days": last_day + 1, "seconds": round(time() - debug_timer, 3)})
+                    break
+                else:
+                    self.__send_line({"error": message[1]})
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away, so nobody wants the rest of the run
+            worker.terminate()
+        finally:
+            receiver.close()
+            if worker.pid is not None:
+                worker.join()
+            with server.lock:
+                server.running.discard(worker)
+
+    def __send_line(self, message):
+        self.wfile.write(dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+    def __send_json(self, status, message):
+        body = dumps(message).encode() + b"\n"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # every run is already reported by `main`, so requests aren't logged
+        pass
+
+def main():
+    port = int(argv[2]) if len(argv) > 2 else DEFAULT_PORT
+    num_workers = int(argv[3]) if len(argv) > 3 else multiprocessing.cpu_count()
+    config = constants.current_config()
+    debug_timer = time()
+    config.terrain_grid, config.route_table
+    print("Loaded the terrain and routes in", round(time() - debug_timer, 3), "seconds")
+    # only localhost can reach the server, since a run can write anywhere the server can
+    with Simulation_Server(("127.0.0.1", port), config, num_workers) as server:
+        print("Serving on http://127.0.0.1:" + str(port), "with", num_workers, "workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+        finally:
+            server.stop_runs()
+
+if __name__ == "__main__":
+    main()
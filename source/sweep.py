@@ -0,0 +1,215 @@
+"""
+Module:     sweep.py
+Purpose:    To run a simulation for every point of a parameter sweep (a full grid or a Latin
+            hypercube over fields of the parameter file) and collect the results in one table
+Usage:      python sweep.py <parameter file> <sweep spec> [number of processes]
+            The parameter file is the base every run starts from, and the terrain and route
+            table it loads are reused by every run. The sweep spec is a json file like
+            `resources/sweep_spec.json`:
+                "method":       "grid" (every combination of the listed values) or "lhs"
+                "samples":      the number of Latin hypercube points ("lhs" only)
+                "replicates":   how many differently seeded runs to make of every point
+                "seed":         the seed the Latin hypercube and every run's seed come from
+                "output":       the folder the sweep is written to
+                "parameters":   for every field to sweep, given as its path through the parameter
+                                file with '.' between keys ('*' matches every key, e.g. every
+                                disease), either a list of values or, for "lhs", a
+                                {"min", "max", "integer"} range
+            Running the same command again after an interruption only runs what is missing.
+Output:     `sweep_design.json`: the spec, the seed, and the parameter values of every point
+            `sweep_results.csv`: one row per finished run, keyed by its parameter values
+            `run_<n>/`: every run's parameter file and `main.py` output
+"""
+
+from contextlib import redirect_stdout
+from copy import deepcopy
+from itertools import product
+from json import dumps, loads
+import multiprocessing
+from os import makedirs, path
+import sys
+from time import time
+import numpy as np
+import constants
+import main as simulation
+from Simulation_Config import Simulation_Config
+
+# the columns of `sweep_results.csv` after the parameter values
+RESULT_COLUMNS = ("seed", "last_day", "susceptible", "latent", "infectious", "recovered", "dead", "peak_infectious", "peak_day")
+
+def set_parameter(params, parameter_path, value):
+    """
+    Purpose:    Set one field of a parameter dictionary
+    Input:      The dictionary, the field's path with '.' between keys ('*' matches every key
+                at that level), and the value
+    Output:     None
+    """
+    keys = parameter_path.split('.')
+    level = [params]
+    for key in keys[:-1]:
+        level = [node[child] for node in level for child in (node if key == '*' else [key])]
+    for node in level:
+        for child in (node if keys[-1] == '*' else [keys[-1]]):
+            node[child] = value
+
+def design_points(spec, seed):
+    """
+    Purpose:    Lay out every point of a sweep
+    Input:      The sweep spec and the seed for the Latin hypercube
+    Output:     A list of {parameter path: value} dictionaries
+    """
+    parameters = spec["parameters"]
+    names = list(parameters)
+    if spec.get("method", "grid") == "grid":
+        return [dict(zip(names, values)) for values in product(*(parameters[name] for name in names))]
+    if spec["method"] != "lhs":
+        raise ValueError("Unknown sweep method \"" + str(spec["method"]) + "\". Use \"grid\" or \"lhs\".")
+
+    # split every parameter's range into `samples` equal strata and give every point a different
+    #       stratum of every parameter, at a random spot inside it
+    samples = spec["samples"]
+    generator = np.random.default_rng([seed, len(names)])
+    points = [{} for _ in range(samples)]
+    for name in names:
+        spots = (generator.permutation(samples) + generator.random(samples)) / samples
+        choices = parameters[name]
+        for point, spot in zip(points, spots):
+            if isinstance(choices, list):
+                point[name] = choices[min(int(spot * len(choices)), len(choices) - 1)]
+            elif choices.get("integer", False):
+                point[name] = int(min(choices["min"] + int(spot * (choices["max"] - choices["min"] + 1)), choices["max"]))
+            else:
+                point[name] = choices["min"] + spot * (choices["max"] - choices["min"])
+    return points
+
+def load_design(spec, output_folder):
+    """
+    Purpose:    Lay out a sweep, or load the layout of an interrupted one so it picks up exactly
+                where it left off
+    Input:      The sweep spec and the sweep's output folder
+    Output:     A tuple of the sweep's seed and its list of points
+    """
+    design_file = output_folder + "sweep_design.json"
+    if path.isfile(design_file):
+        with open(design_file) as infile:
+            design = loads(infile.read())
+        if design["spec"] != spec:
+            raise ValueError(output_folder + " holds a different sweep. Change the \"output\" of the spec or delete it.")
+        return design["seed"], design["points"]
+    seed = spec.get("seed")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    points = design_points(spec, seed)
+    with open(design_file, 'w') as outfile:
+        outfile.write(dumps({"spec": spec, "seed": seed, "points": points}, indent=2))
+    return seed, points
+
+def finished_runs(results_file, num_columns):
+    """
+    Purpose:    Find the runs an interrupted sweep already finished, dropping any row the
+                interruption cut off so new rows can be appended after the complete ones
+    Input:      The path to `sweep_results.csv` and how many columns a complete row has
+    Output:     A set of run numbers
+    """
+    finished = set()
+    if path.isfile(results_file):
+        with open(results_file) as infile:
+            lines = infile.readlines()
+        complete = lines[:1]
+        for line in lines[1:]:
+            if len(line.rstrip('\n').split('|')) == num_columns and line.endswith('\n'):
+                finished.add(int(line.split('|')[0]))
+                complete.append(line)
+        if len(complete) != len(lines):
+            with open(results_file, 'w') as outfile:
+                outfile.writelines(complete)
+    return finished
+
+def run_simulation(arguments):
+    """
+    Purpose:    Run one point of the sweep in a freshly forked worker, with a config of the
+                point's parameters. It reuses the terrain and route table the sweep process
+                already loaded, unless the point changes them
+    Input:      A tuple of the run's number, its parameter values, its seed, and its folder
+    Output:     The run's number
+    """
+    run, point, seed, run_folder = arguments
+    params = deepcopy(constants.PARAMS)
+    for parameter_path, value in point.items():
+        set_parameter(params, parameter_path, value)
+    params["simulation"]["seed"] = seed
+    params["output"] = run_folder
+    # a pool's workers can't start the processes of the "parallel" engine's bands (see `main`)
+    if params["simulation"].get("engine") == "parallel":
+        params["simulation"]["engine"] = "vectorized"
+    makedirs(run_folder, exist_ok=True)
+    with open(run_folder + "params.json", 'w') as outfile:
+        outfile.write(dumps(params, indent=2))
+
+    config = Simulation_Config(params)
+    constants.use_config(config)
+    with open(run_folder + "stdout.txt", 'w') as logfile, redirect_stdout(logfile):
+        simulation.main(config=config)
+    return run
+
+def summarize_run(run_folder):
+    """
+    Purpose:    Boil one run's daily counts down to its results
+    Input:      The run's folder
+    Output:     A list of the values of `RESULT_COLUMNS` after "seed"
+    """
+    with open(run_folder + "CAoutput.csv") as infile:
+        days = [line.rstrip('\n').split('|') for line in infile.readlines()[1:]]
+    last_day = days[-1]
+    infectious = np.array([loads(day[3]) for day in days])
+    peak_day = infectious.argmax(axis=0)
+    return [last_day[0]] + last_day[1:6] + [str(infectious.max(axis=0).tolist()), str(peak_day.tolist())]
+
+def main():
+    with open(sys.argv[2]) as infile:
+        spec = loads(infile.read())
+    num_processes = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    output_folder = spec.get("output", constants.OUTPUT_FOLDER + "sweep/")
+    makedirs(output_folder, exist_ok=True)
+    seed, points = load_design(spec, output_folder)
+    names = list(spec["parameters"])
+    replicates = spec.get("replicates", 1)
+
+    results_file = output_folder + "sweep_results.csv"
+    header = ["run", "point", "replicate"] + names + list(RESULT_COLUMNS)
+    finished = finished_runs(results_file, len(header))
+    runs = {}
+    for point_number, point in enumerate(points):
+        for replicate in range(replicates):
+            run = point_number * replicates + replicate
+            if run not in finished:
+                runs[run] = (point_number, replicate, point, [seed, point_number, replicate])
+    print(len(points), "points x", replicates, "replicates:", len(finished), "already finished,", len(runs), "to run")
+
+    if not path.isfile(results_file):
+        with open(results_file, 'w') as outfile:
+            outfile.write('|'.join(header) + '\n')
+    # every run gets its own freshly forked worker, so it starts from the state the sweep
+    #       process was in, with the base parameter file's terrain and route table loaded
+    base_config = constants.current_config()
+    base_config.terrain_grid, base_config.route_table
+    # the runs already run in parallel, and a pool's workers can't start the processes of the
+    #       "parallel" engine's bands, so they run on the engine it's built on
+    if base_config.ENGINE == "parallel" or any(value == "parallel" for point in points for value in point.values()):
+        print("The \"parallel\" engine can't run inside the sweep's workers, so its runs use the \"vectorized\" engine")
+    context = multiprocessing.get_context("fork")
+    with context.Pool(num_processes, maxtasksperchild=1) as pool, open(results_file, 'a') as outfile:
+        tasks = [(run, point, run_seed, output_folder + "run_" + str(run) + "/") for run, (_, _, point, run_seed) in runs.items()]
+        for count, run in enumerate(pool.imap_unordered(run_simulation, tasks), 1):
+            point_number, replicate, point, run_seed = runs[run]
+            row = [run, point_number, replicate] + [point[name] for name in names] + [run_seed] + \
+                summarize_run(output_folder + "run_" + str(run) + "/")
+            outfile.write('|'.join(str(value) for value in row) + '\n')
+            outfile.flush()
+            print("Finished", count, "of", len(runs), "runs", end='\r', flush=True)
+    print()
+
+if __name__ == "__main__":
+    debug_timer = time()
+    main()
+    print("The sweep took", time() - debug_timer, "seconds")
@@ -1,8 +1,8 @@
-from constants import GRID_SIZE
+from constants import NUM_ROWS, NUM_COLS
 with open("C:/Users/Owner/Desktop/SLIR-MWSU/resources/terrain.txt", 'r') as input:
     with open("C:/Users/Owner/Desktop/SLIR-MWSU/resources/terrain1.txt", 'w') as output:
-        for row in range(GRID_SIZE):
-            for col in range(GRID_SIZE):
+        for row in range(NUM_ROWS):
+            for col in range(NUM_COLS):
                 inputnum = input.read(1)
                 if inputnum == '1':
                     output.write('0')